@@ -0,0 +1,42 @@
+"""Benchmark bulk matching with worker processes.
+
+Run from the project root:
+
+    $ python -m benchmarks.benchmark_many
+
+"""
+
+import os
+import time
+
+import patternmatching as pm
+
+PATTERN = (
+    pm.bind.id,
+    pm.anything * pm.group('level') + ': ' + pm.anything * pm.group('text'),
+    [pm.bind.x, pm.bind.y],
+)
+
+
+def records(count):
+    "Yield `count` records to match to `PATTERN`."
+    for num in range(count):
+        yield num, 'INFO: record %d' % num, [num, -num]
+
+
+def main(count=200000):
+    print('%-8s %12s %10s' % ('workers', 'records/s', 'speedup'))
+    base = None
+
+    for workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+        start = time.perf_counter()
+        results = pm.match_many(records(count), PATTERN, workers, 2048)
+        matched = sum(1 for result in results if result is not None)
+        rate = count / (time.perf_counter() - start)
+        assert matched == count
+        base = base or rate
+        print('%-8d %12.0f %9.2fx' % (workers, rate, rate / base))
+
+
+if __name__ == '__main__':
+    main()
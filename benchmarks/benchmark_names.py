@@ -0,0 +1,61 @@
+"""Benchmark binding stores on long sequence patterns.
+
+Compares `MapStack` with `TrailMap`, the default `Matcher.names`, by time
+and by peak memory allocated while matching.
+
+Run from the project root:
+
+    $ python -m benchmarks.benchmark_names
+
+"""
+
+import timeit
+import tracemalloc
+
+import patternmatching as pm
+
+CASES = [
+    ('padding', list(range(500)) + ['x'], pm.padding + ['x']),
+    ('groups', 'ab' * 200, (pm.anyone * pm.group('pair')) * pm.repeat),
+    ('names', [1, 2] * 200, pm.bind.first * pm.repeat + pm.anything),
+]
+
+
+def peak(func):
+    "Return peak bytes allocated while calling `func`."
+    tracemalloc.start()
+    try:
+        func()
+        _, size = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return size
+
+
+def bench(func, number):
+    "Return best time per call of `func` in microseconds."
+    times = timeit.repeat(func, number=number, repeat=5)
+    return min(times) / number * 1e6
+
+
+def main(number=20):
+    print('%-8s %-9s %12s %10s' % ('case', 'store', 'time (us)', 'peak (B)'))
+
+    for name, value, pattern in CASES:
+        for store in (pm.MapStack, pm.TrailMap):
+            matcher = pm.Matcher()
+            matcher.engine = 'backtrack'
+            matcher.names = store()
+
+            def run():
+                assert matcher.match(value, pattern)
+                matcher.bound.pop()
+
+            size = peak(run)
+            micros = bench(run, number)
+            args = name, store.__name__, micros, size
+            print('%-8s %-9s %12.2f %10d' % args)
+
+
+if __name__ == '__main__':
+    main()
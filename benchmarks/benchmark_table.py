@@ -0,0 +1,58 @@
+"""Benchmark dispatch tables against chains of match calls.
+
+Run from the project root:
+
+    $ python -m benchmarks.benchmark_table
+
+"""
+
+import timeit
+
+import patternmatching as pm
+
+
+def rules(count):
+    "Return `count` literal rules followed by a few general rules."
+    literals = [(num, 'literal-%d' % num) for num in range(count)]
+    sequences = [([num, pm.bind.rest], 'pair-%d' % num) for num in range(count)]
+    return literals + sequences + [(str, 'text'), (pm.anyone, 'other')]
+
+
+def chain(value, rules):
+    "Return handler of first matching rule like an if/elif chain."
+    for pattern, handler in rules:
+        if pm.match(value, pattern):
+            return handler
+    return None
+
+
+def bench(func, number):
+    "Return best time per call of `func` in microseconds."
+    times = timeit.repeat(func, number=number, repeat=5)
+    return min(times) / number * 1e6
+
+
+def main(number=500):
+    print('%-8s %12s %12s %8s' % ('rules', 'chain (us)', 'table', 'speedup'))
+
+    for count in (5, 20, 80):
+        table = pm.table(rules(count))
+        values = [count - 1, [count - 1, 0], 'abc', 1.5]
+
+        @pm.bound.reset
+        def chained():
+            for value in values:
+                chain(value, table.rules)
+
+        @pm.bound.reset
+        def tabled():
+            for value in values:
+                table.match(value)
+
+        slow = bench(chained, number)
+        fast = bench(tabled, number)
+        print('%-8d %12.2f %12.2f %7.2fx' % (count, slow, fast, slow / fast))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Compare benchmark results from `benchmarks.suite` to a baseline.
+
+Prints the ratio of current to baseline best times for each benchmark and
+exits with status 1 if any ratio exceeds the threshold.
+
+Run from the project root:
+
+    $ python -m benchmarks.compare baseline.json current.json --threshold 1.2
+
+"""
+
+import argparse
+import json
+import sys
+
+
+def load(path):
+    "Return results mapping from JSON report at `path`."
+    with open(path) as reader:
+        return json.load(reader)['results']
+
+
+def compare(baseline, current, threshold):
+    "Print comparison of results and return names of regressions."
+    regressions = []
+    print('%-36s %12s %12s %8s' % ('benchmark', 'base (us)', 'now (us)',
+                                   'ratio'))
+
+    for name in sorted(set(baseline) | set(current)):
+        if name not in baseline or name not in current:
+            side = 'baseline' if name not in baseline else 'current'
+            print('%-36s missing from %s' % (name, side))
+            continue
+
+        before = baseline[name]['best']
+        after = current[name]['best']
+        ratio = after / before if before else float('inf')
+        flag = ''
+
+        if ratio > threshold:
+            regressions.append(name)
+            flag = ' slower'
+
+        print('%-36s %12.2f %12.2f %7.2fx%s' % (name, before, after, ratio,
+                                                flag))
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('baseline', help='JSON results to compare against')
+    parser.add_argument('current', help='JSON results to check')
+    parser.add_argument('-t', '--threshold', type=float, default=1.2,
+                        help='ratio above which a benchmark regressed')
+    args = parser.parse_args(argv)
+
+    regressions = compare(load(args.baseline), load(args.current),
+                          args.threshold)
+
+    if regressions:
+        print('%d regressions above %.2fx' % (len(regressions),
+                                               args.threshold))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
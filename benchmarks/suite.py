@@ -0,0 +1,260 @@
+"""Benchmark suite covering the matcher hot paths.
+
+Each benchmark is a function called repeatedly by `timeit`. Results are the
+best and median time per call in microseconds and may be written as JSON
+and compared to a baseline with `benchmarks.compare`.
+
+Run from the project root:
+
+    $ python -m benchmarks.suite --output baseline.json
+    $ python -m benchmarks.suite --output current.json
+    $ python -m benchmarks.compare baseline.json current.json
+
+"""
+
+import argparse
+import json
+import platform
+import sys
+import timeit
+from collections import namedtuple
+
+import patternmatching as pm
+from patternmatching import bind, like
+
+Point = namedtuple('Point', 'x y z t')
+
+BENCHMARKS = []
+
+
+def benchmark(name, number=1000):
+    "Decorator registering benchmark function with `name`."
+    def register(func):
+        BENCHMARKS.append((name, number, func))
+        return func
+    return register
+
+
+def matching(name, value, pattern, engine='auto', number=1000):
+    "Register benchmark matching `value` to `pattern` with `engine`."
+    matcher = pm.Matcher()
+    matcher.engine = engine
+
+    def run():
+        matcher.match(value, pattern)
+        matcher.bound.reset()
+
+    benchmark(name, number)(run)
+
+
+###############################################################################
+# Matcher.visit dispatch over each default case.
+###############################################################################
+
+matching('visit.__match__', 'blah', pm.anyone)
+matching('visit.types', 'alpha', str)
+matching('visit.literals', 12345, 12345)
+matching('visit.equality', {'a': 1}, {'a': 1})
+matching('visit.sequences', (1, 'a', 2.0), (int, str, float))
+matching('visit.nested', (0, [1, (2, [3, (4, [5])])]),
+         (0, [1, (2, [3, (4, [int])])]))
+matching('visit.names', [1, 2, 3], [bind.first, bind.second, bind.third])
+matching('visit.like', 'abc01abc', like('^abc..abc$'))
+
+
+###############################################################################
+# APattern.__match__ on patterns ported from the re tests.
+###############################################################################
+
+REGEX_CASES = [
+    ('literal', pm.Pattern('abc'), 'abc'),
+    ('star', 'a' + 'b' * pm.repeat + 'c', 'abbbbc'),
+    ('plus', 'a' + 'b' * pm.repeat(min=1) + 'bc', 'abbbbc'),
+    ('bounded', 'a' + 'b' * pm.repeat(min=3, max=4) + 'c', 'abbbbc'),
+    ('either', pm.either('ab', 'cd') + 'e', 'cde'),
+    ('exclude', 'a' + 'bc' * pm.exclude + 'e', 'ade'),
+    ('groups', pm.anything * pm.group(1) + 'c' + pm.anything * pm.group(2),
+     'abcde'),
+    ('lazy', 'a' + pm.padding + 'c', 'abcabc'),
+    ('long', pm.anyone * pm.repeat + 'c', 'ab' * 100 + 'c'),
+]
+
+for _name, _pattern, _value in REGEX_CASES:
+    for _engine in ('auto', 'stack', 'backtrack'):
+        matching('pattern.%s.%s' % (_name, _engine), _value, _pattern, _engine)
+    matching('pattern.%s.list' % _name, list(_value), _pattern)
+
+
+###############################################################################
+# Pathological backtracking.
+###############################################################################
+
+NESTED = ('a' * pm.repeat) * pm.repeat + 'b'
+PAIRS = pm.anything * pm.group('x') + pm.anything * pm.group('y') + 'b'
+
+for _engine in ('auto', 'stack', 'backtrack'):
+    matching('pathological.nested.%s' % _engine, 'a' * 20, NESTED, _engine, 10)
+    matching('pathological.pairs.%s' % _engine, 'a' * 60, PAIRS, _engine, 10)
+
+
+###############################################################################
+# Either and Exclude over many literal options.
+###############################################################################
+
+COLORS = ['color%d' % index for index in range(500)]
+COLOR_ITEMS = [COLORS[index * 7 % 500] for index in range(200)]
+COLOR_TEXT = ''.join(COLOR_ITEMS[:50])
+ONE_COLOR = pm.either(*[[color] for color in COLORS])
+NOT_COLOR = pm.exclude(*[[color] for color in COLORS])
+
+for _engine in ('auto', 'stack'):
+    matching('options.items.%s' % _engine, COLOR_ITEMS,
+             ONE_COLOR * pm.repeat * pm.group('colors'), _engine, 100)
+    matching('options.exclude.%s' % _engine, list(range(200)),
+             NOT_COLOR * pm.repeat * pm.group('others'), _engine, 100)
+    matching('options.text.%s' % _engine, COLOR_TEXT,
+             pm.either(*COLORS) * pm.repeat * pm.group('colors'), _engine,
+             100)
+
+
+###############################################################################
+# MapStack and TrailMap binding churn.
+###############################################################################
+
+def churn(store):
+    "Return function pushing, storing, and undoing names in `store`."
+    names = store()
+
+    def run():
+        for index in range(100):
+            names.push()
+            names[index % 7] = index
+            if index % 3:
+                names.undo()
+            else:
+                names.pull()
+        names.reset()
+
+    return run
+
+benchmark('names.MapStack', 100)(churn(pm.MapStack))
+benchmark('names.TrailMap', 100)(churn(pm.TrailMap))
+
+
+###############################################################################
+# Dispatch chain of match calls from tests/test_funcs.py.
+###############################################################################
+
+def match_basic(value):
+    "Return case of first matching pattern like an if/elif chain."
+    # pylint: disable=too-many-return-statements,too-many-branches
+    match = pm.match
+    if match(value, None):
+        return 'case-1'
+    elif match(value, True):
+        return 'case-2'
+    elif match(value, False):
+        return 'case-3'
+    elif match(value, -100):
+        return 'case-4'
+    elif match(value, 1.234):
+        return 'case-5'
+    elif match(value, 12345678901234567890):
+        return 'case-6'
+    elif match(value, complex(1, 2)):
+        return 'case-7'
+    elif match(value, str('alpha')):
+        return 'case-8'
+    elif match(value, bytes(b'beta')):
+        return 'case-9'
+    elif match(value, (1, 2, 3, 4)):
+        return 'case-15'
+    elif match(value, [bind.first, bind.second, bind.third]):
+        return 'case-11'
+    elif match(value, like('^abc..abc$')):
+        return 'case-12'
+    elif match(value, like(lambda val: val % 17 == 0)):
+        return 'case-13'
+    elif match(value, Point(0, 0, 0, 0)):
+        return 'case-14'
+    elif match(value, [1, 2, 3, 4]):
+        return 'case-16'
+    elif match(value, (0, [1, (2, [3, (4, [5])])])):
+        return 'case-17'
+    elif match(value, tuple):
+        return 'case-10'
+    elif match(value, like(lambda val: val % 19 == 0)):
+        return 'case-18'
+    elif match(value, object):
+        return 'case-19'
+    raise ValueError('no match')
+
+BASIC_VALUES = [
+    None, True, False, -100, 1.234, 12345678901234567890, complex(1, 2),
+    'alpha', b'beta', Point, [5, 6, 7], 'abc01abc', 119, Point(0, 0, 0, 0),
+    Point(1, 2, 3, 4), [1, 2, 3, 4], (0, [1, (2, [3, (4, [5])])]), 114, list,
+]
+
+@benchmark('basic.chain', 20)
+def basic_chain():
+    "Dispatch each of `BASIC_VALUES` through `match_basic`."
+    for value in BASIC_VALUES:
+        match_basic(value)
+    pm.bound.reset()
+
+
+###############################################################################
+# Running and reporting.
+###############################################################################
+
+def measure(func, number, repeat):
+    "Return best and median time per call of `func` in microseconds."
+    times = sorted(timeit.repeat(func, number=number, repeat=repeat))
+    scale = 1e6 / number
+    return times[0] * scale, times[len(times) // 2] * scale
+
+
+def run(pattern='', scale=1.0, repeat=5):
+    "Return results of benchmarks with names containing `pattern`."
+    results = {}
+
+    for name, number, func in BENCHMARKS:
+        if pattern not in name:
+            continue
+
+        number = max(1, int(number * scale))
+        best, median = measure(func, number, repeat)
+        results[name] = {'best': best, 'median': median, 'number': number}
+        print('%-36s %12.2f %12.2f' % (name, best, median))
+        sys.stdout.flush()
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-o', '--output', help='write JSON results to path')
+    parser.add_argument('-k', '--filter', default='',
+                        help='only run benchmarks with names containing text')
+    parser.add_argument('-s', '--scale', type=float, default=1.0,
+                        help='scale the number of calls per timing')
+    parser.add_argument('-r', '--repeat', type=int, default=5,
+                        help='number of timings per benchmark')
+    args = parser.parse_args(argv)
+
+    print('%-36s %12s %12s' % ('benchmark', 'best (us)', 'median (us)'))
+    results = run(args.filter, args.scale, args.repeat)
+
+    if args.output:
+        report = {
+            'version': pm.__version__,
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'results': results,
+        }
+        with open(args.output, 'w') as writer:
+            json.dump(report, writer, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
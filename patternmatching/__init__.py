@@ -4,8 +4,19 @@ Python pattern matching library.
 
 """
 
+# pylint: disable=too-many-lines
+
+import os
+import re
+import threading
+import time
+import weakref
+from abc import ABCMeta
+from collections import Counter, OrderedDict, deque
 from collections.abc import Sequence, Mapping
+from concurrent.futures import ProcessPoolExecutor
 from functools import wraps
+from operator import attrgetter
 
 infinity = float('inf')
 
@@ -28,6 +39,9 @@ class Record:
         return (self.__slots__ == that.__slots__
                 and all(item == iota for item, iota in zip(self, that)))
 
+    def __hash__(self):
+        return hash(tuple(self))
+
     def __repr__(self):
         args = ', '.join(repr(item) for item in self)
         return '%s(%s)' % (type(self).__name__, args)
@@ -40,15 +54,85 @@ class Record:
 
 
 class Case(Record):
-    """Three-ple of `name`, `predicate`, and `action`.
+    """Four-ple of `name`, `predicate`, `action`, and `depends`.
 
     `Matcher` objects successively try a sequence of `Case` predicates. When a
     match is found, the `Case` action is applied.
 
+    The `depends` field describes what the predicate result depends on:
+
+    * "pattern" -- only the pattern, decided by its type when
+      `typed_attributes` is true for the pattern.
+    * "types" -- only the types of the value and pattern.
+    * "value" -- the value itself, the default, so it is always called.
+
+    Predicates which do not depend on the value are cached by `Matcher.visit`.
+
+    >>> Case('anything', lambda *args: True, lambda *args: None).depends
+    'value'
+
+    """
+    __slots__ = 'name', 'predicate', 'action', 'depends'
+
+    def __init__(self, name, predicate, action, depends='value'):
+        super().__init__(name, predicate, action, depends)
+
+
+class Cases(list):
+    """List of `Case` records which counts changes in `version`.
+
+    `Matcher` objects cache plans of cases and discard them when the version
+    changes.
+
+    >>> cases = Cases()
+    >>> cases.version
+    0
+    >>> cases.append(Case('anything', lambda *args: True, lambda *args: None))
+    >>> cases.version
+    1
+    >>> del cases[:]
+    >>> cases.version
+    2
+
+    """
+    version = 0
+
+
+def _changes(name):
+    method = getattr(list, name)
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.version += 1
+        return method(self, *args, **kwargs)
+
+    return wrapper
+
+for _name in (
+        '__setitem__', '__delitem__', '__iadd__', '__imul__', 'append',
+        'extend', 'insert', 'pop', 'remove', 'clear', 'sort', 'reverse'):
+    setattr(Cases, _name, _changes(_name))
+
+del _name
+
+
+def cases_version(cases):
+    """Return version of list of `cases` which differs when it changes.
+
+    `Cases` lists count their changes. Other lists are compared by items.
+
+    >>> cases_version(Cases())
+    0
+    >>> cases_version([])
+    ()
+
     """
-    __slots__ = 'name', 'predicate', 'action'
+    if isinstance(cases, Cases):
+        return cases.version
+    return tuple(cases)
+
 
-default_cases = []
+default_cases = Cases()
 
 
 class Mismatch(Exception):
@@ -56,6 +140,81 @@ class Mismatch(Exception):
     pass
 
 
+class MatchLimitError(Exception):
+    """Raised when matching exceeds `max_steps` or `timeout` of `Matcher`.
+
+    Attributes tell how far matching got: `reason` is "steps" or "timeout",
+    `steps` counts engine steps taken, `elapsed` is seconds since matching
+    began, and `offset` is the offset reached in the value matched by the
+    engine which stopped, or None if the limit was reached by `Matcher.visit`.
+
+    """
+    def __init__(self, reason, steps, elapsed, offset):
+        super().__init__(reason, steps, elapsed, offset)
+        self.reason = reason
+        self.steps = steps
+        self.elapsed = elapsed
+        self.offset = offset
+
+    def __str__(self):
+        args = self.reason, self.steps, self.elapsed
+        message = 'match exceeded %s after %d steps in %.3fs' % args
+        if self.offset is None:
+            return message
+        return '%s at offset %d' % (message, self.offset)
+
+
+class Budget:
+    """Steps and time allowed for one match, shared by the engines.
+
+    Engines count steps locally and `charge` them at most every `interval`
+    steps so checking the budget is cheap.
+
+    """
+    interval = 1024
+
+    def __init__(self, max_steps, timeout, previous=None):
+        self.max_steps = max_steps
+        self.steps = 0
+        self.began = time.monotonic()
+        self.deadline = None if timeout is None else self.began + timeout
+        self.previous = previous
+
+    def allowance(self):
+        "Return steps an engine may take before it must `charge` them."
+        if self.max_steps is None:
+            return self.interval
+        return max(1, min(self.interval, self.max_steps - self.steps + 1))
+
+    def charge(self, steps, offset):
+        "Add `steps` taken and raise `MatchLimitError` if over budget."
+        self.steps += steps
+
+        if self.max_steps is not None and self.steps > self.max_steps:
+            reason = 'steps'
+        elif self.deadline is not None and time.monotonic() > self.deadline:
+            reason = 'timeout'
+        else:
+            return
+
+        elapsed = time.monotonic() - self.began
+        raise MatchLimitError(reason, self.steps, elapsed, offset)
+
+    def tick(self):
+        """Add one step taken by `Matcher.visit`.
+
+        The step limit is checked every step and the timeout every `interval`
+        steps.
+
+        """
+        self.steps += 1
+
+        if self.max_steps is not None and self.steps > self.max_steps:
+            self.charge(0, None)
+        elif self.steps % self.interval == 0:
+            self.charge(0, None)
+
+
 ###############################################################################
 # Match Case: __match__
 ###############################################################################
@@ -69,7 +228,9 @@ def match_action(matcher, value, pattern):
     attr = getattr(pattern, '__match__')
     return attr(matcher, value)
 
-default_cases.append(Case('__match__', match_predicate, match_action))
+default_cases.append(
+    Case('__match__', match_predicate, match_action, 'pattern')
+)
 
 
 ###############################################################################
@@ -96,6 +257,13 @@ class APattern(Sequence):
     def __hash__(self):
         return hash(self._details)
 
+    def __getstate__(self):
+        return self._details
+
+    def __setstate__(self, state):
+        # pylint: disable=attribute-defined-outside-init
+        self._details = state
+
     def __match__(self, matcher, value):
         """Match `pattern` to `value` with `Pattern` semantics.
 
@@ -111,772 +279,4074 @@ class APattern(Sequence):
         True
 
         """
-        names = matcher.names
-        len_value = len(value)
-
-        # Life is easier with generators. I tried twice to write "visit"
-        # recursively without success. Consider:
-        #
-        # match('abc', 'a' + 'b' * repeat * group + 'bc')
-        #
-        # Notice the "'b' * repeat" clause is nested within a group
-        # clause. When recursing, the "'b' * repeat" clause will match greedily
-        # against 'abc' at offset 1 but then the whole pattern will fail as
-        # 'bc' does not match at offset 2. So backtracking of the nested clause
-        # is required. Generators communicate multiple end offsets and support
-        # the needed backtracking.
-
-        def visit(pattern, index, offset, count):
-            len_pattern = len(pattern)
-
-            if index == len_pattern:
-                yield offset
-                return
+        return pattern_match(matcher, value, self, matcher.visit)
 
-            item = pattern[index]
 
-            if isinstance(item, Repeat):
-                if count > item.max:
-                    return
-
-                if item.greedy:
-                    if offset < len_value:
-                        for end in visit(item.pattern, 0, offset, count):
-                            for stop in visit(pattern, index, end, count + 1):
-                                yield stop
-
-                    if count >= item.min:
-                        for stop in visit(pattern, index + 1, offset, 0):
-                            yield stop
-                else:
-                    if count >= item.min:
-                        for stop in visit(pattern, index + 1, offset, 0):
-                            yield stop
+def pattern_match(matcher, value, pattern, leaf, start=0):
+    """Match `value` to `pattern` with `Pattern` semantics.
 
-                    if offset < len_value:
-                        for end in visit(item.pattern, 0, offset, count):
-                            for stop in visit(pattern, index, end, count + 1):
-                                yield stop
+    Return segment of `value` from `start` that matched, made by
+    `Matcher.capture`, else raise `Mismatch`. See `pattern_end`.
 
-                return
+    """
+    end = pattern_end(matcher, value, pattern, leaf, start)
+    return matcher.capture(value, start, end)
 
-            elif isinstance(item, Group):
-                for end in visit(item.pattern, 0, offset, 0):
-                    if item.name is None:
-                        for stop in visit(pattern, index + 1, end, 0):
-                            yield stop
-                    else:
-                        segment = value[offset:end]
-                        names.push()
 
-                        try:
-                            name_store(names, item.name, segment)
-                        except Mismatch:
-                            names.undo()
-                        else:
-                            for stop in visit(pattern, index + 1, end, 0):
-                                yield stop
+def pattern_end(matcher, value, pattern, leaf, start=0):
+    """Return end offset of `value` matching `pattern` else raise `Mismatch`.
 
-                            names.undo()
+    Items of `pattern` which are not `Repeat`, `Group`, `Either`, or `Exclude`
+    patterns are matched by calling `leaf` with the item of `value` and the
+    item of `pattern`. `Matcher.visit` is used normally and compiled patterns
+    use a faster function.
 
-                return
+    The engine is chosen by `Matcher.engine`:
 
-            elif isinstance(item, Either):
-                for option in item.options:
-                    for end in visit(option, 0, offset, 0):
-                        for stop in visit(pattern, index + 1, end, 0):
-                            yield stop
-                return
+    * "backtrack" -- depth-first search with `backtrack_match`.
+    * "stack" -- depth-first search with `stack_match`. Raise `ValueError`
+      if the pattern is not supported by `stack_program`.
+    * "nfa" -- simultaneous states with `nfa_match`. Raise `ValueError` if
+      the pattern is not supported by `nfa_program`.
+    * "regex" -- compiled regular expression with `regex_match`. Raise
+      `ValueError` if the value is not text or the pattern is not supported
+      by `Matcher.regex`.
+    * "auto" -- use the first of "nfa", "regex", "stack", and "backtrack"
+      which supports the value and pattern.
 
-            elif isinstance(item, Exclude):
-                for option in item.options:
-                    for end in visit(option, 0, offset, 0):
-                        return
+    The "nfa" engine comes first as it takes linear time while regular
+    expressions backtrack like `backtrack_match`, only faster. The "stack"
+    engine comes before "backtrack" as nested generators recurse once per
+    item and so fail on long values. While `Matcher.budget` limits matching,
+    "auto" skips "regex" as regular expressions cannot be interrupted.
 
-                for end in visit(pattern, index + 1, offset + 1, 0):
-                    yield end
+    Matching begins at offset `start` of `value`. Named groups store
+    `SliceView` objects in `matcher.names` rather than copies.
 
-            else:
-                if offset >= len_value:
-                    return
+    """
+    engine = matcher.engine
 
-                names.push()
+    if engine in ('auto', 'nfa'):
+        program = matcher.program(pattern)
 
-                try:
-                    matcher.visit(value[offset], item)
-                except Mismatch:
-                    pass
-                else:
-                    for end in visit(pattern, index + 1, offset + 1, 0):
-                        yield end
+        if program is not None:
+            return nfa_match(matcher, value, program, leaf, start=start)
 
-                names.undo()
+        if engine == 'nfa':
+            raise ValueError('pattern not supported by nfa engine')
 
-                return
+    if engine == 'regex' or (engine == 'auto' and matcher.budget is None):
+        if isinstance(value, (str, bytes)):
+            text = bytes if isinstance(value, bytes) else str
+            translation = matcher.regex(pattern, text)
 
-        for end in visit(self, 0, 0, 0):
-            return value[:end]
+            if translation is not None:
+                names = matcher.names
+                _, groups = translation
 
-        raise Mismatch
+                if not any(name in names for _, name in groups):
+                    return regex_match(matcher, value, translation, start)
 
+        if engine == 'regex':
+            raise ValueError('pattern not supported by regex engine')
 
-def make_tuple(value):
-    """Return value as tuple.
+    if engine in ('auto', 'stack'):
+        program = matcher.stack_program(pattern)
 
-    >>> make_tuple((1, 2, 3))
-    (1, 2, 3)
-    >>> make_tuple('abc')
-    ('a', 'b', 'c')
-    >>> make_tuple([4, 5, 6])
-    (4, 5, 6)
-    >>> make_tuple(None)
-    (None,)
+        if program is not None:
+            return stack_match(matcher, value, program, leaf, start)
 
-    """
-    if isinstance(value, tuple):
-        return value
-    if isinstance(value, Sequence):
-        return tuple(value)
-    return (value,)
+        if engine == 'stack':
+            raise ValueError('pattern not supported by stack engine')
 
+    return backtrack_match(matcher, value, pattern, leaf, start)
 
-class Pattern(APattern):
-    """Wrap tuple to extend addition operator.
 
-    >>> Pattern()
-    Pattern()
-    >>> Pattern([1, 2, 3])
-    Pattern(1, 2, 3)
-    >>> Pattern() + [1, 2, 3]
-    Pattern(1, 2, 3)
-    >>> None + Pattern()
-    Pattern(None)
-    >>> list(Pattern(4, 5, 6))
-    [4, 5, 6]
+def backtrack_match(matcher, value, pattern, leaf, start=0):
+    """Match `value` to `pattern` by depth-first search with backtracking.
+
+    Return end offset of the match from `start` else raise `Mismatch`.
 
     """
-    def __init__(self, *args):
-        self._details = make_tuple(args[0] if len(args) == 1 else args)
+    # pylint: disable=too-many-locals,too-many-statements
+    names = matcher.names
+    len_value = len(value)
+
+    # Life is easier with generators. I tried twice to write "visit"
+    # recursively without success. Consider:
+    #
+    # match('abc', 'a' + 'b' * repeat * group + 'bc')
+    #
+    # Notice the "'b' * repeat" clause is nested within a group
+    # clause. When recursing, the "'b' * repeat" clause will match greedily
+    # against 'abc' at offset 1 but then the whole pattern will fail as
+    # 'bc' does not match at offset 2. So backtracking of the nested clause
+    # is required. Generators communicate multiple end offsets and support
+    # the needed backtracking.
+
+    def step(pattern, index, offset, count):
+        # pylint: disable=too-many-return-statements,too-many-locals
+        # pylint: disable=too-many-statements
+        nonlocal countdown, visit, failures, mark, alarm
+        countdown -= 1
+
+        if countdown == 0 and not binds(root):
+            visit = memoized
+
+        if countdown == alarm:
+            budget.charge(mark - countdown, offset)
+            mark = countdown
+            alarm = countdown - budget.allowance()
+
+        len_pattern = len(pattern)
+
+        if index == len_pattern:
+            yield offset
+            return
+
+        item = pattern[index]
+
+        if isinstance(item, Repeat):
+            if count > item.max:
+                return
 
-    def __getitem__(self, index):
-        return self._details[index]
+            try:
+                single = singles[id(item)]
+            except KeyError:
+                single = int_bounds(item) and single_item(item.pattern)
+                singles[id(item)] = single
 
-    def __len__(self):
-        return len(self._details)
+            if single:
+                yield from counted(pattern, index, offset, count)
+                return
 
-    def __add__(self, that):
-        return Pattern(self._details + make_tuple(that))
+            # Iterations which consume nothing are skipped once the minimum
+            # count is met. Otherwise they would repeat forever.
 
-    def __radd__(self, that):
-        return Pattern(make_tuple(that) + self._details)
+            if item.greedy:
+                if offset < len_value:
+                    for end in visit(item.pattern, 0, offset, 0):
+                        if end == offset and count >= item.min:
+                            continue
+                        yield from visit(pattern, index, end, count + 1)
 
-    def __repr__(self):
-        args = ', '.join(repr(value) for value in self._details)
-        return '%s(%s)' % (type(self).__name__, args)
+                if count >= item.min:
+                    yield from visit(pattern, index + 1, offset, 0)
+            else:
+                if count >= item.min:
+                    yield from visit(pattern, index + 1, offset, 0)
 
+                if offset < len_value:
+                    for end in visit(item.pattern, 0, offset, 0):
+                        if end == offset and count >= item.min:
+                            continue
+                        yield from visit(pattern, index, end, count + 1)
 
-class PatternMixin(APattern):
-    """Abstract base class to wrap a tuple to extend multiplication and
-    addition.
+            return
 
-    """
-    def __getitem__(self, index):
-        if index == 0:
-            return self
-        raise IndexError
+        if isinstance(item, Group):
+            for end in visit(item.pattern, 0, offset, 0):
+                if item.name is None:
+                    yield from visit(pattern, index + 1, end, 0)
+                else:
+                    segment = SliceView(value, offset, end)
+                    names.push()
 
-    def __len__(self):
-        return 1
+                    try:
+                        name_store(names, item.name, segment)
+                    except Mismatch:
+                        names.undo()
+                    else:
+                        yield from visit(pattern, index + 1, end, 0)
+                        names.undo()
 
-    def __add__(self, that):
-        return Pattern(self) + that
+            return
 
-    def __radd__(self, that):
-        return that + Pattern(self)
+        if isinstance(item, Either):
+            ends = literal_ends(item, value, offset) if literal else None
 
-    def __mul__(self, that):
-        return that.__rmul__(self)
+            if ends is None:
+                for option in item.options:
+                    for end in visit(option, 0, offset, 0):
+                        yield from visit(pattern, index + 1, end, 0)
+            else:
+                for end in ends:
+                    yield from visit(pattern, index + 1, end, 0)
 
-    def __getattr__(self, name):
-        return getattr(self._details, name)
+            return
 
-    def __repr__(self):
-        pairs = zip(self._details.__slots__, self._details)
-        tokens = ('%s=%s' % (name, repr(value)) for name, value in pairs)
-        return '%s(%s)' % (type(self).__name__, ', '.join(tokens))
+        if isinstance(item, Exclude):
+            if offset >= len_value:
+                return
 
+            ends = literal_ends(item, value, offset) if literal else None
 
-###############################################################################
-# Match Case: anyone
-###############################################################################
+            if ends is None:
+                for option in item.options:
+                    for end in visit(option, 0, offset, 0):
+                        return
+            elif ends:
+                return
 
-class Anyone(PatternMixin):
-    """Match any one thing.
+            yield from visit(pattern, index + 1, offset + 1, 0)
+            return
 
-    >>> Anyone()
-    anyone
-    >>> match('blah', Anyone())
-    True
-    >>> anyone + [1, 2, 3]
-    Pattern(anyone, 1, 2, 3)
-    >>> (4, 5) + anyone + None
-    Pattern(4, 5, anyone, None)
+        if offset >= len_value:
+            return
 
-    """
-    def __init__(self):
-        self._details = ()
+        names.push()
 
-    def __match__(self, matcher, value):
-        "Pass because `anyone` matches any one thing."
-        pass
+        try:
+            leaf(value[offset], item)
+        except Mismatch:
+            failures += 1
+        else:
+            yield from visit(pattern, index + 1, offset + 1, 0)
 
-    def __repr__(self):
-        return 'anyone'
+        names.undo()
 
-anyone = Anyone()
+    # Repeated patterns which consume one item and bind nothing are matched
+    # by scanning the run of matching items once and then counting down, or
+    # up when not greedy, rather than nesting a generator per item.
 
+    singles = {}
 
-###############################################################################
-# Match Case: repeat
-###############################################################################
+    def counted(pattern, index, offset, count):
+        item = pattern[index]
+        single = item.pattern[0]
+        low = offset + max(item.min - count, 0)
+        high = offset + min(item.max - count, len_value - offset)
 
-def sequence(value):
-    """Return value as sequence.
+        if item.greedy:
+            if isinstance(single, Anyone):
+                end = high
+            else:
+                end = offset
 
-    >>> sequence('abc')
-    'abc'
-    >>> sequence(1)
-    (1,)
-    >>> sequence([1])
-    [1]
+                while end < high and single_match(value, end, single, leaf,
+                                                  literal):
+                    end += 1
 
-    """
-    return value if isinstance(value, Sequence) else (value,)
+            while end >= low:
+                yield from visit(pattern, index + 1, end, 0)
+                end -= 1
+        else:
+            end = offset
 
-class _Repeat(Record):
-    __slots__ = 'pattern', 'min', 'max', 'greedy'
+            while True:
+                if end >= low:
+                    yield from visit(pattern, index + 1, end, 0)
 
-class Repeat(PatternMixin):
-    """Pattern specifying repetition with min/max count and greedy parameters.
+                if end >= high:
+                    break
 
-    Inherits from `PatternMixin` which defines multiplication operators to
-    capture patterns.
+                if not single_match(value, end, single, leaf, literal):
+                    break
 
-    >>> Repeat()
-    Repeat(pattern=(), min=0, max=inf, greedy=True)
-    >>> repeat = Repeat()
-    >>> repeat(max=1)
-    Repeat(pattern=(), min=0, max=1, greedy=True)
-    >>> maybe = repeat(max=1)
-    >>> Repeat(anyone)
-    Repeat(pattern=anyone, min=0, max=inf, greedy=True)
-    >>> anyone * repeat
-    Repeat(pattern=anyone, min=0, max=inf, greedy=True)
-    >>> anything = anyone * repeat
-    >>> anyone * repeat(min=1)
-    Repeat(pattern=anyone, min=1, max=inf, greedy=True)
-    >>> something = anyone * repeat(min=1)
-    >>> padding = anyone * repeat(greedy=False)
+                end += 1
 
-    """
-    def __init__(self, pattern=(), min=0, max=infinity, greedy=True):
-        # pylint: disable=redefined-builtin
-        self._details = _Repeat(pattern, min, max, greedy)
+    # Without bound names, the ends yielded from a state depend only on the
+    # state. After `Matcher.memoize_after` steps, remember them so each state
+    # is explored once and backtracking stays polynomial. Duplicate ends are
+    # skipped as the consumer would reject them again.
 
-    def __rmul__(self, that):
-        return type(self)(sequence(that), *tuple(self._details)[1:])
+    memo = {}
 
-    def __call__(self, min=0, max=infinity, greedy=True, pattern=()):
-        # pylint: disable=redefined-builtin
-        return type(self)(pattern, min, max, greedy)
+    def memoized(pattern, index, offset, count):
+        if index < len(pattern):
+            item = pattern[index]
+            if isinstance(item, Repeat) and item.max == infinity:
+                count = min(count, item.min)
 
-repeat = Repeat()
-maybe = repeat(max=1)
-anything = anyone * repeat
-something = anyone * repeat(min=1)
-padding = anyone * repeat(greedy=False)
+        key = id(pattern), index, offset, count
 
+        try:
+            ends = memo[key]
+        except KeyError:
+            pass
+        else:
+            yield from ends
+            return
 
-###############################################################################
-# Match Case: groups
-###############################################################################
+        ends = []
+        seen = set()
 
-class _Group(Record):
-    __slots__ = 'pattern', 'name'
+        for end in step(pattern, index, offset, count):
+            if end not in seen:
+                seen.add(end)
+                ends.append(end)
+                yield end
 
-class Group(PatternMixin):
-    """Pattern specifying a group with name parameter.
+        memo[key] = ends
 
-    Inherits from `PatternMixin` which defines multiplication operators to
-    capture patterns.
+    root = pattern
+    visit = step
+    countdown = matcher.memoize_after
+    failures = 0
+    literal = literal_equality(matcher)
 
-    >>> Group()
-    Group(pattern=(), name=None)
-    >>> Group(['red', 'blue', 'yellow'], 'color')
-    Group(pattern=['red', 'blue', 'yellow'], name='color')
-    >>> group = Group()
-    >>> ['red', 'blue', 'yellow'] * group('color')
-    Group(pattern=['red', 'blue', 'yellow'], name='color')
+    if countdown is None:
+        countdown = -1
+    elif countdown <= 0 and not binds(root):
+        visit = memoized
 
-    """
-    def __init__(self, pattern=(), name=None):
-        self._details = _Group(pattern, name)
+    initial = mark = countdown
+    budget = matcher.budget
+    alarm = None if budget is None else countdown - budget.allowance()
 
-    def __rmul__(self, that):
-        return type(self)(sequence(that), *tuple(self._details)[1:])
+    try:
+        for end in visit(pattern, 0, start, 0):
+            return end
 
-    def __call__(self, name=None, pattern=()):
-        return type(self)(pattern, name)
+        raise Mismatch
+    finally:
+        if budget is not None:
+            budget.steps += mark - countdown
 
-group = Group()
+        if matcher.counters is not None:
+            steps = initial - countdown
+            matcher.counters.engine('backtrack', steps, failures)
 
 
-###############################################################################
-# Match Case: options
-###############################################################################
+def binds(pattern):
+    """Return True if matching `pattern` may bind names.
 
-class _Options(Record):
-    __slots__ = ('options',)
+    Names are bound by `Name` objects, named `Group` patterns, and `Like`
+    objects with a name. Other objects with a `__match__` attribute may bind
+    names too.
 
-class Options(PatternMixin):
-    "Pattern specifying a sequence of options to match."
-    def __init__(self, *options):
-        self._details = _Options(tuple(map(sequence, options)))
+    >>> binds('a' + 'b' * repeat + anyone)
+    False
+    >>> binds('a' + anything * group('rest'))
+    True
+    >>> binds(either([1, int], [2, bind.two]))
+    True
+    >>> binds([like('abc.*', None)])
+    False
+    >>> binds([like('abc.*')])
+    True
+    >>> binds([{'a': 1}, mapping({'b': int}, rest='rest')])
+    True
 
-    def __call__(self, *options):
-        return type(self)(*options)
+    """
+    # pylint: disable=too-many-return-statements
+    if isinstance(pattern, Group):
+        return pattern.name is not None or binds(pattern.pattern)
+    if isinstance(pattern, Repeat):
+        return binds(pattern.pattern)
+    if isinstance(pattern, (Either, Exclude)):
+        return any(binds(option) for option in pattern.options)
+    if isinstance(pattern, Like):
+        return pattern.name is not None
+    if isinstance(pattern, MappingPattern):
+        return pattern.rest is not None or binds(pattern.pattern)
+    if isinstance(pattern, Attrs):
+        return any(binds(item) for item in pattern.patterns)
+    if isinstance(pattern, (type, Anyone) + literal_types):
+        return False
+    if isinstance(pattern, APattern):
+        if type(pattern).__match__ is not APattern.__match__:
+            return True
+    elif hasattr(pattern, '__match__'):
+        return True
+    elif isinstance(pattern, Mapping):
+        return any(binds(item) for item in pattern.values())
+    elif not isinstance(pattern, Sequence):
+        return False
+    return any(binds(item) for item in pattern)
 
-    def __rmul__(self, that):
-        return type(self)(*sequence(that))
 
-    def __repr__(self):
-        args = ', '.join(map(repr, self._details.options))
-        return '%s(%s)' % (type(self).__name__, args)
+def nullable(pattern):
+    """Return True if `pattern` may match without consuming items.
 
+    >>> nullable('a' * repeat + 'b' * maybe)
+    True
+    >>> nullable(either('a', 'b' * repeat))
+    True
+    >>> nullable(Pattern('ab') * group)
+    False
 
-class Either(Options):
-    "Pattern specifying that any of options may match."
-    pass
+    """
+    for item in pattern:
+        if isinstance(item, Repeat):
+            if item.min > 0 and not nullable(item.pattern):
+                return False
+        elif isinstance(item, Group):
+            if not nullable(item.pattern):
+                return False
+        elif isinstance(item, Either):
+            if not any(nullable(option) for option in item.options):
+                return False
+        else:
+            return False
+    return True
 
-either = Either()
 
+def int_bounds(item):
+    """Return True if the bounds of `Repeat` `item` are ints or an infinite
+    maximum.
 
-class Exclude(Options):
-    "Pattern specifying that none of options may match."
-    pass
+    >>> int_bounds(repeat(min=1)), int_bounds(repeat(max=2.5))
+    (True, False)
 
-exclude = Exclude()
+    """
+    _, low, high, _ = item._details
 
+    if not isinstance(low, int):
+        return False
+    return high == infinity or isinstance(high, int)
 
-###############################################################################
-# Match Case: names
-###############################################################################
 
-class Name(Record):
-    """Name objects simply wrap a `value` to be used as a name.
+def single_item(pattern):
+    """Return True if `pattern` always consumes one item and binds nothing.
 
-    >>> match([1, 2, 3], [Name('head'), 2, 3])
-    True
-    >>> bound.head == 1
-    True
+    Such patterns are one item which is not `Repeat` or `Group`. `Either`
+    options must be one plain item each and `Exclude` options plain items.
+    Repeating them is matched by `single_match` in a loop.
+
+    >>> [single_item(pattern) for pattern in (anyone, 'b', exclude('bc'))]
+    [True, True, True]
+    >>> [single_item(pattern) for pattern in ('ab', either('a', 'bc'))]
+    [False, False]
+    >>> single_item([bind.x])
+    False
 
     """
-    __slots__ = ('value',)
+    if len(pattern) != 1 or binds(pattern):
+        return False
 
-    def __match__(self, matcher, value):
-        "Store `value` in `matcher` with `name` and return `value`."
-        name_store(matcher.names, self.value, value)
+    item = pattern[0]
+    compound = (Repeat, Group, Either, Exclude)
 
-def name_store(names, name, value):
-    """Store `value` in `names` with given `name`.
+    if isinstance(item, (Repeat, Group)):
+        return False
 
-    If `name` is already present in `names` then raise `Mismatch` on inequality
-    between `value` and stored value.
+    if isinstance(item, Either):
+        return all(len(option) == 1 and not isinstance(option[0], compound)
+                   for option in item.options)
 
-    """
-    if name in names:
-        if value == names[name]:
-            pass  # Prefer equality comparison to inequality.
-        else:
-            raise Mismatch
-    names[name] = value
+    if isinstance(item, Exclude):
+        return not any(isinstance(iota, compound)
+                       for option in item.options for iota in option)
 
-class Binder:
-    """Binder objects return Name objects on attribute lookup.
+    return True
 
-    A few attributes behave specially:
 
-    * `bind.any` returns an `Anyone` object.
-    * `bind.push`, `bind.pop`, and `bind.reset` raise an AttributeError
-      because the names would conflict with `Bounder` attributes.
+def single_match(value, offset, item, leaf, literal):
+    """Return True if `item` of a `single_item` pattern matches `value` at
+    `offset`, which is less than the length of `value`.
 
-    >>> bind = Binder()
-    >>> bind.head
-    Name('head')
-    >>> bind.tail
-    Name('tail')
-    >>> bind.any
-    anyone
-    >>> bind.push
-    Traceback (most recent call last):
-        ...
-    AttributeError
+    Indexed options are used when `literal` as by `literal_equality`.
 
     """
-    def __getattr__(self, name):
-        if name == 'any':
-            return anyone
-        if name in ('push', 'pop', 'reset'):
-            raise AttributeError
-        return Name(name)
-
-bind = Binder()
+    if isinstance(item, Anyone):
+        return True
 
+    if isinstance(item, (Either, Exclude)):
+        ends = literal_ends(item, value, offset) if literal else None
 
-###############################################################################
-# Match Case: likes
-###############################################################################
+        if ends is None:
+            found = False
 
-import re
+            for option in item.options:
+                if offset + len(option) > len(value):
+                    continue
 
-like_errors = (
-    AttributeError, LookupError, NotImplementedError, TypeError, ValueError
-)
+                try:
+                    for index, iota in enumerate(option, offset):
+                        leaf(value[index], iota)
+                except Mismatch:
+                    continue
 
-class Like(Record):
-    # pylint: disable=missing-docstring
-    __slots__ = 'pattern', 'name'
+                found = True
+                break
+        else:
+            found = bool(ends)
 
-    def __match__(self, matcher, value):
-        """Apply `pattern` to `value` and store result in `matcher`.
+        return found if isinstance(item, Either) else not found
 
-        Given `pattern` is expected as `Like` instance and deconstructed by
-        attribute into `pattern` and `name`.
+    try:
+        leaf(value[offset], item)
+    except Mismatch:
+        return False
 
-        When `pattern` is text then it is used as a regular expression.
+    return True
 
-        When `name` is None then the result is not stored in `matcher.names`.
 
-        Raises `Mismatch` if callable raises exception in `like_errors` or
-        result is falsy.
+###############################################################################
+# Linear-time NFA engine.
+###############################################################################
 
-        >>> match('abcdef', like('abc.*'))
-        True
-        >>> match(123, like(lambda num: num % 2 == 0))
-        False
+OP_MATCH, OP_LEAF, OP_ANY, OP_EXCLUDE, OP_NOTEND, OP_SPLIT, OP_JUMP = range(7)
+OP_SAVE, OP_PROGRESS, OP_CAPTURE, OP_REJECT = range(7, 11)
+OP_MEMBERS, OP_TRIE, OP_RUN = range(11, 14)
 
-        """
-        pattern = self.pattern
-        name = self.name
+nfa_program_size = 10000
 
-        if isinstance(pattern, str):
-            if not isinstance(value, str):
-                raise Mismatch
-            func = lambda value: re.match(pattern, value)
-        else:
-            func = pattern
 
-        try:
-            result = func(value)
-        except like_errors:
-            raise Mismatch
+def nfa_program(pattern):
+    """Return program of instructions for `pattern` or None if unsupported.
 
-        if not result:
-            raise Mismatch
+    Instructions are tuples with an opcode followed by arguments:
 
-        if name is not None:
-            name_store(matcher.names, name, result)
+    * `(OP_MATCH,)` -- success.
+    * `(OP_LEAF, item)` -- match one item to `item` and advance.
+    * `(OP_ANY,)` -- match any one item and advance.
+    * `(OP_EXCLUDE, options, item)` -- match one item where no option of
+      plain items matches at the offset and advance. Options indexed by
+      `literal_options` are looked up through the `Exclude` item.
+    * `(OP_MEMBERS, members, items)` -- match one item equal to any of
+      `items`, looked up in the frozenset `members` when literal, and
+      advance.
+    * `(OP_NOTEND,)` -- fail at the end of the value.
+    * `(OP_SPLIT, first, second)` -- continue at `first` then at `second`.
+    * `(OP_JUMP, target)` -- continue at `target`.
 
-def like(pattern, name='match'):
-    """Return `Like` object with given `pattern` and `name`, default "match".
+    Counted repetition is unrolled. Patterns which bind names, exclude
+    options other than plain items, repeat a nullable pattern a bounded
+    number of times, or exceed `nfa_program_size` instructions are not
+    supported.
 
-    >>> like('abc.*')
-    Like('abc.*', 'match')
-    >>> like('abc.*', 'prefix')
-    Like('abc.*', 'prefix')
+    >>> nfa_program('a' + anyone * repeat)
+    [(1, 'a'), (5, 2, 5), (4,), (2,), (6, 1), (0,)]
+    >>> nfa_program('a' * group('name')) is None
+    True
 
     """
-    return Like(pattern, name)
+    if binds(pattern):
+        return None
 
+    return make_program(pattern, False)
 
-###############################################################################
-# Match Case: types
-###############################################################################
-
-def type_predicate(matcher, value, pattern):
-    "Return True if `pattern` is an instance of `type`."
-    return isinstance(pattern, type)
 
-def type_action(matcher, value, pattern):
-    """Match `value` as subclass or instance of `pattern`.
+def make_program(pattern, stack):
+    """Return program for `pattern` or None if unsupported.
 
-    >>> match(1, int)
-    True
-    >>> match(True, bool)
-    True
-    >>> match(True, int)
-    True
-    >>> match(bool, int)
-    True
-    >>> match(0.0, int)
-    False
-    >>> match(float, int)
-    False
+    Without `stack`, build programs for `nfa_program`. With `stack`, build
+    programs for `stack_program` which use registers to capture named groups
+    and to check that repeated nullable patterns consume items.
 
     """
-    if isinstance(value, type) and issubclass(value, pattern):
-        return value
-    if isinstance(value, pattern):
-        return value
-    raise Mismatch
+    # pylint: disable=too-many-statements
+    program = []
+    slots = [0]
 
-default_cases.append(Case('types', type_predicate, type_action))
+    def check_size():
+        if len(program) > nfa_program_size:
+            raise ValueError
 
+    def slot():
+        slots[0] += 1
+        return slots[0] - 1
 
-###############################################################################
-# Match Case: literals
-###############################################################################
+    def emit_repeat(item):
+        body = item.pattern
 
-literal_types = (type(None), bool, int, float, complex, str, bytes)
+        if not int_bounds(item):
+            raise ValueError
 
-def literal_predicate(matcher, value, pattern):
-    "Return True if `value` and `pattern` instance of `literal_types`."
-    literal_pattern = isinstance(pattern, literal_types)
-    return literal_pattern and isinstance(value, literal_types)
+        if item.min > item.max:
+            raise ValueError
 
-def literal_action(matcher, value, pattern):
-    """Match `value` as equal to `pattern`.
+        if stack and single_item(body):
+            program.append((OP_RUN, body[0], item.min, item.max, item.greedy))
+            return
 
-    >>> match(1, 1)
-    True
-    >>> match('abc', 'abc')
-    True
-    >>> match(1, 1.0)
-    True
-    >>> match(1, True)
-    True
+        empty = nullable(body)
 
-    """
-    if value == pattern:
-        return value
-    raise Mismatch
+        if not stack and item.max != infinity and empty:
+            raise ValueError
 
-default_cases.append(Case('literals', literal_predicate, literal_action))
+        for _ in range(item.min):
+            program.append((OP_NOTEND,))
+            emit(body)
+            check_size()
 
+        # Optional iterations which consume nothing fail like the skipped
+        # iterations of `backtrack_match`.
 
-###############################################################################
-# Match Case: equality
-###############################################################################
+        def emit_optional():
+            program.append((OP_NOTEND,))
 
-def equality_predicate(matcher, value, pattern):
-    "Return True if `value` equals `pattern`."
-    try:
-        return value == pattern
-    except Exception:  # pylint: disable=broad-except
-        return False
+            if stack and empty:
+                index = slot()
+                program.append((OP_SAVE, index))
+                emit(body)
+                program.append((OP_PROGRESS, index))
+            else:
+                emit(body)
 
-def equality_action(matcher, value, pattern):
-    """Match `value` as equal to `pattern`.
+        splits = []
 
-    >>> identity = lambda value: value
-    >>> match(identity, identity)
-    True
-    >>> match('abc', 'abc')
-    True
-    >>> match(1, 1.0)
-    True
-    >>> match(1, True)
-    True
+        if item.max == infinity:
+            head = len(program)
+            splits.append(head)
+            program.append(None)
+            emit_optional()
+            program.append((OP_JUMP, head))
+        else:
+            for _ in range(item.max - item.min):
+                splits.append(len(program))
+                program.append(None)
+                emit_optional()
+                check_size()
 
-    """
-    return value
+        end = len(program)
 
-default_cases.append(Case('equality', equality_predicate, equality_action))
+        for split in splits:
+            if item.greedy:
+                program[split] = (OP_SPLIT, split + 1, end)
+            else:
+                program[split] = (OP_SPLIT, end, split + 1)
+
+    def emit_group(item):
+        if stack and item.name is not None:
+            index = slot()
+            program.append((OP_SAVE, index))
+            emit(item.pattern)
+            program.append((OP_CAPTURE, item.name, index))
+        else:
+            emit(item.pattern)
 
+    def emit_either(item):
+        options = item.options
 
-###############################################################################
-# Match Case: sequences
-###############################################################################
+        if not options:
+            raise ValueError
 
-def sequence_predicate(matcher, value, pattern):
-    """Return True if `pattern` is instance of Sequence and `value` is instance of
-    type of `pattern`.
+        if item._members is not None:
+            items = tuple(option[0] for option in options)
+            program.append((OP_MEMBERS, item._members, items))
+            return
 
-    """
-    return isinstance(pattern, Sequence) and isinstance(value, type(pattern))
+        trie = None
 
-def sequence_action(matcher, value, pattern):
-    """Iteratively match items of `pattern` with `value` in sequence.
+        if stack and item._trie is not None:
+            trie = len(program)
+            program.append(None)
 
-    Return tuple of results of matches.
+        jumps = []
 
-    >>> match([0, 'abc', {}], [int, str, dict])
-    True
-    >>> match((0, True, bool), (0.0, 1, int))
-    True
-    >>> match([], ())
-    False
+        for option in options[:-1]:
+            split = len(program)
+            program.append(None)
+            emit(option)
+            jumps.append(len(program))
+            program.append(None)
+            program[split] = (OP_SPLIT, split + 1, len(program))
 
-    """
-    if len(value) != len(pattern):
-        raise Mismatch
+        emit(options[-1])
 
-    pairs = zip(value, pattern)
-    return tuple(matcher.visit(item, iota) for item, iota in pairs)
+        for jump in jumps:
+            program[jump] = (OP_JUMP, len(program))
 
-default_cases.append(Case('sequences', sequence_predicate, sequence_action))
+        if trie is not None:
+            program[trie] = (OP_TRIE, item._trie, len(program))
+
+    def emit_exclude(item):
+        for option in item.options:
+            for iota in option:
+                if isinstance(iota, (Repeat, Group, Either, Exclude)):
+                    break
+            else:
+                continue
+
+            if not stack:
+                raise ValueError
+
+            programs = []
+
+            for option in item.options:
+                option_program = make_program(option, True)
+
+                if option_program is None:
+                    raise ValueError
+
+                programs.append(option_program)
+
+            program.append((OP_REJECT, tuple(programs)))
+            return
+
+        options = tuple(tuple(option) for option in item.options)
+        program.append((OP_EXCLUDE, options, item))
+
+    def emit(pattern):
+        for item in pattern:
+            if isinstance(item, Repeat):
+                emit_repeat(item)
+            elif isinstance(item, Group):
+                emit_group(item)
+            elif isinstance(item, Either):
+                emit_either(item)
+            elif isinstance(item, Exclude):
+                emit_exclude(item)
+            elif isinstance(item, Anyone):
+                program.append((OP_ANY,))
+            else:
+                program.append((OP_LEAF, item))
+
+    try:
+        emit(pattern)
+        check_size()
+    except ValueError:
+        return None
+
+    program.append((OP_MATCH,))
+    return program
+
+
+def nfa_closures(program):
+    """Return states reachable from each state of `program` before the end.
+
+    The result has a tuple of states in priority order for each index of
+    `program`, as added by `nfa_match` when input remains. Return None if
+    `program` has `OP_EXCLUDE` states which depend on the input.
+
+    >>> program = nfa_program(anyone * repeat + 'c')
+    >>> nfa_closures(program)
+    ((2, 4), (2,), (2,), (2, 4), (4,), (5,))
+
+    """
+    if any(op[0] == OP_EXCLUDE for op in program):
+        return None
+
+    closures = []
+
+    for start in range(len(program)):
+        states = []
+        seen = set()
+        stack = [start]
+
+        while stack:
+            index = stack.pop()
+
+            if index in seen:
+                continue
+
+            seen.add(index)
+            op = program[index]
+            code = op[0]
+
+            if code == OP_SPLIT:
+                stack.append(op[2])
+                stack.append(op[1])
+            elif code == OP_JUMP:
+                stack.append(op[1])
+            elif code == OP_NOTEND:
+                stack.append(index + 1)
+            else:
+                states.append(index)
+
+        closures.append(tuple(states))
+
+    return tuple(closures)
+
+
+def nfa_match(matcher, value, program, leaf, closures=None, start=0):
+    """Match `value` to `program` from `nfa_program` by simulating states.
+
+    All states at an offset advance together over the value so time is
+    linear in the length of the value. States are kept in priority order
+    and lower priority states are dropped on success so the result is the
+    same as `backtrack_match`. States are followed using `closures` from
+    `nfa_closures` when given.
+
+    Return end offset of the match from `start` else raise `Mismatch`.
+
+    >>> program = nfa_program(anyone * repeat(greedy=False) + 'c')
+    >>> nfa_match(matcher, 'abcabc', program, matcher.visit)
+    3
+
+    """
+    # pylint: disable=too-many-branches,too-many-nested-blocks
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    # pylint: disable=too-many-locals,too-many-statements
+    len_value = len(value)
+    literal = literal_equality(matcher)
+
+    def excluded(op, offset):
+        if literal:
+            ends = literal_ends(op[2], value, offset)
+
+            if ends is not None:
+                return bool(ends)
+
+        for option in op[1]:
+            if offset + len(option) > len_value:
+                continue
+
+            for index, item in enumerate(option, offset):
+                try:
+                    leaf(value[index], item)
+                except Mismatch:
+                    break
+            else:
+                return True
+
+        return False
+
+    def follow(states, seen, start, offset):
+        # Add states reachable from `start` without consuming, in priority
+        # order. States seen already at this offset have higher priority.
+
+        if closures is not None and offset < len_value:
+            for index in closures[start]:
+                if index not in seen:
+                    seen.add(index)
+                    states.append(index)
+            return
+
+        stack = [start]
+
+        while stack:
+            index = stack.pop()
+
+            if index in seen:
+                continue
+
+            seen.add(index)
+            op = program[index]
+            code = op[0]
+
+            if code == OP_SPLIT:
+                stack.append(op[2])
+                stack.append(op[1])
+            elif code == OP_JUMP:
+                stack.append(op[1])
+            elif code == OP_NOTEND:
+                if offset < len_value:
+                    stack.append(index + 1)
+            elif code == OP_EXCLUDE:
+                if offset < len_value and not excluded(op, offset):
+                    states.append(index)
+            else:
+                states.append(index)
+
+    states = []
+    follow(states, set(), 0, start)
+    offset = start
+    end = None
+    budget = matcher.budget
+
+    while states:
+        if budget is not None:
+            budget.charge(len(states), offset)
+
+        following = []
+        seen = set()
+
+        for index in states:
+            op = program[index]
+            code = op[0]
+
+            if code == OP_MATCH:
+                end = offset
+                break
+
+            if offset >= len_value:
+                continue
+
+            if code == OP_LEAF:
+                try:
+                    leaf(value[offset], op[1])
+                except Mismatch:
+                    continue
+            elif code == OP_MEMBERS:
+                item = value[offset]
+
+                if literal and type(item) in exact_literal_types:
+                    if item not in op[1]:
+                        continue
+                else:
+                    for iota in op[2]:
+                        try:
+                            leaf(item, iota)
+                        except Mismatch:
+                            continue
+                        break
+                    else:
+                        continue
+
+            follow(following, seen, index + 1, offset + 1)
+
+        states = following
+        offset += 1
+
+    if matcher.counters is not None:
+        matcher.counters.engine('nfa', offset - start, 0)
+
+    if end is None:
+        raise Mismatch
+
+    return end
+
+
+###############################################################################
+# Backtracking engine with an explicit stack.
+###############################################################################
+
+def stack_program(pattern):
+    """Return program of instructions for `pattern` or None if unsupported.
+
+    Programs extend those of `nfa_program` with instructions for names and
+    general exclusions:
+
+    * `(OP_SAVE, slot)` -- store the offset in register `slot`.
+    * `(OP_PROGRESS, slot)` -- fail unless the offset moved past register
+      `slot`.
+    * `(OP_CAPTURE, name, slot)` -- bind `name` to the segment from register
+      `slot` to the offset.
+    * `(OP_REJECT, programs)` -- match one item where no program matches at
+      the offset and advance.
+    * `(OP_TRIE, trie, target)` -- continue at `target` after each option
+      in `trie` from `literal_options` matching at the offset, or at the
+      next instruction if items are not literal.
+    * `(OP_RUN, item, min, max, greedy)` -- match `min` to `max` items to
+      `item` of a `single_item` pattern and advance, counting back from the
+      longest run when `greedy` else forward from the shortest.
+
+    Repetition with bounds that are not ints or with minimum greater than
+    maximum, empty `Either` patterns, and programs which exceed
+    `nfa_program_size` instructions are not supported.
+
+    >>> stack_program(anyone * group('name') + 'z')
+    [(7, 0), (2,), (9, 'name', 0), (1, 'z'), (0,)]
+
+    """
+    return make_program(pattern, True)
+
+
+def program_binds(program):
+    "Return True if matching `program` from `stack_program` may bind names."
+    for op in program:
+        code = op[0]
+
+        if code == OP_CAPTURE:
+            return True
+        if code == OP_LEAF and binds([op[1]]):
+            return True
+        if code == OP_EXCLUDE and any(binds(option) for option in op[1]):
+            return True
+        if code == OP_REJECT and any(map(program_binds, op[1])):
+            return True
+
+    return False
+
+
+def stack_match(matcher, value, program, leaf, start=0):
+    """Match `value` to `program` from `stack_program` by backtracking.
+
+    Alternatives are kept on a list rather than in nested generators like
+    `backtrack_match` so matching takes constant Python stack depth and
+    constant time per step. Results are the same as `backtrack_match`.
+
+    Each alternative records the offset, the register trail length, and a
+    mark of `matcher.names` so backtracking restores names and registers.
+    After `Matcher.memoize_after` alternatives, if `program` binds no names,
+    states are remembered so each is explored once.
+
+    Return end offset of the match from `start` else raise `Mismatch`.
+
+    >>> program = stack_program(anything * group('head') + 'c')
+    >>> stack_match(matcher, 'abcabc', program, matcher.visit)
+    6
+    >>> matcher.names['head']
+    SliceView('abcab')
+    >>> matcher.names.reset()
+
+    """
+    # pylint: disable=too-many-branches,too-many-statements,too-many-locals
+    # pylint: disable=too-many-nested-blocks
+    names = matcher.names
+    len_value = len(value)
+    stack = []
+    registers = {}
+    trail = []
+    memo = None
+    countdown = matcher.memoize_after
+
+    if countdown is None:
+        countdown = -1
+    elif countdown <= 0:
+        countdown = 1
+
+    initial = mark = countdown
+    resumed = 0
+    literal = literal_equality(matcher)
+    budget = matcher.budget
+    alarm = None if budget is None else countdown - budget.allowance()
+    pc = 0
+    offset = start
+
+    while True:
+        op = program[pc]
+        code = op[0]
+
+        if code == OP_LEAF:
+            if offset < len_value:
+                names.push()
+
+                try:
+                    leaf(value[offset], op[1])
+                except Mismatch:
+                    names.undo()
+                else:
+                    names.pull()
+                    pc += 1
+                    offset += 1
+                    continue
+
+        elif code == OP_ANY:
+            if offset < len_value:
+                pc += 1
+                offset += 1
+                continue
+
+        elif code == OP_MEMBERS:
+            if offset < len_value:
+                item = value[offset]
+
+                if literal and type(item) in exact_literal_types:
+                    if item in op[1]:
+                        pc += 1
+                        offset += 1
+                        continue
+                else:
+                    found = False
+
+                    for iota in op[2]:
+                        names.push()
+
+                        try:
+                            leaf(item, iota)
+                        except Mismatch:
+                            names.undo()
+                        else:
+                            names.pull()
+                            found = True
+                            break
+
+                    if found:
+                        pc += 1
+                        offset += 1
+                        continue
+
+        elif code == OP_TRIE:
+            ends = trie_ends(op[1], value, offset) if literal else None
+
+            if ends is None:
+                pc += 1
+                continue
+
+            if ends:
+                for end in reversed(ends[1:]):
+                    names.push()
+                    stack.append((op[2], end, len(trail)))
+
+                pc = op[2]
+                offset = ends[0]
+                continue
+
+        elif code == OP_RUN:
+            _, item, low, high, greedy = op
+            low += offset
+            high = offset + min(high, len_value - offset)
+
+            stop = high if greedy else min(low, high)
+
+            if isinstance(item, Anyone):
+                end = stop
+            elif isinstance(item, (Either, Exclude)):
+                end = offset
+
+                while end < stop and single_match(value, end, item, leaf,
+                                                  literal):
+                    end += 1
+            else:
+                end = offset
+
+                while end < stop:
+                    try:
+                        leaf(value[end], item)
+                    except Mismatch:
+                        break
+
+                    end += 1
+
+            if end >= low:
+                # Alternatives of runs hold a bound and a direction to count
+                # to the next end when resumed.
+
+                if greedy and end > low:
+                    names.push()
+                    stack.append((pc, end - 1, len(trail), low, -1))
+                elif not greedy and end < high:
+                    names.push()
+                    stack.append((pc, end, len(trail), high, 1))
+
+                pc += 1
+                offset = end
+                continue
+
+        elif code == OP_SPLIT:
+            countdown -= 1
+
+            if countdown == 0 and not program_binds(program):
+                memo = set()
+
+            if countdown == alarm:
+                budget.charge(mark - countdown, offset)
+                mark = countdown
+                alarm = countdown - budget.allowance()
+
+            if memo is None:
+                visit = True
+            else:
+                key = pc, offset
+
+                if registers:
+                    key += tuple(sorted(registers.items()))
+
+                visit = key not in memo
+                memo.add(key)
+
+            if visit:
+                names.push()
+                stack.append((op[2], offset, len(trail)))
+                pc = op[1]
+                continue
+
+        elif code == OP_JUMP:
+            pc = op[1]
+            continue
+
+        elif code == OP_NOTEND:
+            if offset < len_value:
+                pc += 1
+                continue
+
+        elif code == OP_SAVE:
+            index = op[1]
+
+            if stack:
+                trail.append((index, registers.get(index)))
+
+            registers[index] = offset
+            pc += 1
+            continue
+
+        elif code == OP_PROGRESS:
+            if offset != registers[op[1]]:
+                pc += 1
+                continue
+
+        elif code == OP_CAPTURE:
+            segment = SliceView(value, registers[op[2]], offset)
+
+            try:
+                name_store(names, op[1], segment)
+            except Mismatch:
+                pass
+            else:
+                pc += 1
+                continue
+
+        elif code == OP_EXCLUDE:
+            ends = None
+
+            if literal and offset < len_value:
+                ends = literal_ends(op[2], value, offset)
+
+            if ends is not None:
+                if not ends:
+                    pc += 1
+                    offset += 1
+                    continue
+
+            elif offset < len_value:
+                for option in op[1]:
+                    if offset + len(option) > len_value:
+                        continue
+
+                    names.push()
+
+                    try:
+                        for index, item in enumerate(option, offset):
+                            leaf(value[index], item)
+                    except Mismatch:
+                        continue
+                    else:
+                        break
+                    finally:
+                        names.undo()
+                else:
+                    pc += 1
+                    offset += 1
+                    continue
+
+        elif code == OP_REJECT:
+            if offset < len_value:
+                for option in op[1]:
+                    names.push()
+
+                    try:
+                        stack_match(matcher, value, option, leaf, offset)
+                    except Mismatch:
+                        continue
+                    else:
+                        break
+                    finally:
+                        names.undo()
+                else:
+                    pc += 1
+                    offset += 1
+                    continue
+
+        else:
+            assert code == OP_MATCH
+
+            for _ in stack:
+                names.pull()
+
+            if budget is not None:
+                budget.steps += mark - countdown
+
+            if matcher.counters is not None:
+                matcher.counters.engine('stack', initial - countdown, resumed)
+
+            return offset
+
+        # Failed so resume the latest alternative.
+
+        while True:
+            if not stack:
+                if budget is not None:
+                    budget.steps += mark - countdown
+
+                if matcher.counters is not None:
+                    steps = initial - countdown
+                    matcher.counters.engine('stack', steps, resumed)
+
+                raise Mismatch
+
+            alternative = stack.pop()
+            resumed += 1
+            names.undo()
+            length = alternative[2]
+
+            while len(trail) > length:
+                index, register = trail.pop()
+
+                if register is None:
+                    del registers[index]
+                else:
+                    registers[index] = register
+
+            if len(alternative) == 3:
+                pc, offset, _ = alternative
+                break
+
+            # Count the next end of a run like an alternative of a split.
+
+            pc, end, _, bound, step = alternative
+            countdown -= 1
+
+            if countdown == 0 and not program_binds(program):
+                memo = set()
+
+            if countdown == alarm:
+                budget.charge(mark - countdown, end)
+                mark = countdown
+                alarm = countdown - budget.allowance()
+
+            if step > 0:
+                item = program[pc][1]
+
+                if not single_match(value, end, item, leaf, literal):
+                    continue
+
+                end += 1
+
+                if end < bound:
+                    names.push()
+                    stack.append((pc, end, length, bound, 1))
+            elif end > bound:
+                names.push()
+                stack.append((pc, end - 1, length, bound, -1))
+
+            pc += 1
+            offset = end
+            break
+
+
+###############################################################################
+# Regular expression engine for text.
+###############################################################################
+
+def regex_pattern(pattern, text):
+    r"""Return `(regex, groups)` translating `pattern` for `text` values.
+
+    The `text` type is `str` or `bytes`. The `regex` is compiled by the `re`
+    module and `groups` is a list of `(group, name)` pairs mapping regex
+    group names to `Group` names.
+
+    Leaves must be single characters for `str` and integers in
+    `range(256)` for `bytes`, or `anyone`. Return None if `pattern` is not
+    supported. Named groups within repeats or excludes, names used twice,
+    nullable repeats, and repeats with bounds which are not integers are not
+    supported as their semantics differ.
+
+    >>> regex, groups = regex_pattern('a' + anything * group('rest'), str)
+    >>> regex.pattern
+    'a(?P<group0>(?:.)*)'
+    >>> groups
+    [('group0', 'rest')]
+    >>> regex_pattern([1, 2] + 3 * repeat, bytes)[0].pattern
+    b'\x01\x02(?:\x03)*'
+    >>> regex_pattern(['abc'], str) is None
+    True
+
+    """
+    groups = []
+    names = set()
+
+    def translate_leaf(item):
+        if isinstance(item, Anyone):
+            return '.'
+        if text is str:
+            if isinstance(item, str) and len(item) == 1:
+                return re.escape(item)
+        elif type(item) in (int, bool) and 0 <= item < 256:
+            return re.escape(chr(item))
+        raise ValueError
+
+    def translate(pattern, repeated, excluded):
+        parts = []
+
+        for item in pattern:
+            if isinstance(item, Repeat):
+                if (not int_bounds(item) or item.min > item.max
+                        or nullable(item.pattern)):
+                    raise ValueError
+
+                body = translate(item.pattern, True, excluded)
+
+                if item.max == infinity:
+                    count = '{%d,}' % item.min if item.min else '*'
+                else:
+                    count = '{%d,%d}' % (item.min, item.max)
+
+                lazy = '' if item.greedy else '?'
+                parts.append('(?:%s)%s%s' % (body, count, lazy))
+            elif isinstance(item, Group):
+                if item.name is None:
+                    body = translate(item.pattern, repeated, excluded)
+                    parts.append('(?:%s)' % body)
+                else:
+                    if repeated or excluded or item.name in names:
+                        raise ValueError
+
+                    names.add(item.name)
+                    group = 'group%d' % len(groups)
+                    groups.append((group, item.name))
+                    body = translate(item.pattern, repeated, excluded)
+                    parts.append('(?P<%s>%s)' % (group, body))
+            elif isinstance(item, Either):
+                options = [
+                    translate(option, repeated, excluded)
+                    for option in item.options
+                ]
+                parts.append('(?:%s)' % '|'.join(options) if options else '(?!)')
+            elif isinstance(item, Exclude):
+                options = [
+                    translate(option, repeated, True)
+                    for option in item.options
+                ]
+                if options:
+                    parts.append('(?!%s)' % '|'.join(options))
+                parts.append('.')
+            else:
+                parts.append(translate_leaf(item))
+
+        return ''.join(parts)
+
+    try:
+        source = translate(pattern, False, False)
+    except (TypeError, ValueError):
+        return None
+
+    if text is bytes:
+        source = source.encode('latin-1')
+
+    try:
+        regex = re.compile(source, re.DOTALL)
+    except (re.error, OverflowError):
+        return None
+
+    return regex, groups
+
+
+def regex_match(matcher, value, translation, start=0):
+    """Match `value` to `translation` from `regex_pattern`.
+
+    Named groups which participate in the match are stored in
+    `matcher.names` as `SliceView` objects.
+
+    Return end offset of the match from `start` else raise `Mismatch`.
+
+    >>> translation = regex_pattern(anything * group(1) + 'c', str)
+    >>> regex_match(matcher, 'abcd', translation)
+    3
+    >>> matcher.names[1]
+    SliceView('ab')
+    >>> matcher.names.reset()
+
+    """
+    regex, groups = translation
+    result = regex.match(value, start)
+
+    if matcher.counters is not None:
+        matcher.counters.engine('regex', 0, 0)
+
+    if result is None:
+        raise Mismatch
+
+    names = matcher.names
+
+    for group, name in groups:
+        begin, end = result.span(group)
+
+        if begin >= 0:
+            name_store(names, name, SliceView(value, begin, end))
+
+    return result.end()
+
+
+def nfa_stream(matcher, values, program, leaf):
+    """Match items of iterable `values` to `program` from `nfa_program`.
+
+    Items are read lazily and dropped once states advance past them. Only
+    the items needed to check `OP_EXCLUDE` options are buffered, so memory
+    is bounded by the program rather than the input.
+
+    Return number of items consumed when a match is first found else raise
+    `Mismatch`. Items after the match are not read.
+
+    >>> program = nfa_program(anyone * repeat + 'c')
+    >>> nfa_stream(matcher, iter('abcd'), program, matcher.visit)
+    3
+
+    """
+    # pylint: disable=too-many-branches,too-many-locals,too-many-statements
+    # pylint: disable=too-many-nested-blocks
+    iterator = iter(values)
+    window = deque()
+    exhausted = False
+    literal = literal_equality(matcher)
+
+    def available(count):
+        # Return True if `count` items remain, reading items as needed.
+
+        nonlocal exhausted
+
+        while len(window) < count and not exhausted:
+            try:
+                window.append(next(iterator))
+            except StopIteration:
+                exhausted = True
+
+        return len(window) >= count
+
+    def excluded(options):
+        for option in options:
+            if not available(len(option)):
+                continue
+
+            for item, iota in zip(window, option):
+                try:
+                    leaf(item, iota)
+                except Mismatch:
+                    break
+            else:
+                return True
+
+        return False
+
+    def follow(states, seen, start):
+        stack = [start]
+
+        while stack:
+            index = stack.pop()
+
+            if index in seen:
+                continue
+
+            seen.add(index)
+            op = program[index]
+            code = op[0]
+
+            if code == OP_SPLIT:
+                stack.append(op[2])
+                stack.append(op[1])
+            elif code == OP_JUMP:
+                stack.append(op[1])
+            elif code == OP_NOTEND:
+                if available(1):
+                    stack.append(index + 1)
+            elif code == OP_EXCLUDE:
+                if available(1) and not excluded(op[1]):
+                    states.append(index)
+            else:
+                states.append(index)
+
+    states = []
+    follow(states, set(), 0)
+    offset = 0
+    budget = matcher.budget
+
+    while states:
+        if budget is not None:
+            budget.charge(len(states), offset)
+
+        advanced = []
+
+        for index in states:
+            op = program[index]
+            code = op[0]
+
+            if code == OP_MATCH:
+                return offset
+
+            if not available(1):
+                continue
+
+            if code == OP_LEAF:
+                try:
+                    leaf(window[0], op[1])
+                except Mismatch:
+                    continue
+            elif code == OP_MEMBERS:
+                item = window[0]
+
+                if literal and type(item) in exact_literal_types:
+                    if item not in op[1]:
+                        continue
+                else:
+                    for iota in op[2]:
+                        try:
+                            leaf(item, iota)
+                        except Mismatch:
+                            continue
+                        break
+                    else:
+                        continue
+
+            advanced.append(index + 1)
+
+        if not advanced:
+            break
+
+        window.popleft()
+        offset += 1
+        states = []
+        seen = set()
+
+        for index in advanced:
+            follow(states, seen, index)
+
+    raise Mismatch
+
+
+def make_tuple(value):
+    """Return value as tuple.
+
+    >>> make_tuple((1, 2, 3))
+    (1, 2, 3)
+    >>> make_tuple('abc')
+    ('a', 'b', 'c')
+    >>> make_tuple([4, 5, 6])
+    (4, 5, 6)
+    >>> make_tuple(None)
+    (None,)
+
+    """
+    if isinstance(value, tuple):
+        return value
+    if isinstance(value, Sequence):
+        return tuple(value)
+    return (value,)
+
+
+class Pattern(APattern):
+    """Wrap tuple to extend addition operator.
+
+    >>> Pattern()
+    Pattern()
+    >>> Pattern([1, 2, 3])
+    Pattern(1, 2, 3)
+    >>> Pattern() + [1, 2, 3]
+    Pattern(1, 2, 3)
+    >>> None + Pattern()
+    Pattern(None)
+    >>> list(Pattern(4, 5, 6))
+    [4, 5, 6]
+
+    """
+    def __init__(self, *args):
+        self._details = make_tuple(args[0] if len(args) == 1 else args)
+
+    def __getitem__(self, index):
+        return self._details[index]
+
+    def __len__(self):
+        return len(self._details)
+
+    def __add__(self, that):
+        return Pattern(self._details + make_tuple(that))
+
+    def __radd__(self, that):
+        return Pattern(make_tuple(that) + self._details)
+
+    def __repr__(self):
+        args = ', '.join(repr(value) for value in self._details)
+        return '%s(%s)' % (type(self).__name__, args)
+
+
+class PatternMixin(APattern):
+    """Abstract base class to wrap a tuple to extend multiplication and
+    addition.
+
+    """
+    def __getitem__(self, index):
+        if index == 0:
+            return self
+        raise IndexError
+
+    def __len__(self):
+        return 1
+
+    def __add__(self, that):
+        return Pattern(self) + that
+
+    def __radd__(self, that):
+        return that + Pattern(self)
+
+    def __mul__(self, that):
+        return that.__rmul__(self)
+
+    def __getattr__(self, name):
+        if name == '_details':
+            raise AttributeError(name)
+        return getattr(self._details, name)
+
+    def __repr__(self):
+        pairs = zip(self._details.__slots__, self._details)
+        tokens = ('%s=%s' % (name, repr(value)) for name, value in pairs)
+        return '%s(%s)' % (type(self).__name__, ', '.join(tokens))
+
+
+###############################################################################
+# Match Case: anyone
+###############################################################################
+
+class Anyone(PatternMixin):
+    """Match any one thing.
+
+    >>> Anyone()
+    anyone
+    >>> match('blah', Anyone())
+    True
+    >>> anyone + [1, 2, 3]
+    Pattern(anyone, 1, 2, 3)
+    >>> (4, 5) + anyone + None
+    Pattern(4, 5, anyone, None)
+
+    """
+    def __init__(self):
+        self._details = ()
+
+    def __match__(self, matcher, value):
+        "Pass because `anyone` matches any one thing."
+        pass
+
+    def __repr__(self):
+        return 'anyone'
+
+anyone = Anyone()
+
+
+###############################################################################
+# Match Case: repeat
+###############################################################################
+
+def sequence(value):
+    """Return value as sequence.
+
+    >>> sequence('abc')
+    'abc'
+    >>> sequence(1)
+    (1,)
+    >>> sequence([1])
+    [1]
+
+    """
+    return value if isinstance(value, Sequence) else (value,)
+
+class _Repeat(Record):
+    __slots__ = 'pattern', 'min', 'max', 'greedy'
+
+class Repeat(PatternMixin):
+    """Pattern specifying repetition with min/max count and greedy parameters.
+
+    Inherits from `PatternMixin` which defines multiplication operators to
+    capture patterns.
+
+    >>> Repeat()
+    Repeat(pattern=(), min=0, max=inf, greedy=True)
+    >>> repeat = Repeat()
+    >>> repeat(max=1)
+    Repeat(pattern=(), min=0, max=1, greedy=True)
+    >>> maybe = repeat(max=1)
+    >>> Repeat(anyone)
+    Repeat(pattern=anyone, min=0, max=inf, greedy=True)
+    >>> anyone * repeat
+    Repeat(pattern=anyone, min=0, max=inf, greedy=True)
+    >>> anything = anyone * repeat
+    >>> anyone * repeat(min=1)
+    Repeat(pattern=anyone, min=1, max=inf, greedy=True)
+    >>> something = anyone * repeat(min=1)
+    >>> padding = anyone * repeat(greedy=False)
+
+    """
+    def __init__(self, pattern=(), min=0, max=infinity, greedy=True):
+        # pylint: disable=redefined-builtin
+        self._details = _Repeat(pattern, min, max, greedy)
+
+    def __rmul__(self, that):
+        return type(self)(sequence(that), *tuple(self._details)[1:])
+
+    def __call__(self, min=0, max=infinity, greedy=True, pattern=()):
+        # pylint: disable=redefined-builtin
+        return type(self)(pattern, min, max, greedy)
+
+repeat = Repeat()
+maybe = repeat(max=1)
+anything = anyone * repeat
+something = anyone * repeat(min=1)
+padding = anyone * repeat(greedy=False)
+
+
+###############################################################################
+# Match Case: groups
+###############################################################################
+
+class _Group(Record):
+    __slots__ = 'pattern', 'name'
+
+class Group(PatternMixin):
+    """Pattern specifying a group with name parameter.
+
+    Inherits from `PatternMixin` which defines multiplication operators to
+    capture patterns.
+
+    >>> Group()
+    Group(pattern=(), name=None)
+    >>> Group(['red', 'blue', 'yellow'], 'color')
+    Group(pattern=['red', 'blue', 'yellow'], name='color')
+    >>> group = Group()
+    >>> ['red', 'blue', 'yellow'] * group('color')
+    Group(pattern=['red', 'blue', 'yellow'], name='color')
+
+    """
+    def __init__(self, pattern=(), name=None):
+        self._details = _Group(pattern, name)
+
+    def __rmul__(self, that):
+        return type(self)(sequence(that), *tuple(self._details)[1:])
+
+    def __call__(self, name=None, pattern=()):
+        return type(self)(pattern, name)
+
+group = Group()
+
+
+###############################################################################
+# Match Case: options
+###############################################################################
+
+def literal_options(options):
+    """Return `(members, trie)` indexing `options` of literal items.
+
+    Literal items have exact types of `literal_types` and equal themselves
+    so hashing agrees with matching by equality. When every option is one
+    literal item, `members` is a frozenset of the items. When every option
+    is one or more literal items, `trie` is a `[index, children]` node where
+    `index` is the first option ending at the node, or None, and `children`
+    maps items to nodes. Otherwise both are None.
+
+    >>> literal_options([[1], [2]])
+    (frozenset({1, 2}), None)
+    >>> literal_options(['ab', 'a', 'ab'])
+    (None, [None, {'a': [1, {'b': [0, {}]}]}])
+    >>> literal_options([[1], [int]])
+    (None, None)
+
+    """
+    if not options:
+        return None, None
+
+    for option in options:
+        if not option:
+            return None, None
+
+        # Items unequal to themselves, like NaN, are not found by lookup.
+
+        for item in option:
+            # pylint: disable=comparison-with-itself
+            if type(item) not in exact_literal_types or item != item:
+                return None, None
+
+    if all(len(option) == 1 for option in options):
+        return frozenset(option[0] for option in options), None
+
+    trie = [None, {}]
+
+    for index, option in enumerate(options):
+        node = trie
+
+        for item in option:
+            node = node[1].setdefault(item, [None, {}])
+
+        if node[0] is None:
+            node[0] = index
+
+    return None, trie
+
+
+def trie_ends(trie, value, offset):
+    """Return end offsets of options in `trie` matching `value` at `offset`.
+
+    Ends are in the order of options like the matches of `Either` options
+    tried one by one. Return None if an item of `value` is not literal.
+
+    >>> _, trie = literal_options(['abc', 'a', 'ab'])
+    >>> trie_ends(trie, 'abcd', 0)
+    [3, 1, 2]
+    >>> trie_ends(trie, ['a', 'b', str], 0) is None
+    True
+
+    """
+    found = []
+    node = trie
+    len_value = len(value)
+
+    while True:
+        if node[0] is not None:
+            found.append((node[0], offset))
+
+        if offset >= len_value:
+            break
+
+        item = value[offset]
+
+        if type(item) not in exact_literal_types:
+            return None
+
+        node = node[1].get(item)
+
+        if node is None:
+            break
+
+        offset += 1
+
+    found.sort()
+    return [end for _, end in found]
+
+
+def literal_ends(item, value, offset):
+    """Return end offsets of options of `item` matching `value` at `offset`.
+
+    Use the index made by `literal_options`. Return None if the options are
+    not indexed or the items of `value` are not literal.
+
+    """
+    members = item._members
+
+    if members is not None:
+        if offset >= len(value):
+            return ()
+
+        iota = value[offset]
+
+        if type(iota) not in exact_literal_types:
+            return None
+
+        return (offset + 1,) if iota in members else ()
+
+    trie = item._trie
+
+    if trie is None:
+        return None
+
+    return trie_ends(trie, value, offset)
+
+
+def literal_equality(matcher):
+    """Return True if `matcher` matches literal items by equality.
+
+    Indexed options are only used with the default cases.
+
+    """
+    cases = matcher.cases
+    return cases is default_cases and cases.version == default_version
+
+
+class _Options(Record):
+    __slots__ = ('options',)
+
+class Options(PatternMixin):
+    """Pattern specifying a sequence of options to match.
+
+    Options of literal items are indexed when the pattern is created. See
+    `literal_options`.
+
+    """
+    def __init__(self, *options):
+        options = tuple(map(sequence, options))
+        self._details = _Options(options)
+        self._members, self._trie = literal_options(options)
+
+    def __setstate__(self, state):
+        self.__init__(*state.options)
+
+    def __call__(self, *options):
+        return type(self)(*options)
+
+    def __rmul__(self, that):
+        return type(self)(*sequence(that))
+
+    def __repr__(self):
+        args = ', '.join(map(repr, self._details.options))
+        return '%s(%s)' % (type(self).__name__, args)
+
+
+class Either(Options):
+    "Pattern specifying that any of options may match."
+    pass
+
+either = Either()
+
+
+class Exclude(Options):
+    "Pattern specifying that none of options may match."
+    pass
+
+exclude = Exclude()
+
+
+###############################################################################
+# Match Case: attributes
+###############################################################################
+
+def no_attrs(value):
+    "Return empty tuple of attributes of `value` for `Attrs` without names."
+    return ()
+
+
+class _Attrs(Record):
+    __slots__ = 'cls', 'names', 'patterns'
+
+class Attrs(PatternMixin):
+    """Pattern matching instances of `cls` with attributes matching patterns.
+
+    Attribute `names` are fetched by one `operator.attrgetter` made when the
+    pattern is created and matched to `patterns` in order. Other attributes
+    are not visited.
+
+    >>> Attrs(complex, ['real'], [1.0])
+    Attrs(complex, real=1.0)
+    >>> attrs = Attrs()
+    >>> attrs(complex, imag=bind.imag)
+    Attrs(complex, imag=Name('imag'))
+
+    """
+    def __init__(self, cls=object, names=(), patterns=()):
+        names = tuple(names)
+        self._details = _Attrs(cls, names, tuple(patterns))
+        self._getter = attrgetter(*names) if names else no_attrs
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def __call__(self, cls, *args, **kwargs):
+        """Return `Attrs` matching `cls` with positional and keyword patterns.
+
+        Positional patterns match attributes named by `cls.__match_args__`,
+        or the `_fields` of named tuples, in order.
+
+        >>> from collections import namedtuple
+        >>> Point = namedtuple('Point', 'x y')
+        >>> attrs(Point, 0, y=bind.y)
+        Attrs(Point, x=0, y=Name('y'))
+        >>> attrs(Point, 0, 1, 2)
+        Traceback (most recent call last):
+            ...
+        TypeError: Point accepts 2 positional patterns (3 given)
+
+        """
+        if args:
+            fields = getattr(cls, '__match_args__', None)
+
+            if fields is None:
+                fields = getattr(cls, '_fields', ())
+
+            if len(args) > len(fields):
+                message = '%s accepts %d positional patterns (%d given)'
+                raise TypeError(message % (cls.__name__, len(fields),
+                                           len(args)))
+
+            names = list(fields[:len(args)])
+        else:
+            names = []
+
+        for name in kwargs:
+            if name in names:
+                message = '%s got multiple patterns for attribute %r'
+                raise TypeError(message % (cls.__name__, name))
+            names.append(name)
+
+        patterns = list(args) + list(kwargs.values())
+        return type(self)(cls, names, patterns)
+
+    def __match__(self, matcher, value):
+        """Match `value` as instance of `cls` with attributes `names`
+        matching `patterns`.
+
+        Raise `Mismatch` if an attribute is missing.
+
+        >>> match(1 + 2j, attrs(complex, real=1.0, imag=bind.imag))
+        True
+        >>> bound.imag
+        2.0
+        >>> match(1 + 2j, attrs(complex, size=1))
+        False
+        >>> match(1, attrs(complex))
+        False
+
+        """
+        details = self._details
+
+        if not isinstance(value, details.cls):
+            raise Mismatch
+
+        try:
+            items = self._getter(value)
+        except AttributeError:
+            raise Mismatch from None
+
+        patterns = details.patterns
+
+        if len(patterns) == 1:
+            matcher.visit(items, patterns[0])
+        else:
+            visit = matcher.visit
+
+            for item, pattern in zip(items, patterns):
+                visit(item, pattern)
+
+    def __repr__(self):
+        details = self._details
+        pairs = zip(details.names, details.patterns)
+        args = [details.cls.__name__]
+        args.extend('%s=%r' % pair for pair in pairs)
+        return '%s(%s)' % (type(self).__name__, ', '.join(args))
+
+attrs = Attrs()
+
+
+###############################################################################
+# Building patterns.
+###############################################################################
+
+class PatternBuilder:
+    """Collect items of a `Pattern` in linear time.
+
+    Adding to a `Pattern` copies its items so building a pattern from n
+    pieces with `+` takes quadratic time. Builders extend a list instead
+    and make the pattern once.
+
+    >>> builder = PatternBuilder('ab')
+    >>> for item in [1, 2, anyone * repeat]:
+    ...     builder += item
+    >>> builder.build()
+    Pattern('a', 'b', 1, 2, Repeat(pattern=anyone, min=0, max=inf, greedy=True))
+
+    """
+    def __init__(self, items=()):
+        self._items = list(make_tuple(items))
+
+    def __iadd__(self, that):
+        self._items.extend(make_tuple(that))
+        return self
+
+    def append(self, item):
+        "Append one `item` even if it is a sequence."
+        self._items.append(item)
+
+    def __len__(self):
+        return len(self._items)
+
+    def build(self, intern=False):
+        """Return `Pattern` of items collected.
+
+        When `intern` is true, return `intern_pattern` of the pattern.
+
+        """
+        pattern = Pattern(tuple(self._items))
+        return intern_pattern(pattern) if intern else pattern
+
+
+interned_patterns = weakref.WeakValueDictionary()
+
+
+def intern_key(value):
+    """Return key identifying `value` with sub-patterns already interned.
+
+    Items are keyed with their type so `1` and `True` differ. Raise
+    `TypeError` if `value` is unhashable.
+
+    """
+    cls = type(value)
+
+    if isinstance(value, APattern):
+        return cls, id(value)
+    if cls is tuple:
+        return tuple, tuple(intern_key(item) for item in value)
+    hash(value)
+    return cls, value
+
+
+def intern_pattern(pattern):
+    """Return `pattern` with equal sub-patterns replaced by shared objects.
+
+    `Pattern`, `Repeat`, `Group`, `Either`, and `Exclude` objects are kept
+    in `interned_patterns` while in use. Shared objects share the programs
+    and regexes cached by `Matcher`. Patterns with unhashable items are
+    rebuilt but not shared.
+
+    >>> first = intern_pattern('a' + anything * group('x'))
+    >>> second = intern_pattern(Pattern('a') + anything * group('x'))
+    >>> first is second
+    True
+    >>> intern_pattern(Pattern(1)) is intern_pattern(Pattern(True))
+    False
+
+    """
+    cls = type(pattern)
+
+    if isinstance(pattern, Pattern):
+        fields = tuple(intern_pattern(item) for item in pattern)
+        node = Pattern(fields)
+    elif cls is tuple:
+        return tuple(intern_pattern(item) for item in pattern)
+    elif cls is Repeat:
+        fields = tuple(pattern._details)
+        fields = (intern_pattern(fields[0]),) + fields[1:]
+        node = Repeat(*fields)
+    elif cls is Group:
+        fields = intern_pattern(pattern.pattern), pattern.name
+        node = Group(*fields)
+    elif cls in (Either, Exclude):
+        fields = tuple(intern_pattern(option) for option in pattern.options)
+        node = cls(*fields)
+    else:
+        return pattern
+
+    try:
+        key = type(node), intern_key(fields)
+        return interned_patterns.setdefault(key, node)
+    except TypeError:
+        return node
+
+
+###############################################################################
+# Match Case: names
+###############################################################################
+
+class Name(Record):
+    """Name objects simply wrap a `value` to be used as a name.
+
+    >>> match([1, 2, 3], [Name('head'), 2, 3])
+    True
+    >>> bound.head == 1
+    True
+
+    """
+    __slots__ = ('value',)
+
+    def __match__(self, matcher, value):
+        "Store `value` in `matcher` with `name` and return `value`."
+        name_store(matcher.names, self.value, value)
+
+def name_store(names, name, value):
+    """Store `value` in `names` with given `name`.
+
+    If `name` is already present in `names` then raise `Mismatch` on inequality
+    between `value` and stored value.
+
+    """
+    if name in names:
+        if value == names[name]:
+            pass  # Prefer equality comparison to inequality.
+        else:
+            raise Mismatch
+    names[name] = value
+
+class Binder:
+    """Binder objects return Name objects on attribute lookup.
+
+    A few attributes behave specially:
+
+    * `bind.any` returns an `Anyone` object.
+    * `bind.push`, `bind.pop`, and `bind.reset` raise an AttributeError
+      because the names would conflict with `Bounder` attributes.
+    * Special names like `bind.__deepcopy__` raise an AttributeError so
+      `copy` and `pickle` work with `Binder` objects.
+
+    >>> bind = Binder()
+    >>> bind.head
+    Name('head')
+    >>> bind.tail
+    Name('tail')
+    >>> bind.any
+    anyone
+    >>> bind.push
+    Traceback (most recent call last):
+        ...
+    AttributeError
+
+    """
+    def __getattr__(self, name):
+        if name == 'any':
+            return anyone
+        if name in ('push', 'pop', 'reset'):
+            raise AttributeError
+        if name.startswith('__') and name.endswith('__'):
+            raise AttributeError(name)
+        return Name(name)
+
+bind = Binder()
+
+
+###############################################################################
+# Match Case: likes
+###############################################################################
+
+like_errors = (
+    AttributeError, LookupError, NotImplementedError, TypeError, ValueError
+)
+
+regex_type = type(re.compile(''))
+
+class RegexCache:
+    """Least-recently-used cache of compiled regular expressions.
+
+    At most `size` regexes are kept. Lookups are counted in `hits` and
+    `misses`. The cache may be shared by threads.
+
+    >>> cache = RegexCache(size=2)
+    >>> cache('a+').match('aaa').group()
+    'aaa'
+    >>> cache('a+') is cache('a+')
+    True
+    >>> cache.hits, cache.misses
+    (2, 1)
+    >>> _ = cache('b'), cache('c')
+    >>> list(cache)
+    ['b', 'c']
+
+    """
+    def __init__(self, size=1024):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._regexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, pattern):
+        "Return compiled regex for `pattern`."
+        regexes = self._regexes
+
+        with self._lock:
+            try:
+                regex = regexes[pattern]
+            except KeyError:
+                self.misses += 1
+                regex = regexes[pattern] = re.compile(pattern)
+
+                while len(regexes) > self.size:
+                    regexes.popitem(last=False)
+            else:
+                self.hits += 1
+                regexes.move_to_end(pattern)
+
+        return regex
+
+    def __iter__(self):
+        return iter(self._regexes)
+
+    def __len__(self):
+        return len(self._regexes)
+
+    def clear(self):
+        "Remove all regexes and reset counts."
+        with self._lock:
+            self._regexes.clear()
+            self.hits = self.misses = 0
+
+like_regexes = RegexCache()
+
+class Like(Record):
+    # pylint: disable=missing-docstring
+    __slots__ = 'pattern', 'name'
+
+    def __getstate__(self):
+        """Return state for pickling.
+
+        Raise `TypeError` if `pattern` is a lambda or local function as
+        `pickle` cannot find it by name. Use a module-level function.
+
+        >>> import pickle
+        >>> pickle.loads(pickle.dumps(like(len))) == like(len)
+        True
+        >>> pickle.dumps(like(lambda value: value))
+        Traceback (most recent call last):
+            ...
+        TypeError: cannot pickle Like with local function <lambda>
+
+        """
+        name = getattr(self.pattern, '__qualname__', '')
+
+        if '<lambda>' in name or '<locals>' in name:
+            message = 'cannot pickle Like with local function %s' % name
+            raise TypeError(message)
+
+        return super().__getstate__()
+
+    def __match__(self, matcher, value):
+        """Apply `pattern` to `value` and store result in `matcher`.
+
+        Given `pattern` is expected as `Like` instance and deconstructed by
+        attribute into `pattern` and `name`.
+
+        When `pattern` is text then it is used as a regular expression
+        compiled through `like_regexes`. Compiled regular expressions are
+        used as is.
+
+        When `name` is None then the result is not stored in `matcher.names`.
+
+        Raises `Mismatch` if callable raises exception in `like_errors` or
+        result is falsy.
+
+        >>> match('abcdef', like('abc.*'))
+        True
+        >>> match(123, like(lambda num: num % 2 == 0))
+        False
+
+        """
+        pattern = self.pattern
+        name = self.name
+
+        if isinstance(pattern, str):
+            if not isinstance(value, str):
+                raise Mismatch
+            func = like_regexes(pattern).match
+        elif isinstance(pattern, regex_type):
+            func = pattern.match
+        else:
+            func = pattern
+
+        try:
+            result = func(value)
+        except like_errors:
+            raise Mismatch
+
+        if not result:
+            raise Mismatch
+
+        if name is not None:
+            name_store(matcher.names, name, result)
+
+def like(pattern, name='match'):
+    """Return `Like` object with given `pattern` and `name`, default "match".
+
+    >>> like('abc.*')
+    Like('abc.*', 'match')
+    >>> like('abc.*', 'prefix')
+    Like('abc.*', 'prefix')
+
+    """
+    return Like(pattern, name)
+
+def like_any(*regexes, name='match'):
+    """Return `Like` object matching any of `regexes` in one scan.
+
+    The regexes are combined into one alternation with named groups "like0",
+    "like1", and so on. The `lastgroup` of the stored match names the first
+    regex which matched. Regexes must not use global inline flags or
+    repeat group names.
+
+    >>> pattern = like_any('[0-9]+', '[a-z]+', name='token')
+    >>> match('abc', pattern)
+    True
+    >>> bound.token.lastgroup
+    'like1'
+
+    """
+    groups = ('(?P<like%d>%s)' % pair for pair in enumerate(regexes))
+    return Like(like_regexes('|'.join(groups)), name)
+
+
+###############################################################################
+# Match Case: types
+###############################################################################
+
+def type_predicate(matcher, value, pattern):
+    "Return True if `pattern` is an instance of `type`."
+    return isinstance(pattern, type)
+
+def type_action(matcher, value, pattern):
+    """Match `value` as subclass or instance of `pattern`.
+
+    >>> match(1, int)
+    True
+    >>> match(True, bool)
+    True
+    >>> match(True, int)
+    True
+    >>> match(bool, int)
+    True
+    >>> match(0.0, int)
+    False
+    >>> match(float, int)
+    False
+
+    """
+    if isinstance(value, type) and issubclass(value, pattern):
+        return value
+    if isinstance(value, pattern):
+        return value
+    raise Mismatch
+
+default_cases.append(Case('types', type_predicate, type_action, 'pattern'))
+
+
+###############################################################################
+# Match Case: literals
+###############################################################################
+
+literal_types = (type(None), bool, int, float, complex, str, bytes)
+
+def literal_predicate(matcher, value, pattern):
+    "Return True if `value` and `pattern` instance of `literal_types`."
+    literal_pattern = isinstance(pattern, literal_types)
+    return literal_pattern and isinstance(value, literal_types)
+
+def literal_action(matcher, value, pattern):
+    """Match `value` as equal to `pattern`.
+
+    >>> match(1, 1)
+    True
+    >>> match('abc', 'abc')
+    True
+    >>> match(1, 1.0)
+    True
+    >>> match(1, True)
+    True
+
+    """
+    if value == pattern:
+        return value
+    raise Mismatch
+
+default_cases.append(
+    Case('literals', literal_predicate, literal_action, 'types')
+)
+
+
+###############################################################################
+# Match Case: mappings
+###############################################################################
+
+def mapping_predicate(matcher, value, pattern):
+    "Return True if `value` and `pattern` are instances of Mapping."
+    return isinstance(pattern, Mapping) and isinstance(value, Mapping)
+
+def mapping_items(matcher, value, pattern):
+    """Match items of `value` to items of `pattern` by key lookup.
+
+    Keys are looked up with `get` so mappings like `defaultdict` do not grow.
+    Other keys of `value` are not visited.
+
+    """
+    visit = matcher.visit
+
+    for key, item in pattern.items():
+        found = value.get(key, _missing)
+
+        if found is _missing:
+            raise Mismatch
+
+        visit(found, item)
+
+def mapping_action(matcher, value, pattern):
+    """Match `value` as having the keys of `pattern` with matching values.
+
+    >>> match({'a': 1, 'b': 'abc'}, {'a': int, 'b': bind.b})
+    True
+    >>> bound.b
+    'abc'
+    >>> match({'a': 1, 'b': 2}, {'a': 1})
+    False
+
+    """
+    if len(value) != len(pattern):
+        raise Mismatch
+
+    mapping_items(matcher, value, pattern)
+    return value
+
+default_cases.append(
+    Case('mappings', mapping_predicate, mapping_action, 'types')
+)
+
+
+class RestView(Mapping):
+    """Read-only view of mapping `value` without keys in `taken`.
+
+    Bound by `mapping` patterns with a `rest` name so the value is not
+    copied. Views equal mappings with equal items.
+
+    >>> view = RestView({'a': 1, 'b': 2, 'c': 3}, {'a': int})
+    >>> len(view), view['b'], sorted(view)
+    (2, 2, ['b', 'c'])
+    >>> view == {'b': 2, 'c': 3}
+    True
+    >>> 'a' in view
+    False
+
+    """
+    __slots__ = ('value', 'taken')
+
+    def __init__(self, value, taken):
+        self.value = value
+        self.taken = taken
+
+    def __len__(self):
+        value = self.value
+        return len(value) - sum(key in value for key in self.taken)
+
+    def __getitem__(self, key):
+        if key in self.taken:
+            raise KeyError(key)
+        return self.value[key]
+
+    def __iter__(self):
+        taken = self.taken
+        for key in self.value:
+            if key not in taken:
+                yield key
+
+    def copy(self):
+        "Return items of view as a dict."
+        return {key: self.value[key] for key in self}
+
+    def __reduce__(self):
+        return type(self), (self.value, frozenset(self.taken))
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, self.copy())
+
+
+class MappingPattern(Record):
+    # pylint: disable=missing-docstring
+    __slots__ = 'pattern', 'rest', 'strict'
+
+    def __match__(self, matcher, value):
+        """Match items of `value` to `pattern` by key lookup.
+
+        When `strict` then `value` may have no other keys. When `rest` is
+        not None then a `RestView` of the other items is stored in
+        `matcher` with name `rest`.
+
+        >>> match({'a': 1, 'b': 2}, mapping({'a': bind.a}))
+        True
+        >>> match({'a': 1, 'b': 2}, mapping({'a': bind.a}, strict=True))
+        False
+        >>> match({'a': 1, 'b': 2}, mapping({'a': 1}, rest='rest'))
+        True
+        >>> bound.rest
+        RestView({'b': 2})
+
+        """
+        if not isinstance(value, Mapping):
+            raise Mismatch
+
+        pattern = self.pattern
+
+        if self.strict and len(value) != len(pattern):
+            raise Mismatch
+
+        mapping_items(matcher, value, pattern)
+
+        if self.rest is not None:
+            name_store(matcher.names, self.rest, RestView(value, pattern))
+
+def mapping(pattern, rest=None, strict=False):
+    """Return `MappingPattern` matching items of mapping `pattern`.
+
+    Plain mappings used as patterns match only mappings with the same keys.
+    Mapping patterns are partial unless `strict` and may bind other items
+    to the name `rest`.
+
+    >>> mapping({'a': 1}, 'rest')
+    MappingPattern({'a': 1}, 'rest', False)
+
+    """
+    return MappingPattern(pattern, rest, strict)
+
+
+###############################################################################
+# Match Case: equality
+###############################################################################
+
+def equality_predicate(matcher, value, pattern):
+    "Return True if `value` equals `pattern`."
+    try:
+        return value == pattern
+    except Exception:  # pylint: disable=broad-except
+        return False
+
+def equality_action(matcher, value, pattern):
+    """Match `value` as equal to `pattern`.
+
+    >>> identity = lambda value: value
+    >>> match(identity, identity)
+    True
+    >>> match('abc', 'abc')
+    True
+    >>> match(1, 1.0)
+    True
+    >>> match(1, True)
+    True
+
+    """
+    return value
+
+default_cases.append(Case('equality', equality_predicate, equality_action))
+
+
+###############################################################################
+# Match Case: sequences
+###############################################################################
+
+def sequence_predicate(matcher, value, pattern):
+    """Return True if `pattern` is instance of Sequence and `value` is instance of
+    type of `pattern`.
+
+    """
+    return isinstance(pattern, Sequence) and isinstance(value, type(pattern))
+
+def sequence_action(matcher, value, pattern):
+    """Iteratively match items of `pattern` with `value` in sequence.
+
+    Return tuple of results of matches.
+
+    >>> match([0, 'abc', {}], [int, str, dict])
+    True
+    >>> match((0, True, bool), (0.0, 1, int))
+    True
+    >>> match([], ())
+    False
+
+    """
+    if len(value) != len(pattern):
+        raise Mismatch
+
+    pairs = zip(value, pattern)
+    return tuple(matcher.visit(item, iota) for item, iota in pairs)
+
+default_cases.append(
+    Case('sequences', sequence_predicate, sequence_action, 'types')
+)
+
+
+###############################################################################
+# Views of sequence segments.
+###############################################################################
+
+view_types = (bytes, bytearray, memoryview)
+
+
+class SliceView(Sequence):
+    """Read-only view of `value` from `start` to `stop` without copying.
+
+    Groups bind views while matching so that backtracking does not copy
+    segments. Views equal sequences with equal items.
+
+    >>> view = SliceView([0, 1, 2, 3, 4], 1, 4)
+    >>> len(view), view[0], view[-1], view[1:]
+    (3, 1, 3, [2, 3])
+    >>> view == [1, 2, 3]
+    True
+    >>> list(view)
+    [1, 2, 3]
+
+    """
+    __slots__ = ('value', 'start', 'stop')
+
+    def __init__(self, value, start, stop):
+        self.value = value
+        self.start = start
+        self.stop = stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, index):
+        start, stop = self.start, self.stop
+
+        if isinstance(index, slice):
+            begin, end, step = index.indices(stop - start)
+            return self.value[start + begin:start + end:step]
+
+        length = stop - start
+
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError('SliceView index out of range')
+
+        return self.value[start + index]
+
+    def __iter__(self):
+        value = self.value
+        for index in range(self.start, self.stop):
+            yield value[index]
+
+    def copy(self):
+        "Return segment of `value` as a slice."
+        return self.value[self.start:self.stop]
+
+    def __eq__(self, that):
+        if isinstance(that, SliceView):
+            if (that.value is self.value
+                    and that.start == self.start
+                    and that.stop == self.stop):
+                return True
+            that = that.copy()
+        return self.copy() == that
+
+    def __ne__(self, that):
+        return not self == that
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return type(self), (self.value, self.start, self.stop)
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, self.copy())
+
+
+###############################################################################
+# Store bound names in a stack.
+###############################################################################
+
+try:
+    from contextvars import ContextVar
+except ImportError:  # pragma: no cover
+    ContextVar = None
+
+class ThreadVar(threading.local):
+    """Thread-local variable like `contextvars.ContextVar`.
+
+    Used by `Bounder` where `contextvars` is not available.
+
+    >>> var = ThreadVar('var', default=0)
+    >>> var.get()
+    0
+    >>> var.set(1)
+    >>> var.get()
+    1
+
+    """
+    def __init__(self, name, default=None):
+        super().__init__()
+        self.name = name
+        self.value = default
+
+    def get(self):
+        # pylint: disable=missing-docstring
+        return self.value
+
+    def set(self, value):
+        # pylint: disable=missing-docstring
+        self.value = value
+
+class Bounder:
+    """Stack for storing names bound to values for `Matcher`.
+
+    The stack is local to the current context, like an asyncio task, or to
+    the current thread where `contextvars` is not available. Each context
+    sees the stack as it was when the context was copied and then its own
+    pushes and pops.
+
+    >>> Bounder()
+    Bounder([])
+    >>> bound = Bounder([{'foo': 0}])
+    >>> bound.foo
+    0
+    >>> len(bound)
+    1
+    >>> bound.pop()
+    {'foo': 0}
+    >>> len(bound)
+    0
+    >>> bound.push({'bar': 1})
+    >>> len(bound)
+    1
+
+    """
+    def __init__(self, maps=()):
+        # The stack is a linked list of `(mapping, below, length)` nodes so
+        # contexts share nodes and never change another context's stack.
+
+        var_type = ThreadVar if ContextVar is None else ContextVar
+        self._var = var_type('bound', default=None)
+
+        for mapping in maps:
+            self.push(mapping)
+
+    def _top(self):
+        node = self._var.get()
+        if node is None:
+            raise IndexError('empty stack')
+        return node[0]
+
+    def __getattr__(self, attr):
+        try:
+            return self._top()[attr]
+        except (IndexError, KeyError):
+            raise AttributeError(attr)
+
+    def __getitem__(self, key):
+        try:
+            return self._top()[key]
+        except IndexError:
+            raise KeyError(key)
+
+    def __eq__(self, that):
+        return self._top() == that
+
+    def __ne__(self, that):
+        return self._top() != that
+
+    def __iter__(self):
+        return iter(self._top())
+
+    def __len__(self):
+        node = self._var.get()
+        return 0 if node is None else node[2]
+
+    def push(self, mapping):
+        # pylint: disable=missing-docstring
+        node = self._var.get()
+        self._var.set((mapping, node, 1 if node is None else node[2] + 1))
+
+    def pop(self):
+        # pylint: disable=missing-docstring
+        node = self._var.get()
+        if node is None:
+            raise IndexError('pop from empty stack')
+        self._var.set(node[1])
+        return node[0]
+
+    def reset(self, func=None):
+        # pylint: disable=missing-docstring
+        if func is None:
+            self._var.set(None)
+        else:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                start = len(self)
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    while len(self) > start:
+                        self.pop()
+            return wrapper
+
+    def _maps(self):
+        maps = []
+        node = self._var.get()
+        while node is not None:
+            maps.append(node[0])
+            node = node[1]
+        return maps[::-1]
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, self._maps())
+
+
+class MatchResult:
+    """Names bound by `Matcher.match_result` for one successful match.
+
+    Names are read like `Bounder` attributes or items. Results are true even
+    without names.
+
+    >>> result = MatchResult({'head': 1, 'tail': [2, 3]})
+    >>> result.head, result['tail']
+    (1, [2, 3])
+    >>> result == {'head': 1, 'tail': [2, 3]}
+    True
+    >>> bool(MatchResult({}))
+    True
+
+    """
+    __slots__ = ('_names',)
+
+    def __init__(self, names):
+        self._names = names
+
+    def __getattr__(self, attr):
+        try:
+            return self._names[attr]
+        except KeyError:
+            raise AttributeError(attr) from None
+
+    def __getitem__(self, key):
+        return self._names[key]
+
+    def __contains__(self, key):
+        return key in self._names
+
+    def __eq__(self, that):
+        if isinstance(that, MatchResult):
+            that = that._names
+        return self._names == that
+
+    def __ne__(self, that):
+        return not self == that
+
+    __hash__ = None
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+    def __bool__(self):
+        return True
+
+    def __reduce__(self):
+        return type(self), (self._names,)
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, self._names)
+
+
+###############################################################################
+# Stack of mappings.
+###############################################################################
+
+class MapStack(Mapping):
+    # pylint: disable=missing-docstring
+    def __init__(self, maps=()):
+        self._maps = list(maps) or [{}]
+
+    def push(self):
+        # pylint: disable=missing-docstring
+        self._maps.append({})
+
+    def pull(self):
+        # pylint: disable=missing-docstring
+        _maps = self._maps
+        mapping = _maps.pop()
+        accumulator = _maps[-1]
+        accumulator.update(mapping)
+
+    def undo(self):
+        # pylint: disable=missing-docstring
+        return self._maps.pop()
+
+    def __getitem__(self, key):
+        for mapping in reversed(self._maps):
+            if key in mapping:
+                return mapping[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        self._maps[-1][key] = value
+
+    def __delitem__(self, key):
+        del self._maps[-1][key]
+
+    def pop(self, key, default=None):
+        # pylint: disable=missing-docstring
+        return self._maps[-1].pop(key, default)
+
+    def __iter__(self):
+        return iter(set().union(*self._maps))
+
+    def __len__(self):
+        return len(set().union(*self._maps))
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, self._maps)
+
+    def get(self, key, default=None):
+        # pylint: disable=missing-docstring
+        return self[key] if key in self else default
+
+    def __contains__(self, key):
+        return any(key in mapping for mapping in reversed(self._maps))
+
+    def __bool__(self):
+        return any(self._maps)
+
+    def copy(self):
+        # pylint: disable=missing-docstring
+        return dict(self)
+
+    def reset(self):
+        # pylint: disable=missing-docstring
+        del self._maps[1:]
+        self._maps[0].clear()
+
+
+###############################################################################
+# Mapping with undo trail.
+###############################################################################
+
+_missing = object()
+
+class TrailMap(Mapping):
+    """Mapping with `push`, `pull`, and `undo` like `MapStack`.
+
+    Values are kept in one dict. While marks are pushed, changes record the
+    previous value in a trail so `undo` restores the mapping at the last mark
+    and `pull` keeps the changes. Lookups are O(1) and `copy` is
+    O(bindings).
+
+    >>> names = TrailMap()
+    >>> names['a'] = 1
+    >>> names.push()
+    >>> names['a'], names['b'] = 2, 3
+    >>> names.copy() == {'a': 2, 'b': 3}
+    True
+    >>> names.undo()
+    >>> names
+    TrailMap({'a': 1})
+    >>> names.push()
+    >>> names['c'] = 4
+    >>> names.pull()
+    >>> sorted(names)
+    ['a', 'c']
+
+    """
+    __slots__ = '_map', '_trail', '_marks'
+
+    def __init__(self, mapping=()):
+        self._map = dict(mapping)
+        self._trail = []
+        self._marks = []
+
+    def push(self):
+        # pylint: disable=missing-docstring
+        self._marks.append(len(self._trail))
+
+    def pull(self):
+        # pylint: disable=missing-docstring
+        mark = self._marks.pop()
+
+        if not self._marks:
+            del self._trail[mark:]
+
+    def undo(self):
+        # pylint: disable=missing-docstring
+        mark = self._marks.pop()
+        _map = self._map
+        trail = self._trail
+
+        while len(trail) > mark:
+            key, value = trail.pop()
+
+            if value is _missing:
+                del _map[key]
+            else:
+                _map[key] = value
+
+    def __getitem__(self, key):
+        return self._map[key]
+
+    def __setitem__(self, key, value):
+        if self._marks:
+            self._trail.append((key, self._map.get(key, _missing)))
+        self._map[key] = value
+
+    def __delitem__(self, key):
+        if self._marks:
+            self._trail.append((key, self._map[key]))
+        del self._map[key]
+
+    def pop(self, key, default=None):
+        # pylint: disable=missing-docstring
+        if key not in self._map:
+            return default
+        value = self._map[key]
+        del self[key]
+        return value
+
+    def __iter__(self):
+        return iter(self._map)
+
+    def __len__(self):
+        return len(self._map)
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, self._map)
+
+    def get(self, key, default=None):
+        # pylint: disable=missing-docstring
+        return self._map.get(key, default)
+
+    def __contains__(self, key):
+        return key in self._map
+
+    def __bool__(self):
+        return bool(self._map)
+
+    def copy(self):
+        # pylint: disable=missing-docstring
+        return self._map.copy()
+
+    def reset(self):
+        # pylint: disable=missing-docstring
+        self._map.clear()
+        del self._trail[:]
+        del self._marks[:]
+
+
+###############################################################################
+# Compiled patterns.
+###############################################################################
+
+def typed_attributes(pattern):
+    """Return True if attributes of `pattern` are decided by its type.
+
+    Classes differ in attributes though their type is the same. Instances
+    with a `__dict__` or types with `__getattr__` may differ too unless the
+    type defines `__match__`.
+
+    >>> typed_attributes(0), typed_attributes(anyone), typed_attributes(bind)
+    (True, True, False)
+    >>> typed_attributes(int)
+    False
+
+    """
+    if isinstance(pattern, type):
+        return False
+
+    cls = type(pattern)
+
+    if hasattr(cls, '__match__'):
+        return True
+
+    return not (hasattr(pattern, '__dict__') or hasattr(cls, '__getattr__'))
+
+
+def compile_check(matcher, pattern):
+    """Return function to match a value to `pattern` like `Matcher.visit`.
+
+    The case plan from `Matcher.plan` is decided once per type of value and
+    decided again when `Matcher.cases` changes. Actions are specialized where
+    possible using `action_compilers`.
+
+    >>> check = compile_check(matcher, [int, 2])
+    >>> check([1, 2])
+    (1, 2)
+    >>> check([1, 3])
+    Traceback (most recent call last):
+        ...
+    patternmatching.Mismatch
+
+    """
+    plans = {}
+    actions = {}
+    cases = version = None
+
+    def compile_action(action):
+        try:
+            return actions[action]
+        except KeyError:
+            factory = action_compilers.get(action)
+
+            if factory is None:
+                def func(value):
+                    return action(matcher, value, pattern)
+            else:
+                func = factory(matcher, pattern)
+
+            actions[action] = func
+            return func
+
+    def make_plan(value):
+        return [
+            (predicate, compile_action(action))
+            for predicate, action in matcher.plan(value, pattern)
+        ]
+
+    def check(value):
+        nonlocal cases, version
+
+        if matcher._watched:
+            budget = matcher._local.budget
+
+            if budget is not None:
+                budget.tick()
+
+        if matcher._cases is not cases or cases_version(cases) != version:
+            plans.clear()
+            cases = matcher._cases
+            version = cases_version(cases)
+
+        try:
+            plan = plans[type(value)]
+        except KeyError:
+            plan = plans[type(value)] = make_plan(value)
+
+        for predicate, func in plan:
+            if predicate is None or predicate(matcher, value, pattern):
+                return func(value)
+
+        raise Mismatch
+
+    return check
+
+
+def compile_leaves(matcher, pattern, checks):
+    """Store compiled checks for leaf items of `pattern` in `checks`.
+
+    Leaf items are those matched by calling `Matcher.visit` in
+    `pattern_match`. Checks are keyed by `id` because items may be unhashable
+    and stored with the item to keep the `id` valid.
+
+    """
+    for item in pattern:
+        if isinstance(item, (Repeat, Group)):
+            compile_leaves(matcher, item.pattern, checks)
+        elif isinstance(item, (Either, Exclude)):
+            for option in item.options:
+                compile_leaves(matcher, option, checks)
+        elif id(item) not in checks:
+            checks[id(item)] = item, compile_check(matcher, item)
+
+
+def compile_program(matcher, program):
+    """Return copy of `program` with leaf items replaced by compiled checks.
+
+    Use `call_check` as the leaf function when matching the copy.
+
+    """
+    def check(item):
+        return compile_check(matcher, item)
+
+    compiled = []
+
+    for op in program:
+        if op[0] == OP_LEAF:
+            op = OP_LEAF, check(op[1])
+        elif op[0] == OP_MEMBERS:
+            op = OP_MEMBERS, op[1], [check(item) for item in op[2]]
+        elif op[0] == OP_EXCLUDE:
+            op = OP_EXCLUDE, [[check(item) for item in option]
+                              for option in op[1]], op[2]
+        compiled.append(op)
+
+    return compiled
+
+
+def call_check(value, check):
+    "Leaf function for programs from `compile_program`."
+    return check(value)
+
+
+def compile_match(matcher, pattern):
+    "Return function specializing `match_action` for `pattern`."
+    if not typed_attributes(pattern):
+        return lambda value: match_action(matcher, value, pattern)
+
+    if type(pattern).__match__ is APattern.__match__:
+        checks = {}
+        compile_leaves(matcher, pattern, checks)
+        program = nfa_program(pattern)
+        closures = None
+
+        if program is not None:
+            closures = nfa_closures(program)
+            program = compile_program(matcher, program)
+
+        def leaf(value, item):
+            try:
+                _, check = checks[id(item)]
+            except KeyError:
+                return matcher.visit(value, item)
+            return check(value)
+
+        def check(value):
+            if program is not None and matcher.engine in ('auto', 'nfa'):
+                end = nfa_match(matcher, value, program, call_check, closures)
+                return matcher.capture(value, 0, end)
+
+            return pattern_match(matcher, value, pattern, leaf)
+
+        return check
+
+    match = type(pattern).__match__
+
+    if isinstance(pattern, Name) and match is Name.__match__:
+        name = pattern.value
+        return lambda value: name_store(matcher.names, name, value)
+
+    if isinstance(pattern, Anyone) and match is Anyone.__match__:
+        return lambda value: None
+
+    if isinstance(pattern, Attrs) and match is Attrs.__match__:
+        return compile_attrs(matcher, pattern)
+
+    attr = getattr(pattern, '__match__')
+    return lambda value: attr(matcher, value)
+
+
+def compile_sequence(matcher, pattern):
+    "Return function specializing `sequence_action` for `pattern`."
+    checks = [compile_check(matcher, item) for item in pattern]
+    len_pattern = len(checks)
+
+    def check(value):
+        if len(value) != len_pattern:
+            raise Mismatch
+        return tuple(func(item) for func, item in zip(checks, value))
+
+    return check
+
+
+def compile_attrs(matcher, pattern):
+    "Return function specializing `Attrs.__match__` for `pattern`."
+    cls = pattern.cls
+    getter = pattern._getter
+    checks = [compile_check(matcher, item) for item in pattern.patterns]
+
+    def check(value):
+        if not isinstance(value, cls):
+            raise Mismatch
+
+        try:
+            items = getter(value)
+        except AttributeError:
+            raise Mismatch from None
+
+        if len(checks) == 1:
+            checks[0](items)
+        else:
+            for func, item in zip(checks, items):
+                func(item)
+
+    return check
+
+
+def compile_mapping(matcher, pattern):
+    "Return function specializing `mapping_action` for `pattern`."
+    checks = [(key, compile_check(matcher, item))
+              for key, item in pattern.items()]
+    len_pattern = len(checks)
+
+    def check(value):
+        if len(value) != len_pattern:
+            raise Mismatch
+
+        for key, func in checks:
+            found = value.get(key, _missing)
+
+            if found is _missing:
+                raise Mismatch
+
+            func(found)
+
+        return value
+
+    return check
+
+
+action_compilers = {
+    match_action: compile_match,
+    sequence_action: compile_sequence,
+    mapping_action: compile_mapping,
+}
+
+
+class Compiled:
+    """Pattern compiled by `Matcher.compile` for repeated matching.
+
+    Results and bound names are the same as `Matcher.match`. Plans are cached
+    by `Matcher.visit` too, so compiling pays off mainly for `Pattern` objects
+    matched to long values, where the states of `nfa_match` are precomputed
+    with `nfa_closures`.
+
+    >>> compiled = compile([1, bind.middle, 3])
+    >>> compiled
+    Compiled([1, Name('middle'), 3])
+    >>> compiled.match([1, 2, 3])
+    True
+    >>> bound.middle
+    2
+    >>> compiled.match([1, 2, 4])
+    False
+
+    """
+    __slots__ = 'matcher', 'pattern', 'check'
+
+    def __init__(self, matcher, pattern):
+        self.matcher = matcher
+        self.pattern = pattern
+        self.check = compile_check(matcher, pattern)
+
+    def match(self, value, max_steps=None, timeout=None):
+        """Return True if `value` matches compiled pattern.
+
+        Limits are applied as by `Matcher.match`.
+
+        """
+        matcher = self.matcher
+        names = matcher.names
+        budget = matcher.limit(max_steps, timeout)
+        try:
+            self.check(value)
+        except Mismatch:
+            return False
+        else:
+            matcher.bound.push(matcher.bindings())
+        finally:
+            names.reset()
+            matcher.unlimit(budget)
+        return True
+
+    def match_result(self, value, max_steps=None, timeout=None):
+        """Return `MatchResult` if `value` matches compiled pattern else None.
+
+        Limits are applied as by `Matcher.match`.
+
+        """
+        matcher = self.matcher
+        names = matcher.names
+        budget = matcher.limit(max_steps, timeout)
+        try:
+            self.check(value)
+        except Mismatch:
+            return None
+        else:
+            return MatchResult(matcher.bindings())
+        finally:
+            names.reset()
+            matcher.unlimit(budget)
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, self.pattern)
 
 
 ###############################################################################
-# Store bound names in a stack.
+# Dispatch tables.
 ###############################################################################
 
-class Bounder:
-    """Stack for storing names bound to values for `Matcher`.
+default_version = default_cases.version
+exact_literal_types = frozenset(literal_types)
+exact_sequence_types = frozenset((list, tuple))
 
-    >>> Bounder()
-    Bounder([])
-    >>> bound = Bounder([{'foo': 0}])
-    >>> bound.foo
-    0
-    >>> len(bound)
-    1
-    >>> bound.pop()
-    {'foo': 0}
-    >>> len(bound)
-    0
-    >>> bound.push({'bar': 1})
-    >>> len(bound)
-    1
+
+def dispatch_kind(pattern):
+    """Return kind of `pattern` for indexing by `Table` with default cases.
+
+    * "literal" -- exact literal type, matched by equality.
+    * "sequence" -- list or tuple, matched only by values of the same length
+      and equal first literal item when the value is a list or tuple.
+    * "type" -- class matched by `isinstance` or `issubclass`.
+    * "general" -- anything else, tried for every value.
+
+    >>> [dispatch_kind(pattern) for pattern in (0, 'abc', [1, 2], int, like)]
+    ['literal', 'literal', 'sequence', 'type', 'general']
 
     """
-    def __init__(self, maps=()):
-        self._maps = list(maps)
+    cls = type(pattern)
 
-    def __getattr__(self, attr):
-        try:
-            return self._maps[-1][attr]
-        except (IndexError, KeyError):
-            raise AttributeError(attr)
+    if cls in exact_literal_types:
+        return 'literal'
 
-    def __getitem__(self, key):
+    if hasattr(pattern, '__match__'):
+        return 'general'
+
+    if isinstance(pattern, type):
+        return 'type' if cls in (type, ABCMeta) else 'general'
+
+    for base in exact_sequence_types:
+        if (isinstance(pattern, base) and cls.__eq__ is base.__eq__
+                and cls.__len__ is base.__len__):
+            return 'sequence'
+
+    return 'general'
+
+
+def type_candidate(cls, pattern):
+    """Return True if values of type `cls` may match the type `pattern`.
+
+    Values which are classes or whose types define `__class__` may match
+    regardless of `cls`.
+
+    >>> type_candidate(bool, int), type_candidate(str, int)
+    (True, False)
+
+    """
+    if issubclass(cls, type) or issubclass(cls, pattern):
+        return True
+
+    return any('__class__' in vars(base) for base in cls.__mro__[:-1])
+
+
+class Table:
+    """Patterns with handlers dispatched by `Matcher.table`.
+
+    Like an `if`/`elif` chain of `Matcher.match` calls, `match` returns the
+    handler of the first pattern matching a value and stores bound names.
+    With the default cases, patterns are indexed by kind (see
+    `dispatch_kind`) so only candidates for the type, literal value, or
+    length and first item of the value are tried, in their original order.
+
+    >>> table = Table(matcher, [
+    ...     (0, 'zero'),
+    ...     ([bind.head, bind.tail], 'pair'),
+    ...     (str, 'text'),
+    ...     (anyone, 'other'),
+    ... ])
+    >>> table.match(0)
+    'zero'
+    >>> table.match([1, 2])
+    'pair'
+    >>> bound.tail
+    2
+    >>> table.match('abc'), table.match(1.5)
+    ('text', 'other')
+
+    """
+    __slots__ = (
+        'matcher', 'rules', 'kinds', 'checks', 'literals', 'lengths',
+        'candidates',
+    )
+
+    def __init__(self, matcher, rules):
+        self.matcher = matcher
+        self.rules = rules = [tuple(rule) for rule in rules]
+        self.kinds = [dispatch_kind(pattern) for pattern, _ in rules]
+        self.checks = [compile_check(matcher, pattern) for pattern, _ in rules]
+        self.literals = {}
+        self.lengths = set()
+        self.candidates = {}
+
+        for (pattern, _), kind in zip(rules, self.kinds):
+            if kind == 'literal':
+                self.literals.setdefault(pattern, len(self.literals))
+            elif kind == 'sequence':
+                self.lengths.add(len(pattern))
+
+                if pattern and type(pattern[0]) in exact_literal_types:
+                    self.literals.setdefault(pattern[0], len(self.literals))
+
+    def select(self, cls, bucket):
+        """Return indexes of rules which may match values of type `cls`.
+
+        The `bucket` is the number of the equal literal in `literals` for
+        literal values, a pair of the length and the number of the equal
+        first literal item (-1 if none, None if not a literal) for list and
+        tuple values, or None.
+
+        """
+        indexes = []
+        literal = cls in exact_literal_types
+        sequence = cls in exact_sequence_types
+
+        for index, (pattern, _) in enumerate(self.rules):
+            kind = self.kinds[index]
+
+            if kind == 'literal':
+                if literal:
+                    if self.literals[pattern] != bucket:
+                        continue
+                elif sequence:
+                    continue
+            elif kind == 'sequence':
+                if literal:
+                    continue
+
+                if sequence:
+                    if bucket is None:
+                        continue
+
+                    length, first = bucket
+
+                    if len(pattern) != length:
+                        continue
+
+                    if (first is not None and length
+                            and type(pattern[0]) in exact_literal_types
+                            and self.literals[pattern[0]] != first):
+                        continue
+            elif kind == 'type':
+                if not type_candidate(cls, pattern):
+                    continue
+
+            indexes.append(index)
+
+        return tuple(indexes)
+
+    def match(self, value, max_steps=None, timeout=None):
+        """Return handler of first rule whose pattern matches `value`.
+
+        Return None if no pattern matches. Limits are applied as by
+        `Matcher.match` to all the rules tried together.
+
+        """
+        matcher = self.matcher
+        budget = matcher.limit(max_steps, timeout)
         try:
-            return self._maps[-1][key]
-        except IndexError:
-            raise KeyError(key)
+            return self.dispatch(value)
+        finally:
+            matcher.unlimit(budget)
 
-    def __eq__(self, that):
-        return self._maps[-1] == that
+    def dispatch(self, value):
+        "Return handler of first rule whose pattern matches `value`."
+        matcher = self.matcher
+        cases = matcher._cases
 
-    def __ne__(self, that):
-        return self._maps[-1] != that
+        if cases is default_cases and cases.version == default_version:
+            cls = type(value)
 
-    def __iter__(self):
-        return iter(self._maps[-1])
+            if cls in exact_literal_types:
+                bucket = self.literals.get(value)
+            elif cls in exact_sequence_types:
+                length = len(value)
+                bucket = None
 
-    def __len__(self):
-        return len(self._maps)
+                if length in self.lengths:
+                    first = None
 
-    def push(self, mapping):
-        # pylint: disable=missing-docstring
-        self._maps.append(mapping)
+                    if length and type(value[0]) in exact_literal_types:
+                        first = self.literals.get(value[0], -1)
 
-    def pop(self):
-        # pylint: disable=missing-docstring
-        return self._maps.pop()
+                    bucket = length, first
+            else:
+                bucket = None
 
-    def reset(self, func=None):
-        # pylint: disable=missing-docstring
-        if func is None:
-            del self._maps[:]
+            key = cls, bucket
+
+            try:
+                indexes = self.candidates[key]
+            except KeyError:
+                indexes = self.candidates[key] = self.select(cls, bucket)
         else:
-            @wraps(func)
-            def wrapper(*args, **kwargs):
-                start = len(self._maps)
-                try:
-                    return func(*args, **kwargs)
-                finally:
-                    while len(self._maps) > start:
-                        self.pop()
-            return wrapper
+            indexes = range(len(self.rules))
+
+        names = matcher.names
+        checks = self.checks
+
+        for index in indexes:
+            try:
+                checks[index](value)
+            except Mismatch:
+                names.reset()
+                continue
+
+            matcher.bound.push(matcher.bindings())
+            names.reset()
+            return self.rules[index][1]
+
+        return None
 
     def __repr__(self):
-        return '%s(%r)' % (type(self).__name__, self._maps)
+        return '%s(%r)' % (type(self).__name__, self.rules)
 
 
 ###############################################################################
-# Stack of mappings.
+# Searching sequences.
 ###############################################################################
 
-class MapStack(Mapping):
-    # pylint: disable=missing-docstring
-    def __init__(self, maps=()):
-        self._maps = list(maps) or [{}]
+class SearchResult(MatchResult):
+    """Names bound by `Matcher.search` with `start` and `end` offsets.
 
-    def push(self):
-        # pylint: disable=missing-docstring
-        self._maps.append({})
+    Names "start" and "end" are read as items.
 
-    def pull(self):
-        # pylint: disable=missing-docstring
-        _maps = self._maps
-        mapping = _maps.pop()
-        accumulator = _maps[-1]
-        accumulator.update(mapping)
+    >>> result = SearchResult({'end': 0}, 2, 5)
+    >>> result.start, result.end, result['end']
+    (2, 5, 0)
 
-    def undo(self):
-        # pylint: disable=missing-docstring
-        return self._maps.pop()
+    """
+    __slots__ = 'start', 'end'
 
-    def __getitem__(self, key):
-        for mapping in reversed(self._maps):
-            if key in mapping:
-                return mapping[key]
-        raise KeyError(key)
+    def __init__(self, names, start, end):
+        super().__init__(names)
+        self.start = start
+        self.end = end
 
-    def __setitem__(self, key, value):
-        self._maps[-1][key] = value
+    def __reduce__(self):
+        return type(self), (self._names, self.start, self.end)
 
-    def __delitem__(self, key):
-        del self._maps[-1][key]
+    def __repr__(self):
+        args = type(self).__name__, self._names, self.start, self.end
+        return '%s(%r, %r, %r)' % args
 
-    def pop(self, key, default=None):
-        # pylint: disable=missing-docstring
-        return self._maps[-1].pop(key, default)
 
-    def __iter__(self):
-        return iter(set().union(*self._maps))
+def literal_prefix(pattern):
+    """Return tuple of leading items of `pattern` with exact literal types.
+
+    >>> literal_prefix('ab' + anyone + 'c')
+    ('a', 'b')
+    >>> literal_prefix([1, 2.0, int, 3])
+    (1, 2.0)
+
+    """
+    prefix = []
+
+    for item in pattern:
+        if type(item) not in exact_literal_types:
+            break
+        prefix.append(item)
+
+    return tuple(prefix)
+
+
+def skip_table(prefix):
+    """Return Horspool table of shifts for items of `prefix`.
+
+    Each item but the last maps to its distance from the end of `prefix`.
+
+    >>> skip_table((1, 2, 1, 3)) == {1: 1, 2: 2}
+    True
+
+    """
+    last = len(prefix) - 1
+    return {item: last - index for index, item in enumerate(prefix[:-1])}
+
+
+def prefix_finder(value, prefix):
+    """Return function to find offsets where `value` may start with `prefix`.
+
+    The function is called with an offset and returns the first offset at or
+    after it where the items of `value` equal the items of `prefix`, or -1.
+    Text uses `str.find` or `bytes.find` and other sequences a Horspool skip
+    table.
+
+    >>> find = prefix_finder([0, 1, 2, 1, 2], (1, 2))
+    >>> find(0), find(2), find(4)
+    (1, 3, -1)
+
+    """
+    length = len(prefix)
+
+    if isinstance(value, str):
+        if all(isinstance(item, str) and len(item) == 1 for item in prefix):
+            text = ''.join(prefix)
+            return lambda start: value.find(text, start)
+    elif isinstance(value, (bytes, bytearray)):
+        if all(isinstance(item, int) and 0 <= item < 256 for item in prefix):
+            data = bytes(prefix)
+            return lambda start: value.find(data, start)
+
+    table = skip_table(prefix)
+    len_value = len(value)
+
+    def equal(item, iota):
+        try:
+            return bool(item == iota)
+        except Exception:  # pylint: disable=broad-except
+            return False
+
+    def find(start):
+        if not length:
+            return start if start <= len_value else -1
+
+        while start + length <= len_value:
+            index = length - 1
+
+            while index >= 0 and equal(value[start + index], prefix[index]):
+                index -= 1
+
+            if index < 0:
+                return start
+
+            item = value[start + length - 1]
+
+            if type(item) in exact_literal_types:
+                start += table.get(item, length)
+            else:
+                start += 1
+
+        return -1
+
+    return find
+
+
+###############################################################################
+# Matching arrays.
+###############################################################################
+
+array_kinds = {
+    'b': bool, 'i': int, 'u': int, 'f': float, 'c': complex,
+    'U': str, 'S': bytes,
+}
+
+number_types = (bool, int, float, complex)
+
+
+def vectorized(func):
+    """Mark `func` as safe to call with arrays by `Matcher.match_array`.
+
+    Marked functions are called once with an array of values and return an
+    array of results as if called with each value. NumPy ufuncs are safe
+    without marking.
+
+    >>> is_even = vectorized(lambda num: num % 2 == 0)
+    >>> is_even.vectorized
+    True
+
+    """
+    func.vectorized = True
+    return func
+
+
+def plan_action(matcher, value, pattern):
+    """Return action `matcher` applies to types of `value` and `pattern`.
+
+    Return None if the action may depend on the value itself.
+
+    """
+    for predicate, action in matcher.plan(value, pattern):
+        if predicate is None:
+            return action
+        if predicate is not match_predicate:
+            return None
+        if match_predicate(matcher, value, pattern):
+            return action
+    return None
+
+
+def either_items(pattern):
+    "Return items of `Either` pattern of single items else None."
+    if not (isinstance(pattern, Either)
+            and type(pattern).__match__ is APattern.__match__):
+        return None
+
+    options = pattern.options
+
+    if not options or any(len(option) != 1 for option in options):
+        return None
+
+    return [option[0] for option in options]
+
+
+def array_mask(numpy, matcher, values, pattern):
+    """Return `(mask, captures)` for flat array `values` or None.
+
+    Literals, types, `Either` patterns of those, and `Like` patterns of
+    vectorized functions are tested with array operations. Return None if
+    `pattern` needs matching one value at a time.
+
+    """
+    # pylint: disable=too-many-return-statements
+    kind = array_kinds.get(values.dtype.kind)
+
+    if kind is None:
+        return None
+
+    if (isinstance(pattern, type) and literal_equality(matcher)
+            and not hasattr(pattern, '__match__')):
+        return numpy.full(values.shape, issubclass(kind, pattern)), {}
+
+    sample = kind()
+    action = plan_action(matcher, sample, pattern)
+
+    if action is literal_action:
+        if isinstance(pattern, number_types) and kind in number_types:
+            pass
+        elif isinstance(pattern, kind) and kind in (str, bytes):
+            pass
+        else:
+            return numpy.zeros(values.shape, bool), {}
+
+        try:
+            mask = numpy.asarray(values == pattern, bool)
+        except (TypeError, OverflowError):
+            return None
+
+        return (mask, {}) if mask.shape == values.shape else None
+
+    items = either_items(pattern)
+
+    if items is not None and not binds(pattern):
+        mask = numpy.zeros(values.shape, bool)
+
+        for item in items:
+            result = array_mask(numpy, matcher, values, item)
+
+            if result is None:
+                return None
+
+            mask |= result[0]
+
+        return mask, {}
+
+    if (action is match_action and isinstance(pattern, Like)
+            and type(pattern).__match__ is Like.__match__):
+        func = pattern.pattern
+
+        if not (isinstance(func, numpy.ufunc)
+                or getattr(func, 'vectorized', False)):
+            return None
+
+        try:
+            results = numpy.asarray(func(values))
+            mask = results.astype(bool)
+        except Exception:  # pylint: disable=broad-except
+            return None
+
+        if results.shape != values.shape:
+            return None
+
+        name = pattern.name
+        return mask, ({} if name is None else {name: results})
+
+    return None
+
+
+###############################################################################
+# Matching statistics.
+###############################################################################
+
+class MatchStats:
+    """Counters collected by `Matcher` while stats are enabled.
 
-    def __len__(self):
-        return len(set().union(*self._maps))
+    See `Matcher.enable_stats` for what is counted.
 
-    def __repr__(self):
-        return '%s(%r)' % (type(self).__name__, self._maps)
+    """
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self, timing=False):
+        self.timing = timing
+        self.actions = (None, None, {})
+        self.reset()
 
-    def get(self, key, default=None):
+    def reset(self):
+        "Set all counters to zero."
+        # pylint: disable=attribute-defined-outside-init
+        self.calls = Counter()
+        self.hits = Counter()
+        self.times = Counter()
+        self.mismatches = 0
+        self.names = Counter()
+        self.engines = Counter()
+        self.steps = Counter()
+        self.backtracks = Counter()
+
+    def case_names(self, cases):
+        """Return dict of `Case` names by action for `cases`.
+
+        The dict is kept until `cases` changes.
+
+        """
+        previous, version, names = self.actions
+
+        if previous is not cases or version != cases_version(cases):
+            names = {case.action: case.name for case in reversed(cases)}
+            self.actions = cases, cases_version(cases), names
+
+        return names
+
+    def engine(self, name, steps, backtracks):
+        "Count one run of engine `name` with `steps` and `backtracks`."
+        self.engines[name] += 1
+        self.steps[name] += steps
+        self.backtracks[name] += backtracks
+
+    def as_dict(self):
+        "Return counters as a dict of plain dicts and numbers."
+        cases = {}
+
+        for name in set(self.calls) | set(self.hits):
+            cases[name] = {'calls': self.calls[name], 'hits': self.hits[name]}
+
+            if self.timing:
+                cases[name]['time'] = self.times[name]
+
+        engines = {
+            name: {
+                'runs': self.engines[name],
+                'steps': self.steps[name],
+                'backtracks': self.backtracks[name],
+            }
+            for name in self.engines
+        }
+
+        return {
+            'cases': cases,
+            'mismatches': self.mismatches,
+            'names': dict(self.names),
+            'engines': engines,
+        }
+
+
+def counted_names(names_type, counters):
+    "Return subclass of `names_type` counting operations in `counters`."
+    class CountedNames(names_type):
         # pylint: disable=missing-docstring
-        return self[key] if key in self else default
+        __slots__ = ()
 
-    def __contains__(self, key):
-        return any(key in mapping for mapping in reversed(self._maps))
+        def push(self):
+            counters.names['push'] += 1
+            super().push()
 
-    def __bool__(self):
-        return any(self._maps)
+        def pull(self):
+            counters.names['pull'] += 1
+            super().pull()
 
-    def copy(self):
-        # pylint: disable=missing-docstring
-        return dict(self)
+        def undo(self):
+            counters.names['undo'] += 1
+            super().undo()
 
-    def reset(self):
-        # pylint: disable=missing-docstring
-        del self._maps[1:]
-        self._maps[0].clear()
+    CountedNames.__name__ = names_type.__name__
+    return CountedNames
 
 
 ###############################################################################
 # Matcher objects put it all together.
 ###############################################################################
 
+class MatcherLocal(threading.local):
+    """Thread-local state of `Matcher`.
+
+    The `names` mapping is created on first use. The `budget` is None unless
+    a match is limited.
+
+    """
+    budget = None
+
+
 class Matcher:
     """Container for match function state with list of pattern cases.
 
@@ -896,37 +4366,856 @@ class Matcher:
     >>> bound.tail
     5
 
+    Attributes tune matching:
+
+    * `plans_size` -- maximum number of case plans cached by `visit`.
+    * `memoize_after` -- number of `Pattern` steps after which states are
+      remembered if the pattern binds no names. None disables memoization.
+    * `engine` -- "auto", "backtrack", "stack", "nfa", or "regex" engine for
+      `Pattern` matching. See `pattern_match`.
+    * `programs_size` -- maximum number of programs and regexes cached.
+    * `names_type` -- type of the `names` mapping created for each thread.
+    * `captures` -- "copy" to bind group segments as slices of the value or
+      "view" to bind memoryview slices of bytes-like values and `SliceView`
+      objects of other sequences. See `capture`.
+    * `max_steps` -- default limit of steps for each match, search, or
+      compiled match. None for no limit. See `match`.
+    * `timeout` -- default limit of seconds for each match, search, or
+      compiled match. None for no limit.
+
+    Matching state is local so threads and asyncio tasks may share a matcher:
+    `names` is local to the thread and `bound` to the context.
+
     """
+    # pylint: disable=too-many-public-methods,too-many-instance-attributes
+    plans_size = 1024
+    memoize_after = 1000
+    engine = 'auto'
+    programs_size = 1024
+    names_type = TrailMap
+    captures = 'copy'
+    counters = None
+    max_steps = None
+    timeout = None
+
     def __init__(self, cases=None):
         cases = default_cases if cases is None else cases
+        self._plans = {}
+        self._programs = {}
+        self._local = MatcherLocal()
+        self._watched = False
         self.cases = cases
         self.bound = Bounder()
-        self.names = MapStack()
 
-    def match(self, value, pattern):
-        # pylint: disable=missing-docstring
+    @property
+    def names(self):
+        """Mapping of names bound while matching, local to the thread.
+
+        Created with `names_type` on first use in each thread. Assigning
+        names replaces the mapping for the current thread only.
+
+        """
+        try:
+            return self._local.names
+        except AttributeError:
+            names_type = self.names_type
+
+            if self.counters is not None:
+                names_type = counted_names(names_type, self.counters)
+
+            names = self._local.names = names_type()
+            return names
+
+    @names.setter
+    def names(self, names):
+        self._local.names = names
+
+    def capture(self, value, start, end):
+        """Return segment of `value` from `start` to `end`.
+
+        Segments are copied unless `captures` is "view".
+
+        >>> matcher = Matcher()
+        >>> matcher.capture([1, 2, 3, 4], 1, 3)
+        [2, 3]
+        >>> matcher.captures = 'view'
+        >>> matcher.capture([1, 2, 3, 4], 1, 3)
+        SliceView([2, 3])
+        >>> matcher.capture(b'abcd', 1, 3).tobytes()
+        b'bc'
+
+        """
+        if self.captures == 'view':
+            if isinstance(value, view_types):
+                return memoryview(value)[start:end]
+            return SliceView(value, start, end)
+        return value[start:end]
+
+    def bindings(self):
+        """Return copy of `names` with group segments materialized.
+
+        Groups bind `SliceView` objects while matching so that backtracking
+        does not copy segments. Only the successful match is materialized by
+        `capture`.
+
+        """
+        bindings = self.names.copy()
+        capture = self.capture
+
+        # Segments are always exact `SliceView` objects; `isinstance` would
+        # go through the `Sequence` ABC for every bound value.
+
+        for key, item in bindings.items():
+            cls = type(item)
+
+            if cls is SliceView:
+                bindings[key] = capture(item.value, item.start, item.stop)
+
+        return bindings
+
+    def __getstate__(self):
+        state = {
+            key: value for key, value in vars(self).items()
+            if key in matcher_settings
+        }
+        cases = self._cases
+        state['cases'] = None if cases is default_cases else list(cases)
+        return state
+
+    def __setstate__(self, state):
+        state = dict(state)
+        self.__init__(state.pop('cases'))
+        vars(self).update(state)
+
+    @property
+    def cases(self):
+        """List of `Case` records tried in order by `visit`.
+
+        Assigned lists are kept, not copied. Changes to the list, in-place or
+        by assignment, clear the plans cached by `visit`. A `Cases` list
+        counts its changes. Other lists are compared item by item on each
+        `visit`, which is slower.
+
+        """
+        return self._cases
+
+    @cases.setter
+    def cases(self, cases):
+        self._cases = cases
+        self._version = cases_version(cases)
+        self._plans.clear()
+
+    @property
+    def budget(self):
+        "`Budget` of the match in progress in this thread or None."
+        return self._local.budget
+
+    def limit(self, max_steps=None, timeout=None):
+        """Start `Budget` for a match in this thread and return it.
+
+        Limits default to `max_steps` and `timeout` of the matcher. Return
+        None if there are no limits. The budget is ended by `unlimit`.
+
+        """
+        if max_steps is None:
+            max_steps = self.max_steps
+        if timeout is None:
+            timeout = self.timeout
+        if max_steps is None and timeout is None:
+            return None
+
+        budget = Budget(max_steps, timeout, self.budget)
+        self._local.budget = budget
+        self._watched = True
+        return budget
+
+    def unlimit(self, budget):
+        "End `budget` from `limit` and restore the one before it."
+        if budget is not None:
+            self._local.budget = budget.previous
+
+    def match(self, value, pattern, max_steps=None, timeout=None):
+        """Return True if `value` matches `pattern` and push names to `bound`.
+
+        Raise `MatchLimitError` if matching takes more than `max_steps`
+        steps or `timeout` seconds, defaulting to the attributes of the
+        matcher. Calls of `visit`, items of nested sequences, and steps of
+        all `Pattern` engines used by the match are counted together.
+        Engines check limits every `Budget.interval` steps so they may take
+        up to that many steps more.
+
+        >>> matcher = Matcher()
+        >>> pattern = (anything * group('x') + anything * group('y')) + 'b'
+        >>> try:
+        ...     matcher.match('a' * 1000, pattern, max_steps=10000)
+        ... except MatchLimitError as error:
+        ...     print(error.reason, 10000 < error.steps <= 10000 + 1024)
+        steps True
+
+        """
+        names = self.names
+        budget = self.limit(max_steps, timeout)
+        try:
+            self.visit(value, pattern)
+        except Mismatch:
+            return False
+        else:
+            self.bound.push(self.bindings())
+        finally:
+            names.reset()
+            self.unlimit(budget)
+        return True
+
+    def match_result(self, value, pattern, max_steps=None, timeout=None):
+        """Return `MatchResult` of names if `value` matches `pattern`.
+
+        Return None on mismatch. Unlike `match`, `bound` is not changed so
+        results are not kept beyond their use.
+
+        >>> matcher = Matcher()
+        >>> result = matcher.match_result([1, 2, 3], [1, bind.middle, 3])
+        >>> result
+        MatchResult({'middle': 2})
+        >>> result.middle
+        2
+        >>> len(matcher.bound)
+        0
+        >>> matcher.match_result([1, 2], [1, 3]) is None
+        True
+
+        Limits are applied as by `match`.
+
+        """
         names = self.names
+        budget = self.limit(max_steps, timeout)
         try:
             self.visit(value, pattern)
+        except Mismatch:
+            return None
+        else:
+            return MatchResult(self.bindings())
+        finally:
+            names.reset()
+            self.unlimit(budget)
+
+    def match_stream(self, values, pattern, max_steps=None, timeout=None):
+        """Return True if items of iterable `values` match `pattern`.
+
+        Like `match` but items are read lazily and not kept, so generators,
+        file iterators, and other long iterables match in bounded memory.
+        Reading stops once a prefix of the items matches, after at most the
+        lookahead needed to check `Exclude` options or the end. Patterns
+        supported by `nfa_program` stream; other patterns, or the
+        "backtrack" and "regex" engines, read all items into a list first.
+        Limits are applied as by `match`, counting states advanced per item.
+
+        >>> matcher = Matcher()
+        >>> matcher.match_stream(iter(range(10 ** 9)), padding + [5, 6])
+        True
+        >>> numbers = iter(range(10))
+        >>> matcher.match_stream(numbers, [0, 1, 2] + anyone * maybe)
+        True
+        >>> next(numbers)
+        4
+
+        """
+        program = None
+
+        if (isinstance(pattern, APattern)
+                and type(pattern).__match__ is APattern.__match__
+                and self.engine in ('auto', 'nfa')):
+            program = self.program(pattern)
+
+            if program is None and self.engine == 'nfa':
+                raise ValueError('pattern not supported by nfa engine')
+
+        if program is None:
+            if not isinstance(values, Sequence):
+                values = list(values)
+            return self.match(values, pattern, max_steps, timeout)
+
+        names = self.names
+        budget = self.limit(max_steps, timeout)
+        try:
+            nfa_stream(self, values, program, self.visit)
         except Mismatch:
             return False
         else:
-            self.bound.push(names.copy())
+            self.bound.push(self.bindings())
         finally:
             names.reset()
+            self.unlimit(budget)
         return True
 
+    def match_many(self, values, pattern, workers=None, chunksize=256):
+        """Yield `match_result` of each of `values` with `pattern` in order.
+
+        Chunks of `chunksize` values are matched by `workers` processes of a
+        `ProcessPoolExecutor`, default one per CPU. With one worker, values
+        are matched in this process. At most two chunks per worker are
+        pending so `values` may be a long iterator.
+
+        The matcher, `pattern`, values, and bound values are pickled. The
+        matcher is pickled with its cases and settings.
+
+        >>> matcher = Matcher()
+        >>> results = matcher.match_many([(1, 2), (3, 'a')], (bind.n, int), 1)
+        >>> [result and result.n for result in results]
+        [1, None]
+
+        """
+        if workers == 1:
+            for value in values:
+                yield self.match_result(value, pattern)
+            return
+
+        workers = workers or os.cpu_count() or 1
+        chunks = chunked(values, chunksize)
+
+        with ProcessPoolExecutor(workers) as executor:
+            limit = 2 * workers
+            pending = deque()
+
+            for chunk in chunks:
+                future = executor.submit(match_chunk, self, chunk, pattern)
+                pending.append(future)
+
+                while len(pending) >= limit:
+                    yield from pending.popleft().result()
+
+            while pending:
+                yield from pending.popleft().result()
+
+    def match_array(self, array, pattern):
+        """Return `(mask, captures)` matching items of NumPy `array`.
+
+        The mask is a boolean array like `array` with each item matched as
+        a Python object to `pattern`. Captures map bound names to arrays
+        like `array` with values where the mask is true. An `Either` of
+        single items matches items which match any one of them. Like
+        `match_result`, `bound` is not changed.
+
+        Literals, types, `Either` patterns of those, and `Like` patterns of
+        ufuncs or `vectorized` functions are matched with array operations.
+        Other patterns are matched one item at a time.
+
+        NumPy is imported on first use and is not otherwise required.
+
+        """
+        # pylint: disable=too-many-locals
+        # pylint: disable=import-outside-toplevel
+        import numpy
+
+        array = numpy.asarray(array)
+        values = array.ravel()
+        result = array_mask(numpy, self, values, pattern)
+
+        if result is not None:
+            mask, captures = result
+        else:
+            mask = numpy.zeros(values.shape, bool)
+            captures = {}
+            items = either_items(pattern)
+            options = [pattern] if items is None else items
+
+            for index, value in enumerate(values.tolist()):
+                for option in options:
+                    bindings = self.match_result(value, option)
+
+                    if bindings is not None:
+                        break
+                else:
+                    continue
+
+                mask[index] = True
+
+                for name in bindings:
+                    if name not in captures:
+                        empty = numpy.full(values.shape, None, object)
+                        captures[name] = empty
+                    captures[name][index] = bindings[name]
+
+        shape = array.shape
+        captures = {name: item.reshape(shape) for name, item in captures.items()}
+        return mask.reshape(shape), captures
+
+    def search(self, value, pattern, start=0, max_steps=None, timeout=None):
+        """Return first `SearchResult` of `pattern` in `value` else None.
+
+        See `finditer`.
+
+        >>> matcher = Matcher()
+        >>> matcher.search([5, 1, 2, 3], [1, bind.two, 3])
+        SearchResult({'two': 2}, 1, 4)
+        >>> matcher.search('abc', 'd') is None
+        True
+
+        """
+        results = self.finditer(value, pattern, start, max_steps, timeout)
+        for result in results:
+            return result
+        return None
+
+    def finditer(self, value, pattern, start=0, max_steps=None,
+                 timeout=None):
+        """Yield `SearchResult` for non-overlapping matches in `value`.
+
+        The sequence `value` is scanned in place from offset `start` and
+        `pattern` is matched at each offset as a `Pattern`. With the default
+        cases, offsets are skipped until the leading literal items of the
+        pattern are found. Like `match_result`, `bound` is not changed.
+
+        Limits are applied as by `match` to the whole scan. The budget is
+        active only while the scan runs, not while results are handled.
+
+        >>> matcher = Matcher()
+        >>> text = 'a=1,b=22,c=333'
+        >>> pattern = '=' + (',' * exclude * repeat(min=1)) * group('num')
+        >>> results = list(matcher.finditer(text, pattern))
+        >>> [result.num for result in results]
+        ['1', '22', '333']
+        >>> [(result.start, result.end) for result in results]
+        [(1, 3), (5, 8), (10, 14)]
+
+        """
+        if not (isinstance(pattern, APattern)
+                and type(pattern).__match__ is APattern.__match__):
+            pattern = Pattern(pattern)
+
+        cases = self._cases
+
+        if cases is default_cases and cases.version == default_version:
+            find = prefix_finder(value, literal_prefix(pattern))
+        else:
+            def find(offset):
+                return offset if offset <= len(value) else -1
+
+        names = self.names
+        local = self._local
+        budget = self.limit(max_steps, timeout)
+        self.unlimit(budget)
+        offset = start
+
+        while True:
+            offset = find(offset)
+
+            if offset < 0:
+                return
+
+            if budget is not None:
+                budget.previous = local.budget
+                local.budget = budget
+
+            try:
+                end = pattern_end(self, value, pattern, self.visit, offset)
+            except Mismatch:
+                offset += 1
+                continue
+            else:
+                result = SearchResult(self.bindings(), offset, end)
+            finally:
+                names.reset()
+                self.unlimit(budget)
+
+            yield result
+            offset = end if end > offset else offset + 1
+
     def visit(self, value, pattern):
-        # pylint: disable=missing-docstring
-        for name, predicate, action in self.cases:
-            if predicate(self, value, pattern):
+        """Match `value` to `pattern` using the first applicable case.
+
+        Plans are cached by the types of `value` and `pattern` so predicates
+        which depend only on types are not called again. At most `plans_size`
+        plans are cached. Each call is a step of the match budget. While
+        stats are enabled, `visit_counted` is called instead.
+
+        """
+        # Stats and budgets are only looked up once either has been used.
+
+        if self._watched:
+            if self.counters is not None:
+                return self.visit_counted(value, pattern)
+
+            budget = self._local.budget
+
+            if budget is not None:
+                budget.tick()
+
+        key = type(value), type(pattern)
+        cases = self._cases
+        version = cases.version if isinstance(cases, Cases) else tuple(cases)
+
+        if version != self._version:
+            self._plans.clear()
+            self._version = version
+
+        try:
+            plan = self._plans[key]
+        except KeyError:
+            plans = self._plans
+            if len(plans) >= self.plans_size:
+                plans.clear()
+            plan = plans[key] = self.plan(value, pattern)
+
+        for predicate, action in plan:
+            if predicate is None or predicate(self, value, pattern):
+                if action is sequence_action:
+                    return self.visit_sequence(value, pattern)
+                return action(self, value, pattern)
+
+        raise Mismatch
+
+    def enable_stats(self, timing=False):
+        """Count work done while matching until `disable_stats` is called.
+
+        Counted are calls and hits of `Case` predicates by name, `Mismatch`
+        exceptions raised by `visit`, `push`, `pull`, and `undo` of `names`,
+        and runs, steps, and backtracks of each `Pattern` engine. Steps are
+        generators started by "backtrack", alternatives tried by "stack",
+        and items advanced by "nfa". Backtracks are failed items for
+        "backtrack" and alternatives resumed for "stack". With `timing`,
+        wall time of case actions, including nested matches, is summed too.
+
+        While `counters` is set, `visit` calls `visit_counted` instead and
+        nested sequences are matched by recursion rather than
+        `visit_sequence`. Compiled patterns call `visit` only for items they
+        do not specialize so they are counted in part. Enable and disable
+        stats while no thread is matching.
+
+        >>> matcher = Matcher()
+        >>> matcher.enable_stats()
+        >>> matcher.match([1, 'a'], [int, bind.name])
+        True
+        >>> stats = matcher.stats()
+        >>> stats['cases']['types']
+        {'calls': 1, 'hits': 1}
+        >>> stats['mismatches']
+        0
+        >>> matcher.disable_stats()
+
+        """
+        self.counters = MatchStats(timing)
+        self._local = MatcherLocal()
+        self._watched = True
+
+    def disable_stats(self):
+        "Stop counting work done while matching. See `enable_stats`."
+        self.counters = None
+        self._local = MatcherLocal()
+
+    def stats(self):
+        """Return dict of counters collected since `enable_stats`.
+
+        Return None if stats are disabled.
+
+        """
+        counters = self.counters
+        return None if counters is None else counters.as_dict()
+
+    def reset_stats(self):
+        "Set counters collected since `enable_stats` to zero."
+        if self.counters is not None:
+            self.counters.reset()
+
+    def visit_counted(self, value, pattern):
+        "Match `value` to `pattern` like `visit` while counting stats."
+        counters = self.counters
+        cases = self._cases
+        budget = self._local.budget
+
+        if budget is not None:
+            budget.tick()
+
+        key = type(value), type(pattern)
+
+        version = cases_version(cases)
+
+        if version != self._version:
+            self._plans.clear()
+            self._version = version
+
+        try:
+            plan = self._plans[key]
+        except KeyError:
+            plans = self._plans
+            if len(plans) >= self.plans_size:
+                plans.clear()
+            plan = plans[key] = self.plan(value, pattern)
+
+        actions = counters.case_names(cases)
+
+        for predicate, action in plan:
+            name = actions.get(action, getattr(action, '__name__', None))
+
+            if predicate is not None:
+                counters.calls[name] += 1
+
+                if not predicate(self, value, pattern):
+                    continue
+
+            counters.hits[name] += 1
+
+            try:
+                if counters.timing:
+                    began = time.perf_counter()
+
+                    try:
+                        return action(self, value, pattern)
+                    finally:
+                        counters.times[name] += time.perf_counter() - began
+
                 return action(self, value, pattern)
+            except Mismatch:
+                counters.mismatches += 1
+                raise
+
+        counters.mismatches += 1
         raise Mismatch
 
+    def visit_sequence(self, value, pattern):
+        """Match items of `value` to `pattern` like `sequence_action`.
+
+        Nested sequences are matched with a stack of frames rather than by
+        calling `visit` recursively so deeply nested values do not exhaust
+        the Python stack. Other cases are applied as by `visit` and each item
+        is a step of the match budget.
+
+        >>> matcher = Matcher()
+        >>> value = pattern = []
+        >>> for index in range(10000):
+        ...     value, pattern = [index, value], [int, pattern]
+        >>> matcher.match(value, pattern)
+        True
+
+        """
+        # pylint: disable=too-many-locals
+        if len(value) != len(pattern):
+            raise Mismatch
+
+        plans = self._plans
+        budget = self._local.budget if self._watched else None
+        frames = []
+        results = []
+        index = 0
+        length = len(value)
+
+        while True:
+            if index == length:
+                result = tuple(results)
+
+                if not frames:
+                    return result
+
+                value, pattern, results, index, length = frames.pop()
+                results.append(result)
+                continue
+
+            if budget is not None:
+                budget.tick()
+
+            item = value[index]
+            iota = pattern[index]
+            index += 1
+            key = type(item), type(iota)
+
+            try:
+                plan = plans[key]
+            except KeyError:
+                if len(plans) >= self.plans_size:
+                    plans.clear()
+                plan = plans[key] = self.plan(item, iota)
+
+            for predicate, action in plan:
+                if predicate is None or predicate(self, item, iota):
+                    break
+            else:
+                raise Mismatch
+
+            if action is sequence_action:
+                if len(item) != len(iota):
+                    raise Mismatch
+
+                frames.append((value, pattern, results, index, length))
+                value, pattern, results = item, iota, []
+                index = 0
+                length = len(item)
+            else:
+                results.append(action(self, item, iota))
+
+    def plan(self, value, pattern):
+        """Return plan of cases to try for types of `value` and `pattern`.
+
+        The plan is a tuple of `(predicate, action)` pairs. Predicates which
+        depend on the value are kept. Predicates which depend on the pattern
+        are kept too unless `typed_attributes` is true for the pattern. Other
+        predicates are called now and dropped when false. The first true
+        predicate ends the plan with its predicate replaced by None.
+
+        >>> matcher = Matcher()
+        >>> matcher.plan(0, 0) == ((None, literal_action),)
+        True
+        >>> ' '.join(name for name, *_ in matcher.cases)
+        '__match__ types literals mappings equality sequences'
+        >>> plan = matcher.plan([], [])
+        >>> plan[0] == (equality_predicate, equality_action)
+        True
+        >>> plan[1] == (None, sequence_action)
+        True
+        >>> matcher.plan(0, int)[0] == (match_predicate, match_action)
+        True
+
+        """
+        plan = []
+        typed = typed_attributes(pattern)
+
+        for _, predicate, action, depends in self.cases:
+            if depends == 'value' or (depends == 'pattern' and not typed):
+                plan.append((predicate, action))
+            elif predicate(self, value, pattern):
+                plan.append((None, action))
+                break
+
+        return tuple(plan)
+
+    def program(self, pattern):
+        """Return cached `nfa_program` for `pattern` or None if unsupported.
+
+        Programs are cached by identity of `pattern`. At most `programs_size`
+        programs and regexes are cached.
+
+        """
+        return self._translate('nfa', pattern, nfa_program)
+
+    def stack_program(self, pattern):
+        """Return cached `stack_program` for `pattern` or None if unsupported.
+
+        Programs are cached like those of `program`.
+
+        """
+        return self._translate('stack', pattern, stack_program)
+
+    def regex(self, pattern, text):
+        """Return cached `regex_pattern` for `pattern` and `text` type.
+
+        Return None if unsupported or if `cases` do not match items of `text`
+        values by equality as the default cases do.
+
+        >>> matcher = Matcher()
+        >>> matcher.regex('a' + anyone, str)[0].pattern
+        'a.'
+        >>> matcher.cases = []
+        >>> matcher.regex('a' + anyone, str) is None
+        True
+
+        """
+        cases = self._cases
+
+        def factory(pattern):
+            item = 'a' if text is str else ord('a')
+            literal = ((None, literal_action),)
+            anyone_plan = ((None, match_action),)
+
+            if self.plan(item, item) != literal:
+                return None
+
+            if self.plan(item, anyone) != anyone_plan:
+                return None
+
+            return regex_pattern(pattern, text)
+
+        kind = text, id(cases), cases_version(cases)
+        return self._translate(kind, pattern, factory)
+
+    def _translate(self, kind, pattern, factory):
+        programs = self._programs
+        key = kind, id(pattern)
+
+        try:
+            iota, program = programs[key]
+        except KeyError:
+            pass
+        else:
+            if iota is pattern:
+                return program
+
+        if len(programs) >= self.programs_size:
+            programs.clear()
+
+        program = factory(pattern)
+        programs[key] = pattern, program
+        return program
+
+    def compile(self, pattern):
+        """Return `Compiled` object for matching values to `pattern`.
+
+        The pattern is analyzed once so repeated matches skip most predicates
+        and lookups.
+
+        >>> matcher = Matcher()
+        >>> compiled = matcher.compile('a' + anything * group('rest'))
+        >>> compiled.match('abc')
+        True
+        >>> matcher.bound.rest
+        'bc'
+
+        """
+        return Compiled(self, pattern)
+
+    def table(self, rules):
+        """Return `Table` dispatching values to `rules` of patterns.
+
+        The `rules` are `(pattern, handler)` pairs in priority order.
+
+        >>> matcher = Matcher()
+        >>> table = matcher.table([(1, 'one'), (int, 'int')])
+        >>> table.match(1), table.match(2), table.match('abc')
+        ('one', 'int', None)
+
+        """
+        return Table(self, rules)
+
+
+matcher_settings = frozenset((
+    'plans_size', 'memoize_after', 'engine', 'programs_size', 'names_type',
+    'captures', 'max_steps', 'timeout',
+))
+
+
+def chunked(values, size):
+    """Yield lists of at most `size` items from `values`.
+
+    >>> list(chunked(range(5), 2))
+    [[0, 1], [2, 3], [4]]
+
+    """
+    chunk = []
+
+    for value in values:
+        chunk.append(value)
+
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def match_chunk(matcher, values, pattern):
+    "Return list of `Matcher.match_result` for `values` in a worker."
+    return [matcher.match_result(value, pattern) for value in values]
+
 
 matcher = Matcher()
 match = matcher.match
 bound = matcher.bound
+match_result = matcher.match_result
+match_many = matcher.match_many
+match_array = matcher.match_array
+match_stream = matcher.match_stream
+search = matcher.search
+finditer = matcher.finditer
+compile = matcher.compile  # pylint: disable=redefined-builtin
+table = matcher.table
 
 
 ###############################################################################
@@ -934,12 +5223,18 @@ bound = matcher.bound
 ###############################################################################
 
 __all__ = [
-    'Matcher', 'match',
+    'Matcher', 'match', 'match_result', 'MatchResult', 'match_many',
+    'MatchLimitError',
+    'match_array', 'vectorized',
+    'match_stream', 'search', 'finditer', 'SearchResult', 'SliceView',
+    'compile', 'Compiled', 'table', 'Table',
     'Name', 'Binder', 'bind', 'Bounder', 'bound',
-    'Like', 'like', 'like_errors',
+    'Like', 'like', 'like_any', 'like_errors', 'like_regexes', 'RegexCache',
     'literal_types',
+    'MappingPattern', 'mapping', 'RestView', 'Attrs', 'attrs',
     'Anyone', 'anyone',
-    'Pattern', 'Exclude', 'exclude', 'Either', 'either', 'Group', 'group',
+    'Pattern', 'PatternBuilder', 'intern_pattern',
+    'Exclude', 'exclude', 'Either', 'either', 'Group', 'group',
     'Repeat', 'repeat', 'maybe', 'anything', 'something', 'padding',
 ]
 
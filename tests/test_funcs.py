@@ -3,6 +3,12 @@ import pytest
 import random
 from collections import namedtuple
 from patternmatching import match, like, bind, bound, repeat, group, padding
+from patternmatching import anything, either, exclude
+from patternmatching import compile, Matcher, Case, Cases, Mismatch
+from patternmatching import like_any, like_regexes, RegexCache
+from patternmatching import MapStack, TrailMap
+from patternmatching import match_result, MatchResult, match_many
+from patternmatching import mapping, RestView, attrs
 
 Point = namedtuple('Point', 'x y z t')
 
@@ -85,6 +91,549 @@ def test_basic():
             assert match_basic(value) == result
 
 
+def test_compiled_basic():
+    values = [
+        None, 1.234, 'alpha', [5, 6, 7], 'abc01abc', 119, Point(0, 0, 0, 0),
+        (0, [1, (2, [3, (4, [5])])]), 114, list,
+    ]
+    patterns = [
+        None, 1.234, 'alpha', [bind.first, bind.second, bind.third],
+        like('^abc..abc$'), like(lambda val: val % 17 == 0),
+        Point(0, 0, 0, 0), (0, [1, (2, [3, (4, [5])])]), tuple, object,
+    ]
+    compiled = [compile(pattern) for pattern in patterns]
+
+    for value in values:
+        for pattern, iota in zip(patterns, compiled):
+            expected = match(value, pattern)
+            names = {key: repr(bound[key]) for key in bound}
+            assert iota.match(value) == expected
+            if expected:
+                assert {key: repr(bound[key]) for key in bound} == names
+
+
+basic_rules = [
+    (None, 'case-1'),
+    (True, 'case-2'),
+    (False, 'case-3'),
+    (-100, 'case-4'),
+    (1.234, 'case-5'),
+    (12345678901234567890, 'case-6'),
+    (complex(1, 2), 'case-7'),
+    (str('alpha'), 'case-8'),
+    (bytes(b'beta'), 'case-9'),
+    ((1, 2, 3, 4), 'case-15'),
+    ([bind.first, bind.second, bind.third], 'case-11'),
+    (like('^abc..abc$'), 'case-12'),
+    (like(lambda val: val % 17 == 0), 'case-13'),
+    (Point(0, 0, 0, 0), 'case-14'),
+    ([1, 2, 3, 4], 'case-16'),
+    ((0, [1, (2, [3, (4, [5])])]), 'case-17'),
+    (tuple, 'case-10'),
+    (like(lambda val: val % 19 == 0), 'case-18'),
+    (object, 'case-19'),
+]
+
+
+def test_table_basic():
+    values = [
+        None, True, False, -100, 1.234, 12345678901234567890, complex(1, 2),
+        'alpha', b'beta', Point, [5, 6, 7], 'abc01abc', 119, Point(0, 0, 0, 0),
+        Point(1, 2, 3, 4), [1, 2, 3, 4], (0, [1, (2, [3, (4, [5])])]), 114,
+        list, 1, 0.0, -100.0, float('nan'), (1, 2, 3, 4), (5, 6, 7), [],
+        (0, 0, 0, 0), b'alpha', bytearray(b'beta'), {}, tuple, 34,
+    ]
+    matcher = Matcher()
+    table = matcher.table(basic_rules)
+    for value in values * 2:
+        result = table.match(value)
+        assert result == match_basic(value)
+        assert {key: repr(matcher.bound[key]) for key in matcher.bound} == {
+            key: repr(bound[key]) for key in bound
+        }
+
+
+def test_table_sequences():
+    nan = float('nan')
+    rules = [((num, bind.rest), num) for num in range(10)]
+    rules += [([nan, 0], 'nan'), ((True, 2, 3), 'triple'), ([], 'empty')]
+    table = Matcher().table(rules)
+    assert table.match((3, 'x')) == 3
+    assert table.match([3, 'x']) is None
+    assert table.match((True, 'x')) == 1
+    assert table.match((1.0, 2, 3)) == 'triple'
+    assert table.match([nan, 0]) == 'nan'
+    assert table.match([float('nan'), 0]) is None
+    assert table.match(['3', 'x']) is None
+    assert table.match([]) == 'empty'
+
+
+def test_table_cases():
+    matcher = Matcher()
+    table = matcher.table([(2, 'two'), (int, 'int'), ('even', 'word')])
+    assert table.match(2) == 'two'
+    assert table.match(4) == 'int'
+    matcher.cases = [Case('even', even_predicate, even_action)]
+    assert table.match(4) == 'word'
+    assert table.match(3) is None
+
+
+def test_table_none():
+    table = Matcher().table([])
+    assert table.match(0) is None
+
+
+def even_predicate(matcher, value, pattern):
+    return pattern == 'even' and isinstance(value, int) and value % 2 == 0
+
+
+def even_action(matcher, value, pattern):
+    return value
+
+
+def test_plans_value_case():
+    matcher = Matcher()
+    matcher.cases = [Case('even', even_predicate, even_action)] + matcher.cases
+    assert matcher.match(2, 'even')
+    assert not matcher.match(3, 'even')
+    assert matcher.match(4, 'even')
+
+
+def test_plans_cases_assignment():
+    matcher = Matcher()
+    assert not matcher.match(2, 'even')
+    matcher.cases = [Case('even', even_predicate, even_action)] + matcher.cases
+    assert matcher.match(2, 'even')
+    matcher.cases = matcher.cases[1:]
+    assert not matcher.match(2, 'even')
+
+
+def test_plans_cases_in_place():
+    matcher = Matcher(Cases(Matcher().cases))
+    compiled = matcher.compile('even')
+    assert not matcher.match(2, 'even')
+    assert not compiled.match(2)
+    matcher.cases.insert(0, Case('even', even_predicate, even_action))
+    assert matcher.match(2, 'even')
+    assert compiled.match(2)
+    del matcher.cases[0]
+    assert not matcher.match(2, 'even')
+    assert not compiled.match(2)
+
+
+def test_plans_cases_list():
+    cases = list(Matcher().cases)
+    matcher = Matcher(cases)
+    assert matcher.cases is cases
+    compiled = matcher.compile('even')
+    assert not matcher.match(2, 'even')
+    assert not compiled.match(2)
+    cases.insert(0, Case('even', even_predicate, even_action))
+    assert matcher.match(2, 'even')
+    assert compiled.match(2)
+    matcher.cases = other = cases[1:]
+    assert matcher.cases is other
+    assert not matcher.match(2, 'even')
+    other[:0] = cases[:1]
+    assert matcher.match(2, 'even')
+
+
+class Even(object):
+    @classmethod
+    def __match__(cls, matcher, value):
+        if value % 2:
+            raise Mismatch
+
+
+def test_plans_class_match():
+    matcher = Matcher()
+    assert matcher.match(4, Even)
+    assert not matcher.match(3, Even)
+    assert matcher.match(4, int)
+    assert not matcher.match(4, str)
+
+
+def test_plans_class_match_reversed():
+    matcher = Matcher()
+    assert matcher.match(4, int)
+    assert matcher.match(4, Even)
+    assert not matcher.match(3, Even)
+
+
+def test_plans_instance_match():
+    class Anything(object):
+        pass
+    matcher = Matcher()
+    anything = Anything()
+    assert not matcher.match(4, anything)
+    anything.__match__ = lambda matcher, value: None
+    assert matcher.match(4, anything)
+
+
+def test_plans_size():
+    matcher = Matcher()
+    matcher.plans_size = 2
+    for value in [None, 0, 'abc', b'abc', 1.0]:
+        assert matcher.match(value, value)
+        assert len(matcher._plans) <= 2
+
+
+def nested(depth, leaf, bottom):
+    value, pattern = (), bottom
+    for index in range(depth):
+        value = (index, [value])
+        pattern = (leaf(index), [pattern])
+    return value, pattern
+
+
+def test_nested_deep():
+    value, pattern = nested(5000, lambda index: int, ())
+    assert match(value, pattern)
+    value, pattern = nested(5000, lambda index: index, bind.bottom)
+    assert match(value, pattern)
+    assert bound.bottom == ()
+    value, pattern = nested(5000, lambda index: int, 'a')
+    assert not match(value, (0, [pattern]))
+    assert not match(value, pattern[:1])
+
+
+def test_nested_sequence_case():
+    def reverse_action(matcher, value, pattern):
+        return tuple(matcher.visit(item, iota)
+                     for item, iota in zip(reversed(value), pattern))
+
+    matcher = Matcher()
+    matcher.cases = matcher.cases[:-1] + [
+        Case('reverse', matcher.cases[-1].predicate, reverse_action, 'types')
+    ]
+    assert matcher.match([1, [2, 'a']], [[str, int], int])
+    assert not matcher.match([1, [2, 'a']], [int, [int, str]])
+
+
+def test_stats():
+    matcher = Matcher()
+    assert matcher.stats() is None
+    matcher.enable_stats(timing=True)
+    assert matcher.match([1, 2, 3], [bind.first, int, 3])
+    assert not matcher.match([1, 2], [1, 'a'])
+    stats = matcher.stats()
+    assert stats['cases']['literals']['hits'] == 3
+    assert stats['cases']['sequences']['hits'] == 2
+    assert stats['cases']['sequences']['time'] > 0
+    assert stats['mismatches'] >= 1
+    matcher.reset_stats()
+    assert matcher.stats()['cases'] == {}
+    matcher.disable_stats()
+    assert 'visit' not in vars(matcher)
+    assert matcher.match([1, 2, 3], [bind.first, int, 3])
+    assert matcher.stats() is None
+
+
+class VisitLogger(Matcher):
+    def __init__(self):
+        super().__init__()
+        self.log = []
+
+    def visit(self, value, pattern):
+        self.log.append(pattern)
+        return super().visit(value, pattern)
+
+
+def test_stats_subclass():
+    matcher = VisitLogger()
+    matcher.plans_size = 2
+    matcher.enable_stats()
+    assert matcher.match([1, 'a', 2.0, None], [int, str, float, None])
+    assert matcher.stats()['cases']['sequences']['hits'] == 1
+    assert matcher.stats()['cases']['types']['hits'] == 3
+    assert len(matcher.log) == 5
+    assert len(matcher._plans) <= 2
+    matcher.cases = [Case('even', even_predicate, even_action)] + matcher.cases
+    assert matcher.match(4, 'even')
+    assert matcher.stats()['cases']['even']['hits'] == 1
+    matcher.disable_stats()
+    assert matcher.match([1, 'a'], [int, str])
+    assert len(matcher.log) == 7
+    assert matcher.stats() is None
+
+
+@pytest.mark.parametrize('engine', ['backtrack', 'stack', 'nfa'])
+def test_stats_engines(engine):
+    matcher = Matcher()
+    matcher.engine = engine
+    matcher.enable_stats()
+    pattern = anything + 'c'
+    if engine != 'nfa':
+        pattern = anything * group('head') + 'c'
+    assert matcher.match(list('abcabc'), pattern)
+    stats = matcher.stats()
+    assert stats['engines'][engine]['runs'] == 1
+    assert stats['engines'][engine]['steps'] > 0
+    if engine == 'stack':
+        assert stats['engines'][engine]['backtracks'] > 0
+    if engine == 'backtrack':
+        assert stats['names']['push'] >= stats['names']['undo'] > 0
+
+
+def test_like_regexes():
+    like_regexes.clear()
+    pattern = like('^abc..abc$')
+    assert match('abc01abc', pattern)
+    assert not match('abc0abc', pattern)
+    assert (like_regexes.hits, like_regexes.misses) == (1, 1)
+    assert list(like_regexes) == ['^abc..abc$']
+
+
+def test_regex_cache_size():
+    cache = RegexCache(size=3)
+    for num in range(10):
+        assert cache('a{%d}' % num).match('a' * num)
+    assert list(cache) == ['a{7}', 'a{8}', 'a{9}']
+    assert cache('a{8}') is cache('a{8}')
+    assert list(cache) == ['a{7}', 'a{9}', 'a{8}']
+    assert (cache.hits, cache.misses) == (2, 10)
+
+
+def test_like_any():
+    regexes = ['item-%d$' % num for num in range(300)]
+    pattern = like_any(*regexes, name='item')
+    assert match('item-123', pattern)
+    assert bound.item.lastgroup == 'like123'
+    assert not match('item-300', pattern)
+    assert not match(b'item-1', pattern)
+    assert not match(5, pattern)
+
+
+def test_trail_map():
+    random.seed(0)
+    stack, trail = MapStack(), TrailMap()
+    depth = 0
+    for _ in range(10000):
+        action = random.randrange(6)
+        key = random.randrange(5)
+        if action == 0:
+            stack.push()
+            trail.push()
+            depth += 1
+        elif action == 1 and depth:
+            stack.pull()
+            trail.pull()
+            depth -= 1
+        elif action == 2 and depth:
+            stack.undo()
+            trail.undo()
+            depth -= 1
+        elif action == 3:
+            stack[key] = trail[key] = random.randrange(10)
+        elif action == 4 and random.randrange(100) == 0:
+            stack.reset()
+            trail.reset()
+            depth = 0
+        assert stack.copy() == trail.copy()
+        assert (key in stack) == (key in trail)
+        assert len(stack) == len(trail)
+
+
+class LookupOnly(dict):
+    "Mapping which fails if iterated so matches must use key lookup."
+    def __iter__(self):
+        raise AssertionError('iterated')
+
+    def items(self):
+        raise AssertionError('iterated')
+
+
+def test_mappings():
+    value = {'id': 7, 'tags': ['a', 'b'], 'meta': {'kind': 'user'}}
+    assert match(value, {'id': bind.id, 'tags': [str, str],
+                         'meta': {'kind': like('^us')}})
+    assert bound.id == 7
+    assert not match(value, {'id': int})
+    assert not match(value, {'id': str, 'tags': list, 'meta': dict})
+    assert not match(value, {'id': int, 'tags': list, 'other': dict})
+    assert match([{'a': 1}, {'a': 1}], [{'a': bind.a}, {'a': bind.a}])
+    assert not match([{'a': 1}, {'a': 2}], [{'a': bind.a}, {'a': bind.a}])
+    assert not match([('a', 1)], {'a': 1})
+
+
+def test_mapping_partial():
+    value = LookupOnly((str(num), num) for num in range(10000))
+    assert match(value, mapping({'5': int, '99': bind.num}))
+    assert bound.num == 99
+    assert not match(value, mapping({'5': str}))
+    assert not match(value, mapping({'-1': int}))
+    assert not match(value, mapping({'5': int}, strict=True))
+    assert not match([1], mapping({}))
+    assert match({'a': 1}, mapping({'a': 1}, strict=True))
+
+
+def test_mapping_rest():
+    value = {'a': 1, 'b': 2, 'c': 3}
+    assert match(value, mapping({'a': bind.a}, rest='rest'))
+    rest = bound.rest
+    assert isinstance(rest, RestView) and rest.value is value
+    assert rest == {'b': 2, 'c': 3}
+    assert len(rest) == 2 and 'a' not in rest and rest.copy() == rest
+    with pytest.raises(KeyError):
+        rest['a']
+    assert match(value, mapping(value, rest='rest'))
+    assert bound.rest == {}
+    assert match([value, {'b': 2, 'c': 3}],
+                 [mapping({'a': 1}, rest='rest'), bind.rest])
+
+
+def test_mapping_lookup_get():
+    from collections import defaultdict
+    value = defaultdict(int, a=1)
+    assert not match(value, {'a': 1, 'b': 0})
+    assert not match(value, mapping({'b': 0}))
+    assert dict(value) == {'a': 1}
+
+
+def test_mapping_pattern():
+    value = [{'a': 1}, {'a': 2, 'b': 0}, {'b': 3}]
+    item = mapping({'a': bind.any})
+    assert match(value, item * repeat + {'b': bind.b})
+    assert bound.b == 3
+    assert match(value, item * repeat * group('items') + anything)
+    assert bound['items'] == value[:2]
+
+
+def test_mapping_compiled():
+    compiled = compile({'a': int, 'b': bind.b})
+    assert compiled.match({'a': 1, 'b': 2})
+    assert bound.b == 2
+    assert not compiled.match({'a': 1, 'b': 2, 'c': 3})
+    assert not compiled.match({'a': 1, 'c': 3})
+    assert not compiled.match({'a': '1', 'b': 3})
+
+
+class Slotted:
+    __slots__ = 'left', 'right'
+    __match_args__ = ('left', 'right')
+
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+
+
+def test_attrs():
+    point = Point(1, 2, 3, 4)
+    assert match(point, attrs(Point, 1, bind.y, t=4))
+    assert bound.y == 2
+    assert not match(point, attrs(Point, 1, t=5))
+    assert not match((1, 2, 3, 4), attrs(Point, 1))
+    assert match(Slotted(1, 'a'), attrs(Slotted, int, right=bind.right))
+    assert bound.right == 'a'
+    assert not match(Slotted(1, 'a'), attrs(Slotted, str))
+    assert not match(Slotted(1, 'a'), attrs(Slotted, missing=1))
+    assert match(Slotted(1, 'a'), attrs(object))
+    assert match(Slotted(Point(0, 0, 0, 0), 1),
+                 attrs(Slotted, attrs(Point, z=0), bind.right))
+    with pytest.raises(TypeError):
+        attrs(Slotted, 1, 2, 3)
+    with pytest.raises(TypeError):
+        attrs(Slotted, 1, left=2)
+    with pytest.raises(TypeError):
+        attrs(object, 1)
+
+
+def test_attrs_dataclass():
+    dataclasses = pytest.importorskip('dataclasses')
+    Item = dataclasses.make_dataclass('Item', ['name', 'count'])
+    assert match(Item('a', 3), attrs(Item, count=like(lambda num: num > 2)))
+    assert not match(Item('a', 1), attrs(Item, count=like(lambda num: num > 2)))
+
+
+def test_attrs_pattern():
+    values = [Slotted(num, num) for num in range(5)] + [Point(0, 0, 0, 0)]
+    item = attrs(Slotted, left=int)
+    assert match(values, item * repeat * group('items') + attrs(Point))
+    assert len(bound['items']) == 5
+    assert not match(values, item * repeat(min=6))
+    compiled = compile(attrs(Slotted, bind.left, 0))
+    assert compiled.match(Slotted(3, 0))
+    assert bound.left == 3
+    assert not compiled.match(Slotted(3, 1))
+    assert not compiled.match(Point(3, 0, 0, 0))
+
+
+def test_match_result():
+    depth = len(bound)
+    result = match_result([1, 2, 3], [bind.first, bind.any, bind.last])
+    assert result == {'first': 1, 'last': 3}
+    assert result.first == 1
+    assert result['last'] == 3
+    assert 'first' in result and 'any' not in result
+    assert match_result([1, 2], [bind.first, bind.first]) is None
+    assert match_result(0, 0) == MatchResult({})
+    assert len(bound) == depth
+    with pytest.raises(AttributeError):
+        result.middle
+
+
+def test_match_result_compiled():
+    depth = len(bound)
+    compiled = compile('a' + anything * group('rest'))
+    assert compiled.match_result('abc').rest == 'bc'
+    assert compiled.match_result('bc') is None
+    assert len(bound) == depth
+
+
+def test_match_result_pickle():
+    import pickle
+    result = match_result(5, bind.value)
+    assert pickle.loads(pickle.dumps(result)).value == 5
+
+
+def test_pickle_patterns():
+    import pickle
+    patterns = [
+        bind.value, like('abc.*'), like(len), anything, padding,
+        'a' * repeat(min=1) + anything * group('rest'),
+        either('red', 'blue') + exclude('x'), basic_rules[:10],
+        mapping({'a': bind.a}, rest='rest', strict=True),
+        attrs(Point, 0, t=bind.t),
+    ]
+    for pattern in patterns:
+        assert pickle.loads(pickle.dumps(pattern)) == pattern
+    assert pickle.loads(pickle.dumps(bind)).value == bind.value
+    with pytest.raises(TypeError):
+        pickle.dumps(like(lambda value: value))
+
+
+def test_pickle_matcher():
+    import pickle
+    matcher = Matcher()
+    matcher.engine = 'backtrack'
+    matcher.cases = [Case('even', even_predicate, even_action)] + matcher.cases
+    copy = pickle.loads(pickle.dumps(matcher))
+    assert copy.engine == 'backtrack'
+    assert copy.match(2, 'even')
+    assert not pickle.loads(pickle.dumps(Matcher())).match(2, 'even')
+
+
+def ends_in_five(text):
+    return text.endswith('5') and text
+
+
+def test_match_many():
+    values = [(num, str(num)) for num in range(1000)] + [(0, 0)]
+    pattern = (bind.num, like(ends_in_five, 'text'))
+    results = list(match_many(values, pattern, workers=2, chunksize=64))
+    assert len(results) == len(values)
+    for (num, _), result in zip(values, results):
+        if num % 10 == 5:
+            assert result.num == num
+            assert result.text == str(num)
+        else:
+            assert result is None
+    serial = list(match_many(values, pattern, workers=1))
+    assert [result and result.num for result in serial] == [
+        result and result.num for result in results
+    ]
+
+
 def test_bind_result():
     with pytest.raises(AttributeError):
         if match(0, bind.push):
@@ -0,0 +1,118 @@
+import pytest
+
+import random
+
+import patternmatching as pm
+
+numpy = pytest.importorskip('numpy')
+
+
+def scalar_results(values, pattern):
+    items = pm.either_items(pattern)
+    options = [pattern] if items is None else items
+    results = []
+    for value in values.ravel().tolist():
+        for option in options:
+            result = pm.match_result(value, option)
+            if result is not None:
+                break
+        results.append(result)
+    return results
+
+
+def same(value, other):
+    # Results compare by repr for NaN and regex match objects.
+    return value == other or repr(value) == repr(other)
+
+
+def check(values, pattern):
+    mask, captures = pm.match_array(values, pattern)
+    assert mask.shape == values.shape
+    assert mask.dtype == bool
+    results = scalar_results(values, pattern)
+    assert mask.ravel().tolist() == [result is not None for result in results]
+    for name, capture in captures.items():
+        assert capture.shape == values.shape
+        for index, result in enumerate(results):
+            if result is not None:
+                assert same(capture.ravel()[index], result[name])
+    return mask, captures
+
+
+arrays = [
+    numpy.array([0, 1, 2, 3, -4, 5]),
+    numpy.array([0.0, 1.5, 2.0, float('nan')]),
+    numpy.array([True, False, True]),
+    numpy.array([1 + 2j, 3j]),
+    numpy.array(['red', 'blue', 'green', 'blu']),
+    numpy.array([b'red', b'blue']),
+    numpy.array([1, 'a', None, (1, 2), 2.0], dtype=object),
+    numpy.arange(12).reshape(3, 4),
+    numpy.array([0, 2 ** 63], dtype=numpy.uint64),
+]
+
+patterns = [
+    0, 2, 2.0, True, 3j, 'red', b'red', None, 2 ** 70, -1,
+    int, float, bool, complex, str, bytes, object,
+    pm.either(1, 2, 3), pm.either(2.0, 'blue', b'red', None),
+    pm.either(int, 'red'), pm.either(float, 3), pm.either(),
+    pm.like(numpy.isnan), pm.like(numpy.sign, 'sign'),
+    pm.like(pm.vectorized(lambda value: value * 2 == 4), 'four'),
+    pm.like(lambda value: value == 2, 'two'),
+    pm.like('bl.*'), pm.bind.value, pm.anyone,
+    (1, pm.bind.second), pm.either(pm.bind.value, 1),
+]
+
+
+@pytest.mark.parametrize('values', arrays)
+@pytest.mark.parametrize('pattern', patterns)
+def test_match_array(values, pattern):
+    try:
+        scalar_results(values, pattern)
+    except Exception:
+        return
+    check(values, pattern)
+
+
+def test_match_array_vectorized():
+    values = numpy.array([1, 5, 2, 7])
+    mask, captures = pm.match_array(values, pm.either(1, 2, 3))
+    assert mask.tolist() == [True, False, True, False]
+    assert captures == {}
+    big = pm.like(pm.vectorized(lambda num: num * 2), 'double')
+    mask, captures = pm.match_array(values, big)
+    assert mask.all()
+    assert captures['double'].tolist() == [2, 10, 4, 14]
+
+
+def test_match_array_types():
+    values = numpy.arange(5)
+    mask, captures = pm.array_mask(numpy, pm.matcher, values, int)
+    assert mask.tolist() == [True] * 5
+    assert captures == {}
+    mask, _ = pm.array_mask(numpy, pm.matcher, values, str)
+    assert mask.tolist() == [False] * 5
+    pattern = pm.either(float, 3)
+    mask, _ = pm.array_mask(numpy, pm.matcher, values, pattern)
+    assert mask.tolist() == [False, False, False, True, False]
+    mask, _ = pm.array_mask(numpy, pm.matcher, values.astype(float), pattern)
+    assert mask.all()
+
+
+def test_match_array_cases():
+    matcher = pm.Matcher()
+    matcher.cases = [
+        pm.Case('odd', lambda matcher, value, pattern: value % 2,
+                lambda matcher, value, pattern: value)
+    ] + matcher.cases
+    mask, _ = matcher.match_array(numpy.arange(4), 0)
+    assert mask.tolist() == [True, True, False, True]
+
+
+def test_match_array_random():
+    rand = random.Random(0)
+    values = numpy.array([rand.randrange(10) for _ in range(1000)])
+    pattern = pm.either(*rand.sample(range(10), 4))
+    check(values, pattern)
+    check(values.astype(float), pattern)
+    check(values.astype(object), pattern)
@@ -5,6 +5,11 @@ https://github.com/python/cpython/blob/master/Lib/test/re_tests.py
 
 """
 
+import pytest
+import gc
+import random
+import weakref
+
 import patternmatching as pm
 
 a_foo = 'a' * pm.group(1)
@@ -41,6 +46,58 @@ def test_pattern_hash():
 def test_pattern_repr():
     assert repr(pm.Pattern((1, 2, 3))) == 'Pattern(1, 2, 3)'
 
+def test_pattern_builder():
+    pieces = ['ab', 1, (2, 3), pm.anyone * pm.repeat, pm.bind.x, None]
+    builder = pm.PatternBuilder()
+    pattern = pm.Pattern()
+    for piece in pieces:
+        builder += piece
+        pattern = pattern + piece
+    assert builder.build() == pattern
+    assert len(builder) == len(pattern)
+    builder.append([4, 5])
+    assert builder.build()[-1] == [4, 5]
+
+def test_pattern_builder_long():
+    builder = pm.PatternBuilder()
+    for _ in range(100000):
+        builder += pm.anyone
+    assert len(builder.build()) == 100000
+
+def test_pattern_hash_nodes():
+    assert hash(pm.anyone * pm.repeat) == hash(pm.anyone * pm.repeat)
+    assert hash('a' * pm.group('x')) == hash('a' * pm.group('x'))
+    assert hash(pm.either('a', 'b')) == hash(pm.either('a', 'b'))
+
+def test_intern_pattern():
+    def make():
+        return pm.Pattern(
+            'a', pm.either('bc', ('d', pm.anyone * pm.repeat)) * pm.group('x'),
+            pm.exclude('e') * pm.repeat(min=1), 1,
+        )
+    first = pm.intern_pattern(make())
+    second = pm.intern_pattern(make())
+    assert first is second
+    assert first == make()
+    assert first[1] is pm.intern_pattern(make()[1])
+    assert pm.intern_pattern(pm.Pattern(1)) is not pm.intern_pattern(pm.Pattern(1.0))
+    matcher = pm.Matcher()
+    assert matcher.program(first) is matcher.program(second)
+    assert pm.PatternBuilder(make()).build(intern=True) is first
+
+def test_intern_pattern_unhashable():
+    pattern = pm.Pattern([1, 2], 'a' * pm.repeat)
+    interned = pm.intern_pattern(pattern)
+    assert interned == pattern
+    assert interned[1] is pm.intern_pattern('a' * pm.repeat)
+
+def test_intern_pattern_weak():
+    pattern = pm.intern_pattern(pm.Pattern('unique', 'z' * pm.repeat))
+    reference = weakref.ref(pattern)
+    del pattern
+    gc.collect()
+    assert reference() is None
+
 def test_anyone_repr():
     assert repr(pm.anyone) == 'anyone'
 
@@ -56,15 +113,25 @@ def test_either_rmul_single():
 def test_either_repr():
     assert repr(pm.either) == 'Either()'
 
+@pytest.fixture(autouse=True, params=['auto', 'backtrack', 'stack'])
+def engine(request):
+    pm.matcher.engine = request.param
+    yield request.param
+    pm.matcher.engine = 'auto'
+
 @pm.bound.reset
 def run(*args):
     pattern, value, result = args
+    compiled = pm.compile(pattern)
     if result is None:
         assert not pm.match(value, pattern)
+        assert not compiled.match(value)
     else:
         assert pm.match(value, pattern)
         del result['_']
         assert pm.bound == result
+        assert compiled.match(value)
+        assert pm.bound == result
 
 def test_basic():
     run('', '', {'_': ''})
@@ -216,3 +283,528 @@ def test_something():
     run(pm.Either('a' * pm.something, 'b') * pm.repeat(1,), 'ab', {'_': 'ab'})
     run(pm.Either('a' * pm.something, 'b') * pm.maybe, 'ab', {'_': 'a'})
     run(pm.Either('a' * pm.something, 'b') * pm.repeat(0, 1), 'ab', {'_': 'a'})
+
+
+def test_nested_repeat():
+    run(('a' * pm.repeat(min=2)) * pm.repeat + 'b', 'aaaab', {'_': 'aaaab'})
+    run(('a' * pm.repeat(min=2)) * pm.repeat(min=1) + 'b', 'ab', None)
+    run((pm.anyone * pm.repeat) * pm.repeat + 'x', 'aax', {'_': 'aax'})
+    run(('a' * pm.maybe) * pm.repeat(max=3) + 'b', 'aab', {'_': 'aab'})
+
+
+def test_pathological():
+    value = 'a' * 40
+    run(('a' * pm.something) * pm.repeat + 'x', value, None)
+    run((pm.anyone * pm.repeat) * pm.repeat + 'x', value, None)
+    run((('a' * pm.something) * pm.something) * pm.something + 'x', value, None)
+    run(pm.Either('a' * pm.something, 'a' * pm.repeat) * pm.repeat + 'x', value,
+        None)
+    run(('a' * pm.something) * pm.repeat + 'x', value + 'x',
+        {'_': value + 'x'})
+
+
+def test_memoize_after():
+    matcher = pm.Matcher()
+    patterns = [
+        'a' + b_s + 'bc',
+        pm.padding + pm.Either('ab', 'cd') + 'e',
+        ('N' * pm.exclude * pm.repeat + 'N') * pm.repeat(min=1),
+        pm.Either('a' * pm.something, 'b') * pm.maybe,
+    ]
+    values = ['abbbbc', 'abcde', 'abNNxyz', 'ab', '']
+    for pattern in patterns:
+        for value in values:
+            results = []
+            for memoize_after in (None, 0, 2):
+                matcher.memoize_after = memoize_after
+                results.append(matcher.visit(value, pattern)
+                               if matcher.match(value, pattern) else None)
+            assert results[0] == results[1] == results[2]
+
+
+def test_exclude_end():
+    run('a' + 'b' * pm.exclude, 'a', None)
+    run('a' + 'b' * pm.exclude, 'ac', {'_': 'ac'})
+
+
+def test_nfa_engine():
+    matcher = pm.Matcher()
+    matcher.engine = 'nfa'
+    value = 'a' * 5000
+    assert not matcher.match(value, ('a' * pm.something) * pm.repeat + 'x')
+    assert matcher.match(value + 'x', (pm.anyone * pm.repeat) * pm.repeat + 'x')
+    assert matcher.match(value, pm.padding + 'a' * pm.repeat(min=3, max=5))
+
+
+@pytest.mark.parametrize('pattern', [
+    'a' * pm.repeat(min=3, max=1),
+    'a' * pm.repeat(max=2.0),
+    'a' * pm.repeat(min=1.0),
+])
+def test_nfa_bounds(pattern):
+    assert pm.nfa_program(pattern) is None
+    auto, backtrack = pm.Matcher(), pm.Matcher()
+    backtrack.engine = 'backtrack'
+    for value in ['', 'a', 'aa', 'aaa']:
+        assert auto.match(value, pattern) == backtrack.match(value, pattern)
+
+
+def test_nfa_unsupported():
+    matcher = pm.Matcher()
+    matcher.engine = 'nfa'
+    with pytest.raises(ValueError):
+        matcher.match('abc', pm.anything * pm.group('name'))
+    with pytest.raises(ValueError):
+        matcher.match('abc', ('a' * pm.maybe) * pm.repeat(max=3))
+    assert pm.nfa_program(pm.anything * pm.group('name')) is None
+
+
+def regex_results(pattern, values):
+    regex, backtrack = pm.Matcher(), pm.Matcher()
+    regex.engine = 'regex'
+    backtrack.engine = 'backtrack'
+    for value in values:
+        expected = backtrack.match(value, pattern)
+        assert regex.match(value, pattern) == expected
+        if expected:
+            assert regex.bound == backtrack.bound
+            assert regex.visit(value, pattern) == backtrack.visit(value, pattern)
+            regex.names.reset()
+            backtrack.names.reset()
+
+
+def test_regex_str():
+    values = ['', 'a', 'ab', 'abc', 'abbbc', 'xabc', 'a.c', 'a\nc']
+    regex_results('a' + 'b' * pm.repeat + 'c', values)
+    regex_results('a' + pm.anyone + 'c', values)
+    regex_results('a' + ('b' * pm.repeat) * pm.group('bs') + 'c', values)
+    regex_results(pm.anything * pm.group('head') + 'c', values)
+    regex_results(pm.anyone * pm.repeat(greedy=False) * pm.group(1) + 'b',
+                  values)
+    regex_results(pm.Either('ab', 'a.') * pm.group('pair'), values)
+    regex_results('a' + 'b' * pm.exclude * pm.group('other'), values)
+    regex_results('a' + 'b' * pm.repeat(min=1, max=2) + 'c', values)
+
+
+def test_regex_bytes():
+    values = [b'', b'a', b'ab', b'abc', b'abbbc', b'\x00\xff']
+    regex_results(b'a' + (98 * pm.repeat) * pm.group('bs') + b'c', values)
+    regex_results(pm.anyone * pm.group('first') + pm.anything, values)
+    regex_results(0 * pm.group('zero') + 255, values)
+
+
+def test_regex_bound():
+    matcher = pm.Matcher()
+    matcher.engine = 'regex'
+    pattern = (
+        pm.anyone * pm.repeat(greedy=False) * pm.group('level') + ': ' +
+        pm.anything * pm.group('message')
+    )
+    assert matcher.match('ERROR: disk full', pattern)
+    assert matcher.bound.level == 'ERROR'
+    assert matcher.bound.message == 'disk full'
+    pattern = pm.Either('a' * pm.group('a'), 'b' * pm.group('b'))
+    assert matcher.match('b', pattern)
+    assert matcher.bound.b == 'b'
+    assert 'a' not in matcher.bound
+
+
+def test_regex_fallback():
+    matcher = pm.Matcher()
+    assert matcher.regex(['abc'], str) is None
+    assert matcher.regex(pm.like('a'), str) is None
+    assert matcher.regex(('a' * pm.group('x')) * pm.repeat, str) is None
+    assert matcher.regex('a' * pm.group('x') + 'a' * pm.group('x'), str) is None
+    assert matcher.regex('a' * pm.repeat(max=2.0), str) is None
+    pattern = 'a' * pm.group('x') + 'a' * pm.group('x')
+    assert matcher.match('aa', pattern)
+    assert matcher.bound.x == 'a'
+    assert not matcher.match('ab', [pm.bind.x, pattern])
+    matcher.engine = 'regex'
+    with pytest.raises(ValueError):
+        matcher.match('aa', pattern)
+    with pytest.raises(ValueError):
+        matcher.match([1, 2], 1 * pm.group('one') + 2)
+
+
+def test_regex_cases():
+    matcher = pm.Matcher()
+    pattern = 'a' * pm.group('x')
+    assert matcher.regex(pattern, str) is not None
+    matcher.cases = list(matcher.cases)
+    matcher.cases.insert(0, pm.Case('any', lambda *args: True,
+                                    lambda *args: None))
+    assert matcher.regex(pattern, str) is None
+    assert matcher.match('b', pattern)
+
+
+def test_match_stream():
+    patterns = [
+        'a' + b_s + 'bc',
+        pm.padding + pm.Either('ab', 'cd') + 'e',
+        ('N' * pm.exclude * pm.repeat + 'N') * pm.repeat(min=1),
+        pm.Either('a' * pm.something, 'b') * pm.maybe,
+        'a' + ('bc' * pm.exclude) * pm.repeat + 'c',
+        ('a' * pm.something) * pm.repeat + 'x',
+    ]
+    values = ['abbbbc', 'abcde', 'abNNxyz', 'ab', '', 'aabcc', 'aaaax']
+    for pattern in patterns:
+        for value in values:
+            expected = pm.match(value, pattern)
+            assert pm.match_stream(iter(value), pattern) == expected
+
+
+class Item:
+    def __init__(self, num):
+        self.num = num
+
+    def __eq__(self, that):
+        return self.num == that
+
+    __hash__ = object.__hash__
+
+
+def test_match_stream_bounded():
+    alive = weakref.WeakSet()
+
+    def items():
+        for num in range(10 ** 5):
+            assert len(alive) < 10
+            item = Item(num)
+            alive.add(item)
+            yield item
+
+    matcher = pm.Matcher()
+    pattern = pm.padding + [99998, 99999]
+    assert matcher.match_stream(items(), pattern)
+    assert not matcher.match_stream(items(), pm.anything + [-1])
+
+
+def test_match_stream_fallback():
+    pattern = pm.anything * pm.group('head') + 'c'
+    assert pm.match_stream(iter('abcd'), pattern)
+    assert pm.bound.head == ['a', 'b']
+    assert pm.match_stream(iter([1, 2]), [1, 2])
+    assert not pm.match_stream(iter([1, 2]), (1, 2))
+
+
+def naive_finditer(value, pattern):
+    matcher = pm.Matcher()
+    offset = 0
+    while offset <= len(value):
+        if matcher.match(value[offset:], pattern):
+            end = offset + len(matcher.visit(value[offset:], pattern))
+            matcher.names.reset()
+            yield offset, end, {key: matcher.bound[key] for key in matcher.bound}
+            offset = end if end > offset else offset + 1
+        else:
+            offset += 1
+
+
+def test_finditer():
+    patterns = [
+        'ab' + pm.anyone * pm.group('x'),
+        'abab' + b_s,
+        pm.Either('ab', 'ba') * pm.group('pair'),
+        b_s,
+        'a' + 'b' * pm.exclude + 'a',
+        pm.Pattern('bba'),
+    ]
+    random.seed(0)
+    for _ in range(200):
+        value = ''.join(random.choice('ab') for _ in range(random.randrange(12)))
+        for pattern in patterns:
+            expected = list(naive_finditer(value, pattern))
+            results = [
+                (result.start, result.end, {key: result[key] for key in result})
+                for result in pm.finditer(value, pattern)
+            ]
+            assert results == expected
+            items = list(value)
+            results = [
+                (result.start, result.end)
+                for result in pm.finditer(items, pm.Pattern(pattern))
+            ]
+            assert results == [(start, end) for start, end, _ in expected]
+
+
+def test_finditer_sequences():
+    value = [0, 1.0, 2, 'x', 1, 2, 3, True, 2, None]
+    pattern = pm.Pattern([1, 2]) + pm.bind.next
+    results = list(pm.finditer(value, pattern))
+    assert [(result.start, result.end) for result in results] == [
+        (1, 4), (4, 7), (7, 10),
+    ]
+    assert [result.next for result in results] == ['x', 3, None]
+    assert pm.search(b'\x00abc', b'bc').start == 2
+    assert pm.search(bytearray(b'abc'), [98, 99]).start == 1
+    assert pm.search((1, 2), [3]) is None
+    assert pm.search('aaa', 'a', start=2).start == 2
+
+
+def test_finditer_cases():
+    matcher = pm.Matcher()
+    matcher.cases = [
+        pm.Case('lower', lambda matcher, value, pattern: value == pattern.lower(),
+                lambda matcher, value, pattern: value)
+    ] + matcher.cases
+    assert matcher.search('xxab', 'AB').start == 2
+
+@pytest.mark.parametrize('captures', ['copy', 'view'])
+def test_captures(engine, captures):
+    matcher = pm.Matcher()
+    matcher.engine = engine
+    matcher.captures = captures
+    pattern = pm.anything * pm.group('x') + 'c' + pm.anything * pm.group('y')
+    result = matcher.match_result('abcd', pattern)
+    assert result == {'x': 'ab', 'y': 'd'}
+    pattern = pm.anything * pm.group('x') + ord('c') + pm.anything * pm.group('y')
+    result = matcher.match_result(b'abcd', pattern)
+    assert result == {'x': b'ab', 'y': b'd'}
+    kind = memoryview if captures == 'view' else bytes
+    assert type(result.x) is kind
+    result = matcher.match_result([1, 2, 99, 4], pattern)
+    assert result == {'x': [1, 2], 'y': [4]}
+    kind = pm.SliceView if captures == 'view' else list
+    assert type(result.x) is kind
+
+def test_captures_repeated():
+    pattern = pm.anything * pm.group('x') + '-' + pm.anything * pm.group('x')
+    assert pm.match('ab-ab', pattern)
+    assert pm.bound.x == 'ab'
+    assert not pm.match('ab-ba', pattern)
+    pattern = [pm.bind.x, pm.Pattern(pm.anything * pm.group('x'))]
+    assert pm.match([[1, 2], [1, 2]], pattern)
+    assert pm.bound.x == [1, 2]
+    assert not pm.match([[1, 2], [2, 1]], pattern)
+
+def test_slice_view():
+    view = pm.SliceView(list(range(10)), 2, 7)
+    assert len(view) == 5
+    assert view[0] == 2 and view[-1] == 6
+    assert view[1:3] == [3, 4]
+    assert view[::2] == [2, 4, 6]
+    assert list(reversed(view)) == [6, 5, 4, 3, 2]
+    assert 4 in view and 8 not in view
+    assert view == pm.SliceView(list(range(2, 7)), 0, 5)
+    assert view != [2, 3]
+    with pytest.raises(IndexError):
+        view[5]
+
+def test_stack_long():
+    matcher = pm.Matcher()
+    matcher.engine = 'stack'
+    value = ['a'] * 100000 + ['b']
+    pattern = pm.Pattern(pm.anything * pm.group('head'), 'a', 'b')
+    assert matcher.match(value, pattern)
+    assert len(matcher.bound.head) == 99999
+    pattern = pm.Pattern('a' * pm.repeat(greedy=False) * pm.group('x'), 'c')
+    assert not matcher.match(value, pattern)
+
+def test_stack_nullable():
+    matcher = pm.Matcher()
+    matcher.engine = 'stack'
+    pattern = pm.Pattern('a' * pm.maybe * pm.repeat(max=3) * pm.group('x'), 'b')
+    assert matcher.match('aab', pattern)
+    assert matcher.bound.x == 'aa'
+    pattern = pm.Pattern(pm.exclude(pm.Pattern('a', pm.anything)), 'b')
+    assert matcher.match('bb', pattern)
+    assert not matcher.match('ab', pattern)
+
+def test_limit_steps(engine):
+    matcher = pm.Matcher()
+    matcher.engine = engine
+    pattern = pm.anything * pm.group('x') + pm.anything * pm.group('y') + 'b'
+    value = list('a' * 300)
+    with pytest.raises(pm.MatchLimitError) as info:
+        matcher.match(value, pattern, max_steps=5000)
+    assert info.value.reason == 'steps'
+    assert 5000 < info.value.steps <= 5000 + pm.Budget.interval
+    assert 0 <= info.value.offset <= len(value)
+    assert len(matcher.names) == 0
+    assert len(matcher.bound) == 0
+    assert matcher.budget is None
+    assert matcher.match(value + ['b'], pattern, max_steps=5000)
+
+def test_limit_nfa():
+    matcher = pm.Matcher()
+    matcher.engine = 'nfa'
+    pattern = pm.anything + 'b'
+    with pytest.raises(pm.MatchLimitError):
+        matcher.match('a' * 10000, pattern, max_steps=5000)
+    assert not matcher.match('a' * 1000, pattern, max_steps=5000)
+
+def test_limit_timeout(engine):
+    matcher = pm.Matcher()
+    matcher.engine = engine
+    pattern = (pm.anything * pm.group('x') + pm.anything * pm.group('y')
+               + pm.anything * pm.group('z') + 'b')
+    with pytest.raises(pm.MatchLimitError) as info:
+        matcher.match(list('a' * 400), pattern, timeout=0.05)
+    assert info.value.reason == 'timeout'
+    assert info.value.elapsed >= 0.05
+
+def test_limit_defaults_shared(engine):
+    matcher = pm.Matcher()
+    matcher.engine = engine
+    matcher.max_steps = 2500
+    items = [pm.anything * pm.group(('x', index))
+             + pm.anything * pm.group(('y', index)) + 'b'
+             for index in range(10)]
+    value = ['b'] + list('a' * 40)
+    assert matcher.match([value], items[:1])
+    with pytest.raises(pm.MatchLimitError):
+        matcher.match([value] * 10, items)
+    assert matcher.match_result([value] * 10, items, max_steps=10 ** 6)
+    matcher.max_steps = None
+    assert matcher.match([value] * 10, items)
+
+def test_limit_nested():
+    matcher = pm.Matcher()
+    value = pattern = []
+    for index in range(1000):
+        value, pattern = [index, value], [int, pattern]
+    with pytest.raises(pm.MatchLimitError) as info:
+        matcher.match(value, pattern, max_steps=500)
+    assert info.value.steps == 501
+    assert info.value.offset is None
+    assert 'offset' not in str(info.value)
+    assert matcher.match(value, pattern, max_steps=5000)
+    value = pattern = 0
+    for index in range(300):
+        value, pattern = {'a': value}, {'a': pattern}
+    with pytest.raises(pm.MatchLimitError):
+        matcher.match(value, pattern, max_steps=200)
+    assert matcher.budget is None
+
+def test_limit_compiled(engine):
+    matcher = pm.Matcher()
+    matcher.max_steps = 5000
+    pattern = pm.anything * pm.group('x') + pm.anything * pm.group('y') + 'b'
+    value = list('a' * 300)
+    compiled = matcher.compile(pattern)
+    with pytest.raises(pm.MatchLimitError):
+        compiled.match(value)
+    with pytest.raises(pm.MatchLimitError):
+        compiled.match_result(value)
+    assert matcher.budget is None
+    assert compiled.match_result(value, max_steps=10 ** 6) is None
+    assert compiled.match(value + ['b'])
+
+def test_limit_table(engine):
+    matcher = pm.Matcher()
+    matcher.max_steps = 5000
+    pattern = pm.anything * pm.group('x') + pm.anything * pm.group('y') + 'b'
+    value = list('a' * 300)
+    table = matcher.table([(pattern, 'ab'), (list, 'list')])
+    with pytest.raises(pm.MatchLimitError):
+        table.match(value)
+    assert matcher.budget is None
+    assert table.match(value, max_steps=10 ** 6) == 'list'
+    assert table.match(value + ['b']) == 'ab'
+
+def test_limit_search(engine):
+    matcher = pm.Matcher()
+    matcher.max_steps = 5000
+    pattern = pm.anything * pm.group('x') + pm.anything * pm.group('y') + 'b'
+    value = list('a' * 300)
+    with pytest.raises(pm.MatchLimitError):
+        matcher.search(value, pattern)
+    with pytest.raises(pm.MatchLimitError):
+        list(matcher.finditer(value, pattern))
+    assert matcher.budget is None
+    assert matcher.search(value[:30], pattern, max_steps=10 ** 6) is None
+    results = matcher.finditer('ab' * 10, 'a' + pm.group('x', ['b']))
+    for result in results:
+        assert result.x == 'b'
+        assert matcher.budget is None
+    with pytest.raises(pm.MatchLimitError):
+        list(matcher.finditer('ab' * 5000, 'a' + pm.group('x', ['b'])))
+
+def test_limit_stream(engine):
+    matcher = pm.Matcher()
+    matcher.max_steps = 5000
+    pattern = pm.anything + 'b'
+    with pytest.raises(pm.MatchLimitError):
+        matcher.match_stream(iter('a' * 10000), pattern)
+    assert matcher.budget is None
+    assert not matcher.match_stream(iter('a' * 1000), pattern)
+    values = iter('a' * 10000)
+    assert not matcher.match_stream(values, pattern, max_steps=10 ** 6)
+
+def test_either_literal(engine):
+    words = ['red', 'reddish', 're', 'blue', 'red']
+    for pattern in (pm.either(*words) * pm.group('word') + pm.anything,
+                    pm.either(*words) * pm.group('word') + 'dish'):
+        ref = pm.Matcher()
+        ref.cases = list(ref.cases)
+        for value in ('reddish', 'redd', 'blue', 'rex', 'r', '', list('red')):
+            expected = ref.match_result(value, pattern)
+            assert pm.match_result(value, pattern) == expected
+    pattern = pm.either(*[[num] for num in range(500)]) * pm.repeat
+    value = list(range(0, 500, 5)) + [1.0, True]
+    assert pm.match_result(value, pattern + pm.group('x', [1]) + 1)
+    assert pm.match(value, pattern + 500) is False
+    assert pm.match([Item(3), 2], pattern + pm.group('x', [2]))
+
+
+def test_exclude_literal(engine):
+    pattern = pm.exclude(*[[num] for num in range(10)]) * pm.repeat
+    assert pm.match([10, 'a', Item(11), 1.5, 3], pattern + 3)
+    assert not pm.match([10, 2.0], pattern + 2.0 + pm.anyone)
+    pattern = pm.exclude('ab', 'bc') * pm.repeat * pm.group('x') + 'b'
+    assert pm.match_result('cacb', pattern).x == 'cac'
+    assert pm.match_result('bb', pattern).x == 'b'
+    assert pm.match_result('cabb', pattern) is None
+    assert pm.match_result(['c', 'a', str, 'b'], pattern).x == ['c', 'a', str]
+
+
+def upper_predicate(matcher, value, pattern):
+    return isinstance(pattern, str) and value == pattern.upper()
+
+
+def test_options_literal_cases():
+    matcher = pm.Matcher()
+    matcher.cases = [
+        pm.Case('upper', upper_predicate, lambda matcher, value, pattern: value)
+    ] + matcher.cases
+    for engine in ('auto', 'backtrack', 'stack', 'nfa'):
+        matcher.engine = engine
+        assert matcher.match('AB', pm.either('x', 'b', 'a') * pm.repeat)
+        assert matcher.match('AB', pm.either('ab', 'x'))
+        assert not matcher.match('A', pm.exclude('a', 'x'))
+        assert matcher.match_stream(iter('BA'), pm.either('a', 'b') * pm.repeat)
+
+
+def test_repeat_single(engine):
+    value = 'ab' * 5000 + 'c'
+    result = pm.match_result(value, pm.anything * pm.group('x') + 'c')
+    assert result.x == value[:-1]
+    result = pm.match_result(value, pm.padding * pm.group('x') + 'b')
+    assert result.x == 'a'
+    pattern = (pm.exclude('c') * pm.repeat(min=3) * pm.group('x')
+               + pm.either('a', 'b') * pm.repeat(max=2, greedy=False)
+               * pm.group('y') + 'c')
+    assert pm.match_result(value, pattern) == {'x': value[:-1], 'y': ''}
+    assert pm.match_result('abbc', pattern) == {'x': 'abb', 'y': ''}
+    assert pm.match_result('abc', pattern) is None
+    pattern = 'a' * pm.repeat(min=2, max=3) * pm.group('x') + pm.anything
+    assert pm.match_result('aaaa', pattern).x == 'aaa'
+    assert pm.match_result('ab', pattern) is None
+
+
+
+def test_repeat_float_bounds():
+    matcher = pm.Matcher()
+    matcher.engine = 'backtrack'
+    assert matcher.match('aaaa', pm.anyone * pm.repeat(max=3.0) + 'a')
+    assert not matcher.match('aaaab', pm.anyone * pm.repeat(max=3.0) + 'b')
+    pattern = 'b' * pm.repeat(max=2.5)
+    assert matcher.match('bbb', pattern)
+    assert not matcher.match('bbbc', pattern + 'c')
+    result = matcher.match_result('bbb', pattern * pm.group('x')
+                                  + pm.anything * pm.group('y'))
+    assert result == {'x': 'bb', 'y': 'b'}
+    pattern = 'b' * pm.repeat(min=1.5, greedy=False) * pm.group('x')
+    assert matcher.match_result('bbb', pattern) == {'x': 'bb'}
+    assert matcher.match_result('b', pattern) is None
@@ -0,0 +1,51 @@
+import pytest
+
+import asyncio
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import patternmatching as pm
+from patternmatching import match, bind, bound, like, group, anything
+
+pytest.importorskip('contextvars')
+
+
+def check(num):
+    value = [num, str(num), [num] * (num % 5)]
+    pattern = [bind.num, like(r'\d+', 'text'), bind.nums]
+    if num % 3 == 0:
+        pattern = [bind.num, bind.text, pm.anyone]
+    assert match(value, pattern)
+    assert bound.num == num
+    if num % 3:
+        assert bound.text.group() == str(num)
+        assert bound.nums == [num] * (num % 5)
+    text = 'key%d=value%d' % (num, num)
+    assert match(text, anything * group('key') + '=' + anything * group('val'))
+    assert bound.key == 'key%d' % num
+    assert bound.val == 'value%d' % num
+    bound.pop()
+    assert bound.num == num
+    bound.pop()
+    return num
+
+
+def test_threads():
+    nums = list(range(5000))
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert list(executor.map(check, nums)) == nums
+
+
+def test_tasks():
+    async def task(num):
+        assert match([num, num + 1], [bind.first, bind.second])
+        await asyncio.sleep(random.random() / 1000)
+        assert bound.first == num
+        assert bound.second == num + 1
+        bound.pop()
+        return num
+
+    async def main():
+        return await asyncio.gather(*(task(num) for num in range(2000)))
+
+    assert asyncio.run(main()) == list(range(2000))